@@ -0,0 +1,251 @@
+"""
+CAPSTACK Admission Control - Bounded per-route concurrency and load shedding
+Model-backed routes run at most a fixed number of requests at once with a
+bounded FIFO queue behind them, and sync routes together never hold more
+requests than the threadpool they run on has threads. Requests are shed up front, with 503 when
+the queue is full or 429 when the estimated queue wait exceeds the latency
+SLO, so a traffic spike fails fast instead of slowing everyone down
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .metrics import CounterFamily, GaugeFamily
+
+# Cheap routes are never queued behind model work
+PRIORITY_PATHS = frozenset({"/", "/health", "/ready", "/metrics", "/favicon.ico"})
+GATED_METHODS = frozenset({"POST"})
+
+# Concurrency for CPU-heavy routes; other gated routes use the default
+ROUTE_CONCURRENCY = {
+    "/risk-score/batch": 8,
+    "/predictive-analytics/batch": 8,
+    "/what-if/simulate": 4,
+    "/what-if/goal-seek": 4,
+    "/what-if/sweep": 4,
+}
+
+# Threads in the anyio pool that runs sync (def) endpoints (anyio's default)
+THREADPOOL_SIZE = 40
+# Name of the gate shared by every sync route
+THREADPOOL_GATE = "<threadpool>"
+
+# Weight of the newest sample in the service-time moving average
+SERVICE_TIME_ALPHA = 0.2
+
+ADMISSION_SHED = CounterFamily(
+    "admission_shed_total",
+    "Requests rejected by admission control",
+    ("route", "reason"),
+)
+ADMISSION_QUEUE_DEPTH = GaugeFamily(
+    "admission_queue_depth", "Requests waiting for a route slot", ("route",)
+)
+ADMISSION_ACTIVE = GaugeFamily(
+    "admission_active", "Requests holding a route slot", ("route",)
+)
+
+
+class Shed(Exception):
+    """Raised by RouteGate.acquire when a request is rejected"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteGate:
+    """
+    FIFO concurrency limit for one route.
+
+    Queue wait is estimated from a moving average of how long admitted
+    requests hold their slot, so the SLO check adapts to the current load
+    and model speed.
+    """
+
+    def __init__(self, route: str, max_concurrency: int, max_queue: int, slo_seconds: float):
+        self.route = route
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.slo_seconds = slo_seconds
+        self.active = 0
+        self.service_time: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._queue_gauge = ADMISSION_QUEUE_DEPTH.labels(route)
+        self._active_gauge = ADMISSION_ACTIVE.labels(route)
+        self._shed = {
+            reason: ADMISSION_SHED.labels(route, reason)
+            for reason in ("queue_full", "slo")
+        }
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self) -> float:
+        """Seconds a request arriving now would wait for a slot"""
+        if self.active < self.max_concurrency or not self.service_time:
+            return 0.0
+        return (self.queued + 1) * self.service_time / self.max_concurrency
+
+    def _reject(self, status: int, reason: str, wait: float) -> Shed:
+        self._shed[reason].inc()
+        # Retry once roughly the current queue has drained
+        return Shed(status, reason, max(1.0, wait))
+
+    async def acquire(self):
+        """Wait for a slot; raises Shed if the request should be rejected"""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self._active_gauge.set(self.active)
+            return
+        wait = self.estimated_wait()
+        if self.queued >= self.max_queue:
+            raise self._reject(503, "queue_full", wait)
+        if wait > self.slo_seconds:
+            raise self._reject(429, "slo", wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queue_gauge.set(self.queued)
+        try:
+            # release() hands its slot over by resolving the future
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                self._waiters.remove(waiter)
+                self._queue_gauge.set(self.queued)
+            raise
+
+    def release(self, held: Optional[float]):
+        """Free a slot held for `held` seconds (None if never used)"""
+        if held is not None:
+            self.service_time = (
+                held if self.service_time is None
+                else self.service_time + SERVICE_TIME_ALPHA * (held - self.service_time)
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._queue_gauge.set(self.queued)
+                return
+        self._queue_gauge.set(self.queued)
+        self.active -= 1
+        self._active_gauge.set(self.active)
+
+    def stats(self) -> Dict[str, float]:
+        """Current gate state"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queued": self.queued,
+            "service_time_ms": round((self.service_time or 0.0) * 1000, 3),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying a RouteGate to each model-backed route.
+
+    POST requests to known routes are gated; PRIORITY_PATHS, other methods
+    and unknown paths pass straight through. Sync endpoints additionally
+    share one gate of ML_ADMISSION_THREADPOOL slots (default
+    THREADPOOL_SIZE), so they queue here, where they can be shed, rather
+    than in the threadpool. Limits come from ML_ADMISSION_MAX_CONCURRENCY
+    (default 64 per route, ROUTE_CONCURRENCY overrides),
+    ML_ADMISSION_MAX_QUEUE (default 256) and ML_ADMISSION_SLO_MS (default
+    1000). ML_ADMISSION_ENABLED=false disables shedding.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = os.getenv("ML_ADMISSION_ENABLED", "true").lower() not in (
+            "0", "false", "no"
+        )
+        self.max_concurrency = int(os.getenv("ML_ADMISSION_MAX_CONCURRENCY", "64"))
+        self.max_queue = int(os.getenv("ML_ADMISSION_MAX_QUEUE", "256"))
+        self.slo_seconds = float(os.getenv("ML_ADMISSION_SLO_MS", "1000")) / 1000
+        self.threadpool_size = int(os.getenv("ML_ADMISSION_THREADPOOL", str(THREADPOOL_SIZE)))
+        self.gates: Optional[Dict[str, Tuple[RouteGate, ...]]] = None
+
+    def _gates(self, scope) -> Tuple[RouteGate, ...]:
+        if self.gates is None:
+            threadpool = RouteGate(
+                THREADPOOL_GATE, self.threadpool_size, self.max_queue, self.slo_seconds
+            )
+            self.gates = {}
+            for route in scope["app"].routes:
+                if (
+                    not hasattr(route, "path")
+                    or route.path in PRIORITY_PATHS
+                    or not GATED_METHODS & getattr(route, "methods", set())
+                ):
+                    continue
+                gate = RouteGate(
+                    route.path,
+                    ROUTE_CONCURRENCY.get(route.path, self.max_concurrency),
+                    self.max_queue,
+                    self.slo_seconds,
+                )
+                sync = not asyncio.iscoroutinefunction(getattr(route, "endpoint", None))
+                self.gates[route.path] = (gate, threadpool) if sync else (gate,)
+        if scope["method"] not in GATED_METHODS:
+            return ()
+        return self.gates.get(scope["path"], ())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        gates = self._gates(scope)
+        if not gates:
+            await self.app(scope, receive, send)
+            return
+
+        held = []
+        try:
+            for gate in gates:
+                await gate.acquire()
+                held.append(gate)
+        except Shed as e:
+            for gate in held:
+                gate.release(None)
+            await _send_shed(send, e)
+            return
+        except BaseException:
+            for gate in held:
+                gate.release(None)
+            raise
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            for gate in held:
+                gate.release(elapsed)
+
+
+async def _send_shed(send, shed: Shed):
+    detail = (
+        "Service overloaded, request queue is full"
+        if shed.reason == "queue_full"
+        else "Estimated queue wait exceeds the latency budget"
+    )
+    body = json.dumps({"detail": detail}).encode()
+    headers: Tuple[Tuple[bytes, bytes], ...] = (
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(math.ceil(shed.retry_after)).encode()),
+    )
+    await send({"type": "http.response.start", "status": shed.status, "headers": list(headers)})
+    await send({"type": "http.response.body", "body": body})
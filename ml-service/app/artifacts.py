@@ -0,0 +1,197 @@
+"""
+CAPSTACK Model Artifacts - Versioned, memory-mappable model format
+A manifest JSON plus raw .npy arrays (tree nodes, scaler mean/scale) that
+every worker maps read-only, so N workers share one copy in the page cache
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .compiled_trees import (
+    ARRAY_DTYPES,
+    CompiledBinaryClassifier,
+    CompiledRegressor,
+    CompiledTreeEnsemble,
+    compile_ensemble,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+ENSEMBLE_KINDS = {
+    "regressor": CompiledRegressor,
+    "binary_classifier": CompiledBinaryClassifier,
+}
+
+
+class ArrayScaler:
+    """Stand-in for a fitted StandardScaler backed by plain arrays"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Standardize features"""
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ModelArtifact:
+    """A loaded artifact: compiled ensemble, scaler and model metadata"""
+
+    def __init__(
+        self,
+        ensemble: CompiledTreeEnsemble,
+        scaler: ArrayScaler,
+        metadata: Dict[str, Any],
+        manifest: Dict[str, Any],
+    ):
+        self.ensemble = ensemble
+        self.scaler = scaler
+        self.metadata = metadata
+        self.manifest = manifest
+
+
+def artifact_dir(model_dir: Path, name: str) -> Path:
+    """Directory holding the artifact for a model name (risk, layoff, ...)"""
+    return Path(model_dir) / f"{name}_artifact"
+
+
+def _scaler_arrays(scaler, n_features: int) -> Dict[str, np.ndarray]:
+    """Mean and scale of a StandardScaler, with identity defaults"""
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    return {
+        "scaler_mean": np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64),
+        "scaler_scale": np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64),
+    }
+
+
+def export_artifact(
+    directory: Path,
+    estimator,
+    scaler,
+    metadata: Dict[str, Any],
+    source: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Write a fitted estimator and scaler as a memory-mappable artifact.
+
+    Arrays are written first and the manifest last, so a reader never sees
+    a manifest that points at missing arrays. Every export writes new array
+    files (named by an export revision) instead of rewriting existing ones:
+    workers may still have the old files memory-mapped, and truncating a
+    mapped file kills them with SIGBUS. Files of the previous export are
+    kept for readers that already hold its manifest; older ones are
+    unlinked, which leaves live mappings intact. Returns the manifest.
+    """
+    ensemble = compile_ensemble(estimator)
+    kind = next(
+        name for name, cls in ENSEMBLE_KINDS.items() if isinstance(ensemble, cls)
+    )
+    arrays = dict(ensemble.arrays)
+    arrays.update(_scaler_arrays(scaler, ensemble.n_features))
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = _manifest_files(directory / MANIFEST_NAME)
+    revision = f"{time.time_ns():x}"
+    entries = {}
+    for name, array in arrays.items():
+        file_name = f"{name}-{revision}.npy"
+        np.save(directory / file_name, np.ascontiguousarray(array))
+        entries[name] = {
+            "file": file_name,
+            "dtype": str(array.dtype),
+            "shape": list(array.shape),
+        }
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "kind": kind,
+        "estimator": type(estimator).__name__,
+        "n_features": ensemble.n_features,
+        "n_trees": ensemble.n_trees,
+        "max_depth": ensemble.max_depth,
+        "scale": ensemble.scale,
+        "offset": ensemble.offset,
+        "arrays": entries,
+        "metadata": metadata,
+        "source": source,
+        "exported": datetime.utcnow().isoformat(),
+    }
+    tmp_path = directory / f"{MANIFEST_NAME}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(directory / MANIFEST_NAME)
+
+    keep = previous | {entry["file"] for entry in entries.values()}
+    for path in directory.glob("*.npy"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    logger.info("Exported %s artifact to %s", kind, directory)
+    return manifest
+
+
+def _manifest_files(manifest_path: Path) -> set:
+    """Array file names referenced by a manifest, empty if it is unreadable"""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return {entry["file"] for entry in json.load(f)["arrays"].values()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
+
+def load_artifact(directory: Path, mmap: bool = True) -> ModelArtifact:
+    """
+    Load an artifact, memory-mapping its arrays read-only by default.
+
+    Raises ValueError when the manifest is missing, has an unsupported
+    format version, or disagrees with the arrays on disk.
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise ValueError(f"No artifact manifest in {directory}")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    version = manifest.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact format version {version} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    kind = manifest.get("kind")
+    if kind not in ENSEMBLE_KINDS:
+        raise ValueError(f"Unknown artifact kind: {kind}")
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(directory / entry["file"], mmap_mode="r" if mmap else None)
+        if str(array.dtype) != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ValueError(f"Artifact array {name} does not match manifest")
+        # Drop the memmap subclass; the view still shares the mapped pages
+        arrays[name] = array.view(np.ndarray)
+
+    missing = set(ARRAY_DTYPES) - set(arrays)
+    if missing:
+        raise ValueError(f"Artifact is missing arrays: {sorted(missing)}")
+
+    ensemble = ENSEMBLE_KINDS[kind](
+        {name: arrays[name] for name in ARRAY_DTYPES},
+        manifest["max_depth"],
+        manifest["n_features"],
+        scale=manifest["scale"],
+        offset=manifest["offset"],
+    )
+    scaler = ArrayScaler(arrays["scaler_mean"], arrays["scaler_scale"])
+    return ModelArtifact(ensemble, scaler, manifest.get("metadata", {}), manifest)
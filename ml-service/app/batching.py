@@ -0,0 +1,131 @@
+"""
+CAPSTACK Micro-batching - Coalesce concurrent single-row predictions
+Requests are queued on an asyncio queue and flushed to a model's
+predict_batch as one matrix when the batch fills or the wait budget expires
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .metrics import BATCH_SIZE_BUCKETS, HistogramFamily
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "64"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "2"))
+
+PredictBatch = Callable[[Sequence[Any]], Tuple[np.ndarray, Dict[int, str]]]
+
+BATCH_SIZES = HistogramFamily(
+    "batch_size", "Rows per flushed micro-batch", ("model",), BATCH_SIZE_BUCKETS
+)
+QUEUE_WAIT = HistogramFamily(
+    "batch_queue_wait_seconds", "Time from enqueue to batch start", ("model",)
+)
+
+
+class MicroBatcher:
+    """
+    Queue single-row predictions and evaluate them together.
+
+    A flush happens when `max_batch_size` rows are waiting or `max_wait_ms`
+    has passed since the first row of the batch arrived. The batch runs in
+    the default executor so the event loop keeps accepting requests; rows
+    arriving meanwhile form the next batch. Set max_batch_size=1 or
+    max_wait_ms=0 to effectively disable coalescing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        predict_batch: PredictBatch,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ):
+        self.name = name
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.batch_sizes = BATCH_SIZES.labels(name)
+        self.queue_wait = QUEUE_WAIT.labels(name)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self):
+        """Start (or restart on a new event loop) the background flusher"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, row: Any) -> float:
+        """
+        Predict one row as part of the next batch.
+
+        Raises ValueError with the model's message when the row is rejected.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Wait for the first row, then gather more until full or timed out"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait.observe(started - enqueued)
+
+            rows = [row for row, _, _ in batch]
+            try:
+                values, errors = await self._loop.run_in_executor(
+                    None, self.predict_batch, rows
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("%s batch of %d failed: %s", self.name, len(rows), e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for index, (_, future, _) in enumerate(batch):
+                if future.done():
+                    continue
+                if index in errors:
+                    future.set_exception(ValueError(errors[index]))
+                else:
+                    future.set_result(float(values[index]))
+
+    def stats(self) -> Dict[str, Any]:
+        """Configured limits plus batch-size and queue-wait histograms"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
@@ -0,0 +1,301 @@
+"""
+CAPSTACK Prediction Cache - Bounded memoization of model predictions
+Keys combine the model name, version and revision with quantized input
+features; entries expire after a TTL and are evicted LRU-first once the
+entry or byte budget is reached. An optional shared backend (Redis) lets
+several workers reuse each other's results.
+"""
+
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import FunctionFamily
+from .startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[Hashable, ...]
+
+
+def quantize(value: Any, digits: int) -> Any:
+    """Round numbers to `digits` significant digits; leave other values"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value if isinstance(value, Hashable) else repr(value)
+    if not math.isfinite(value) or value == 0:
+        return float(value)
+    return float(f"{value:.{digits}g}")
+
+
+class LocalCache:
+    """
+    Thread-safe LRU cache with a TTL and entry/byte budgets.
+
+    Entry sizes are estimated with sys.getsizeof on the key, its parts and
+    the value, which is close enough to keep the process footprint bounded.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_size(key: CacheKey, value: float) -> int:
+        return (
+            sys.getsizeof(key)
+            + sum(sys.getsizeof(part) for part in key)
+            + sys.getsizeof(value)
+        )
+
+    def _remove(self, key: CacheKey):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: CacheKey) -> Optional[float]:
+        """Cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: CacheKey, value: float):
+        """Store a value, evicting least recently used entries as needed"""
+        size = self._entry_size(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, model_name: str) -> int:
+        """Drop every entry for a model; returns how many were removed"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == model_name]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Estimated bytes held by cached entries"""
+        return self._bytes
+
+
+class SharedCache:
+    """
+    Cache shared between workers through a Redis-compatible client.
+
+    Only `get(name)` and `set(name, value, ex=seconds)` are used, so tests
+    can pass InMemoryStore instead of a Redis connection. Stale model
+    revisions are never read again because the revision is part of the
+    key; their entries simply expire.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "capstack:prediction:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _name(self, key: CacheKey) -> str:
+        return self.prefix + json.dumps(key, separators=(",", ":"), default=repr)
+
+    def get(self, key: CacheKey) -> Optional[float]:
+        """Cached value, or None when missing"""
+        raw = self.client.get(self._name(key))
+        return None if raw is None else float(raw)
+
+    def set(self, key: CacheKey, value: float):
+        """Store a value with the configured TTL"""
+        self.client.set(self._name(key), repr(float(value)), ex=max(1, int(self.ttl)))
+
+
+class InMemoryStore:
+    """Local stand-in for the subset of the Redis client SharedCache uses"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._data[name]
+                return None
+            return entry[0]
+
+    def set(self, name: str, value: str, ex: Optional[int] = None):
+        expires = time.monotonic() + ex if ex else math.inf
+        with self._lock:
+            self._data[name] = (value, expires)
+
+
+class PredictionCache:
+    """
+    Local LRU cache optionally backed by a shared cache.
+
+    Lookups try the local cache first, then the shared one (copying hits
+    into the local cache). A cache with max_entries=0 is disabled.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 300.0,
+        digits: int = 6,
+        shared: Optional[SharedCache] = None,
+    ):
+        self.enabled = max_entries > 0
+        self.digits = digits
+        self.local = LocalCache(max_entries, max_bytes, ttl)
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, model, data: Dict[str, Any]) -> CacheKey:
+        """Key for a model input: name, version, revision, quantized fields"""
+        return (
+            model.CACHE_NAME,
+            model.metadata.get("version"),
+            model.revision,
+        ) + tuple(quantize(data.get(field), self.digits) for field in model.KEY_FIELDS)
+
+    def get(self, key: CacheKey) -> Optional[float]:
+        """Cached prediction, or None on a miss"""
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("Shared cache read failed: %s", str(e))
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: CacheKey, value: float):
+        """Store a prediction locally and in the shared cache"""
+        if not self.enabled:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("Shared cache write failed: %s", str(e))
+
+    def invalidate(self, model_name: str):
+        """Forget local entries for a reloaded model"""
+        removed = self.local.invalidate(model_name)
+        if removed:
+            logger.info("Invalidated %d cached %s predictions", removed, model_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "entries": len(self.local),
+            "bytes": self.local.size_bytes,
+            "shared": self.shared is not None,
+        }
+
+
+def cache_from_env() -> PredictionCache:
+    """Build the process-wide cache from ML_CACHE_* environment variables"""
+    ttl = float(os.getenv("ML_CACHE_TTL_SECONDS", "300"))
+    shared = None
+    redis_url = os.getenv("ML_CACHE_REDIS_URL")
+    if redis_url:
+        try:
+            client = lazy_import("redis").Redis.from_url(redis_url)
+            shared = SharedCache(client, ttl)
+        except ImportError:
+            logger.warning("ML_CACHE_REDIS_URL is set but redis is not installed")
+    return PredictionCache(
+        max_entries=int(os.getenv("ML_CACHE_MAX_ENTRIES", "10000")),
+        max_bytes=int(os.getenv("ML_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        ttl=ttl,
+        digits=int(os.getenv("ML_CACHE_SIG_DIGITS", "6")),
+        shared=shared,
+    )
+
+
+PREDICTION_CACHE = cache_from_env()
+
+FunctionFamily(
+    "prediction_cache_events_total",
+    "Prediction cache lookups and removals by outcome",
+    ("event",),
+    "counter",
+    lambda: [
+        ((event,), PREDICTION_CACHE.stats()[event])
+        for event in ("hits", "shared_hits", "misses", "evictions", "expirations")
+    ],
+)
+FunctionFamily(
+    "prediction_cache_entries",
+    "Entries held in the local prediction cache",
+    (),
+    "gauge",
+    lambda: [((), len(PREDICTION_CACHE.local))],
+)
+
+
+def cached_prediction(method):
+    """Serve a model's single-row predict() from PREDICTION_CACHE"""
+
+    @functools.wraps(method)
+    def wrapper(self, data):
+        key = PREDICTION_CACHE.key(self, data)
+        value = PREDICTION_CACHE.get(key)
+        if value is None:
+            value = method(self, data)
+            PREDICTION_CACHE.set(key, value)
+        return value
+
+    return wrapper
@@ -0,0 +1,274 @@
+"""
+CAPSTACK Cohort Simulation - Nightly Monte Carlo projections for every user
+All users are simulated together as one (months, users, simulations)
+workload: users are split into contiguous shards across a process pool and
+each shard is evaluated in chunks that fit a memory budget. Every user sees
+the same shocks, so results do not depend on sharding or chunk sizes.
+Per-user survival and final net worth percentiles are written as one .npy
+file per column, next to a manifest with the run's throughput
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .core import monte_carlo
+from .threads import available_cpus
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+PROFILE_COLUMNS = ("user_id", "monthly_income", "monthly_expenses", "emergency_fund", "debt")
+DEFAULT_MEMORY_MB = 512
+
+# Profiles with their total outstanding debt; mirrors the backend schema
+PROFILE_QUERY = """
+    SELECT p.user_id, p.monthly_income, p.monthly_expenses,
+           COALESCE(p.emergency_fund, 0), COALESCE(SUM(d.outstanding_amount), 0)
+    FROM user_profiles p
+    LEFT JOIN debts d ON d.user_id = p.user_id
+    GROUP BY p.user_id
+    ORDER BY p.user_id
+"""
+PROFILE_QUERY_NO_DEBTS = """
+    SELECT user_id, monthly_income, monthly_expenses, COALESCE(emergency_fund, 0), 0
+    FROM user_profiles
+    ORDER BY user_id
+"""
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def _columns(rows) -> Dict[str, np.ndarray]:
+    data = np.array(rows, dtype=float).reshape(-1, len(PROFILE_COLUMNS))
+    profiles = {name: data[:, i] for i, name in enumerate(PROFILE_COLUMNS)}
+    profiles["user_id"] = profiles["user_id"].astype(np.int64)
+    return profiles
+
+
+def load_profiles_sqlite(path) -> Dict[str, np.ndarray]:
+    """
+    Profiles from a SQLite stand-in for the backend's user_profiles table.
+
+    Debt is the sum of outstanding_amount in `debts` when that table
+    exists, else zero. Missing income or expenses count as zero.
+    """
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+        tables = {name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        query = PROFILE_QUERY if "debts" in tables else PROFILE_QUERY_NO_DEBTS
+        rows = [
+            [0.0 if value is None else value for value in row]
+            for row in connection.execute(query)
+        ]
+    return _columns(rows)
+
+
+def load_profiles_csv(path) -> Dict[str, np.ndarray]:
+    """
+    Profiles from a CSV file with a header row.
+
+    user_id, monthly_income and monthly_expenses are required;
+    emergency_fund and debt default to zero.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        missing = {"user_id", "monthly_income", "monthly_expenses"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(sorted(missing))}")
+        rows = [
+            [float(row.get(name) or 0) for name in PROFILE_COLUMNS]
+            for row in reader
+        ]
+    return _columns(rows)
+
+
+def load_profiles(path) -> Dict[str, np.ndarray]:
+    """Profiles from a .csv file, otherwise from a SQLite database"""
+    if Path(path).suffix.lower() == ".csv":
+        return load_profiles_csv(path)
+    return load_profiles_sqlite(path)
+
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def _simulate_shard(income, expenses, savings, debt, params, years, n_simulations, seed,
+                    memory_bytes):
+    return monte_carlo.batch_statistics(
+        income, expenses, savings, debt, params, years, n_simulations,
+        seed=seed, memory_bytes=memory_bytes,
+    )
+
+
+def simulate_cohort(
+    profiles: Dict[str, np.ndarray],
+    params: Dict[str, float],
+    years: int = 10,
+    n_simulations: int = 1000,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+) -> Dict[str, np.ndarray]:
+    """
+    Per-user survival probability, mean and percentile final net worth.
+
+    Users are split into one contiguous shard per worker (default: one per
+    available CPU), and `memory_mb` is shared between the workers.
+    """
+    n_users = len(profiles["user_id"])
+    workers = max(1, min(workers or available_cpus(), n_users or 1))
+    memory_bytes = memory_mb * 1024 * 1024 // workers
+    bounds = np.linspace(0, n_users, workers + 1).astype(int)
+    jobs = [
+        (
+            profiles["monthly_income"][start:stop],
+            profiles["monthly_expenses"][start:stop],
+            profiles["emergency_fund"][start:stop],
+            profiles["debt"][start:stop],
+            params, years, n_simulations, seed, memory_bytes,
+        )
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+    if workers == 1:
+        shards = [_simulate_shard(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_simulate_shard, *zip(*jobs)))
+
+    bands = np.concatenate([shard["bands"] for shard in shards], axis=1)
+    result = {
+        "user_id": profiles["user_id"],
+        "survival_probability": np.concatenate(
+            [shard["survival_probability"] for shard in shards]
+        ),
+        "mean": np.concatenate([shard["final_mean"] for shard in shards]),
+    }
+    for i, percentile in enumerate(monte_carlo.PERCENTILES):
+        result[f"p{percentile}"] = bands[i]
+    return result
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def write_results(results: Dict[str, np.ndarray], path, metadata: Dict[str, Any]) -> Path:
+    """
+    Write each result column to `<path>/<column>.npy` plus a manifest.
+
+    The directory is built alongside and renamed into place, replacing a
+    previous run, so readers never see a partial report.
+    """
+    path = Path(path)
+    building = path.parent / f".{path.name}.{os.getpid()}"
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+    try:
+        for name, column in results.items():
+            np.save(building / f"{name}.npy", column)
+        manifest = dict(metadata, users=len(results["user_id"]), columns=list(results))
+        (building / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, default=str))
+        shutil.rmtree(path, ignore_errors=True)
+        building.rename(path)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    return path
+
+
+def read_results(path) -> Dict[str, np.ndarray]:
+    """Result columns of a report written by write_results, memory-mapped"""
+    path = Path(path)
+    manifest = json.loads((path / MANIFEST_NAME).read_text())
+    return {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in manifest["columns"]}
+
+
+def run(
+    source,
+    output,
+    scenarios: Optional[Dict[str, Any]] = None,
+    risk_tolerance: str = "medium",
+    years: int = 10,
+    n_simulations: int = 1000,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    memory_mb: int = DEFAULT_MEMORY_MB,
+) -> Dict[str, Any]:
+    """Load profiles, simulate the cohort and write the report; returns its manifest"""
+    scenarios = scenarios or {}
+    params = monte_carlo.parse_scenarios(scenarios, risk_tolerance)
+    profiles = load_profiles(source)
+
+    started = time.perf_counter()
+    results = simulate_cohort(
+        profiles, params, years=years, n_simulations=n_simulations, seed=seed,
+        workers=workers, memory_mb=memory_mb,
+    )
+    elapsed = time.perf_counter() - started
+    n_users = len(profiles["user_id"])
+    throughput = n_users * n_simulations / elapsed if elapsed > 0 else 0.0
+
+    metadata = {
+        "source": str(source),
+        "scenarios": scenarios,
+        "risk_tolerance": risk_tolerance,
+        "years": years,
+        "simulations": n_simulations,
+        "seed": seed,
+        "elapsed_seconds": round(elapsed, 3),
+        "user_simulations_per_second": round(throughput, 1),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    write_results(results, output, metadata)
+    logger.info("Simulated %d users x %d paths in %.2fs (%.0f user-simulations/s) -> %s",
+                n_users, n_simulations, elapsed, throughput, output)
+    return dict(metadata, users=n_users, columns=list(results))
+
+
+def main(argv=None):
+    """Run the cohort simulation from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="SQLite database with user_profiles, or a .csv file")
+    parser.add_argument("output", help="Report directory (replaced if it exists)")
+    parser.add_argument("--scenarios", type=json.loads, default={},
+                        help="What-if scenarios as JSON, as in /what-if/simulate")
+    parser.add_argument("--risk-tolerance", choices=sorted(monte_carlo.RETURN_ASSUMPTIONS),
+                        default="medium")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--simulations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--memory-mb", type=int,
+        default=int(os.getenv("ML_COHORT_MEMORY_MB", str(DEFAULT_MEMORY_MB))),
+        help="Working-set budget shared by all workers (env ML_COHORT_MEMORY_MB)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    manifest = run(
+        args.source, args.output, scenarios=args.scenarios,
+        risk_tolerance=args.risk_tolerance, years=args.years,
+        n_simulations=args.simulations, seed=args.seed,
+        workers=args.workers, memory_mb=args.memory_mb,
+    )
+    print(json.dumps(manifest, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
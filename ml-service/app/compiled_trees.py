@@ -0,0 +1,251 @@
+"""
+CAPSTACK Compiled Tree Ensembles - Array-backed inference for tree models
+Flattens trained RandomForest, GradientBoosting and XGBoost ensembles into
+contiguous node arrays evaluated with vectorized traversal
+"""
+
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+LEAF = -1
+
+
+def _round_down_float32(threshold: np.ndarray) -> np.ndarray:
+    """
+    Largest float32 <= each threshold.
+
+    For float32 inputs x, `x <= result` then agrees exactly with
+    `x <= threshold`, so the compiled trees branch like the originals.
+    """
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+ARRAY_DTYPES = {
+    "feature": np.int32,
+    "threshold": np.float32,
+    "left": np.int32,
+    "right": np.int32,
+    "value": np.float32,
+    "roots": np.int32,
+}
+
+
+def flatten_trees(trees: List[Tuple[np.ndarray, ...]]) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Concatenate per-tree node arrays into one set of ensemble arrays.
+
+    Each tree is (feature, threshold, left, right, value, depth). Leaves are
+    rewritten to branch to themselves. Returns the arrays keyed as in
+    ARRAY_DTYPES and the maximum depth.
+    """
+    columns: Dict[str, list] = {name: [] for name in ARRAY_DTYPES}
+    max_depth = 0
+    base = 0
+    for feature, threshold, left, right, value, depth in trees:
+        n_nodes = len(feature)
+        leaf = left == LEAF
+        node_ids = np.arange(n_nodes)
+        columns["feature"].append(np.where(leaf, 0, feature))
+        columns["threshold"].append(np.where(leaf, np.float32(np.inf), threshold))
+        columns["left"].append(np.where(leaf, node_ids, left) + base)
+        columns["right"].append(np.where(leaf, node_ids, right) + base)
+        columns["value"].append(value)
+        columns["roots"].append([base])
+        max_depth = max(max_depth, depth)
+        base += n_nodes
+
+    arrays = {
+        name: np.concatenate(columns[name]).astype(dtype)
+        for name, dtype in ARRAY_DTYPES.items()
+    }
+    return arrays, max_depth
+
+
+class CompiledTreeEnsemble:
+    """
+    Tree ensemble stored as flat node arrays.
+
+    All trees share one set of arrays; leaves branch to themselves, so a
+    fixed number of vectorized steps (the maximum depth) moves every
+    (row, tree) pair to its leaf. The raw output is
+    `offset + scale * sum(leaf values)`. Arrays may be read-only memory maps.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        max_depth: int,
+        n_features: int,
+        scale: float = 1.0,
+        offset: float = 0.0,
+    ):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.scale = scale
+        self.offset = offset
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Node arrays keyed as in ARRAY_DTYPES"""
+        return {name: getattr(self, name) for name in ARRAY_DTYPES}
+
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the ensemble"""
+        return len(self.roots)
+
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        """Evaluate every tree on every row and combine leaf values"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected input with {self.n_features} features, "
+                f"got shape {X.shape}"
+            )
+        flat = X.ravel()
+        row_offset = (np.arange(len(X), dtype=np.int64) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.max_depth):
+            go_left = flat[row_offset + self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        total = self.value[node].sum(axis=1, dtype=np.float64)
+        return self.offset + self.scale * total
+
+
+class CompiledRegressor(CompiledTreeEnsemble):
+    """Compiled stand-in for a tree ensemble regressor"""
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict regression targets"""
+        return self.raw_predict(X)
+
+
+class CompiledBinaryClassifier(CompiledTreeEnsemble):
+    """Compiled stand-in for a binary gradient boosting classifier"""
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predict class probabilities using the logistic link"""
+        positive = 1.0 / (1.0 + np.exp(-self.raw_predict(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict class labels"""
+        return (self.raw_predict(X) > 0).astype(int)
+
+
+def _sklearn_tree(estimator):
+    """Node arrays for a fitted sklearn decision tree"""
+    tree = estimator.tree_
+    if tree.value.shape[1] != 1 or tree.value.shape[2] != 1:
+        raise ValueError("Only single-output trees can be compiled")
+    return (
+        tree.feature,
+        _round_down_float32(tree.threshold),
+        tree.children_left,
+        tree.children_right,
+        tree.value[:, 0, 0],
+        tree.max_depth,
+    )
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Depth of a tree given child index arrays"""
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != LEAF:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def _compile_random_forest(model) -> CompiledRegressor:
+    trees = [_sklearn_tree(estimator) for estimator in model.estimators_]
+    return CompiledRegressor(
+        *flatten_trees(trees), model.n_features_in_, scale=1.0 / len(trees)
+    )
+
+
+def _compile_gradient_boosting(model) -> CompiledBinaryClassifier:
+    from sklearn.dummy import DummyClassifier  # type: ignore
+
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only binary gradient boosting can be compiled")
+    if model.loss not in ("log_loss", "deviance"):
+        raise ValueError(f"Unsupported gradient boosting loss: {model.loss}")
+    if model.init_ != "zero" and not isinstance(model.init_, DummyClassifier):
+        raise ValueError("Only constant init estimators can be compiled")
+
+    n_features = model.n_features_in_
+    offset = float(model._raw_predict_init(  # pylint: disable=protected-access
+        np.zeros((1, n_features))
+    )[0, 0])
+    trees = [_sklearn_tree(estimator) for estimator in model.estimators_[:, 0]]
+    return CompiledBinaryClassifier(
+        *flatten_trees(trees), n_features, scale=model.learning_rate, offset=offset
+    )
+
+
+def _compile_xgboost(model) -> CompiledRegressor:
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    if learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(
+            f"Unsupported XGBoost objective: {learner['objective']['name']}"
+        )
+    gbtree = learner["gradient_booster"]["model"]
+    trees_json = gbtree["trees"]
+    try:
+        best_iteration = model.best_iteration
+        per_round = int(gbtree["gbtree_model_param"]["num_parallel_tree"])
+        trees_json = trees_json[:(best_iteration + 1) * per_round]
+    except AttributeError:
+        pass
+
+    trees = []
+    for tree in trees_json:
+        left = np.array(tree["left_children"], dtype=np.int64)
+        right = np.array(tree["right_children"], dtype=np.int64)
+        conditions = np.array(tree["split_conditions"], dtype=np.float32)
+        leaf = left == LEAF
+        # XGBoost sends x < condition left; rewrite as x <= threshold
+        threshold = np.nextafter(conditions, np.float32(-np.inf))
+        trees.append((
+            np.array(tree["split_indices"], dtype=np.int64),
+            threshold,
+            left,
+            right,
+            np.where(leaf, conditions, 0),
+            _tree_depth(left, right),
+        ))
+    base_score = float(learner["learner_model_param"]["base_score"])
+    n_features = int(learner["learner_model_param"]["num_feature"])
+    return CompiledRegressor(*flatten_trees(trees), n_features, offset=base_score)
+
+
+def compile_ensemble(model) -> CompiledTreeEnsemble:
+    """
+    Compile a fitted tree ensemble into array form.
+
+    Supports RandomForestRegressor, binary GradientBoostingClassifier with
+    log loss, and XGBRegressor with squared error. Raises ValueError for
+    anything else so callers can keep the native estimator.
+    """
+    name = type(model).__name__
+    if name == "RandomForestRegressor":
+        return _compile_random_forest(model)
+    if name == "GradientBoostingClassifier":
+        return _compile_gradient_boosting(model)
+    if name == "XGBRegressor":
+        return _compile_xgboost(model)
+    raise ValueError(f"Cannot compile estimator of type {name}")
@@ -1,17 +1,42 @@
-# TODO: Implement feature engineering for ML models
-# Extract and transform features from raw financial data
+# Feature engineering helpers for the app/core scoring functions
+# Built on the same pipeline the risk model trains and serves with
+
+import numpy as np
+
+from ..features import RISK_FEATURES
+
+# extract_features key -> (RISK_FEATURES feature, value without positive income)
+RATIO_FEATURES = {
+    'expense_ratio': ('expense_to_income', 1.0),
+    'savings_ratio': ('savings_to_income', 0.0),
+    'debt_ratio': ('debt_to_income', 1.0),
+    'net_income': ('disposable_income', None),
+}
+
 
 def extract_features(income, expenses, savings, debt):
     """
     Extract features for risk scoring and predictions.
-    """
-    expense_ratio = expenses / income if income > 0 else 1
-    savings_ratio = savings / income if income > 0 else 0
-    debt_ratio = debt / income if income > 0 else 1
 
-    return {
-        'expense_ratio': expense_ratio,
-        'savings_ratio': savings_ratio,
-        'debt_ratio': debt_ratio,
-        'net_income': income - expenses
-    }
\ No newline at end of file
+    Values are taken from the risk model's feature pipeline by name.
+    Accepts scalars (returns floats) or equal-length arrays (returns arrays).
+    Without positive income the expense and debt ratios are 1 and the
+    savings ratio is 0, as the rule-based scores expect.
+    """
+    income, expenses, savings, debt = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (income, expenses, savings, debt))
+    )
+    matrix = RISK_FEATURES.transform({
+        'income': np.atleast_1d(income),
+        'expenses': np.atleast_1d(expenses),
+        'savings': np.atleast_1d(savings),
+        'debt': np.atleast_1d(debt),
+    })
+    positive = np.atleast_1d(income) > 0
+    features = {}
+    for name, (feature, fallback) in RATIO_FEATURES.items():
+        values = matrix[:, RISK_FEATURES.feature_names.index(feature)]
+        features[name] = values if fallback is None else np.where(positive, values, fallback)
+    if income.ndim == 0:
+        return {name: float(values[0]) for name, values in features.items()}
+    return features
@@ -0,0 +1,624 @@
+# Vectorized Monte Carlo engine for what-if net worth projections
+# Every simulation path is evaluated together; arrays are laid out time-major
+# as (months, *batch, simulations) so each monthly step is one contiguous op
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+MONTHS_PER_YEAR = 12
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Annual (mean, volatility) of investment returns per risk tolerance
+RETURN_ASSUMPTIONS = {
+    'low': (0.05, 0.06),
+    'medium': (0.07, 0.12),
+    'high': (0.09, 0.18),
+}
+
+
+def parse_scenarios(scenarios: Dict[str, Any], risk_tolerance: str = 'medium'):
+    """
+    Turn the request's scenario dict into flat simulation parameters.
+
+    Probabilities are per year. Missing scenarios are disabled, except the
+    investment return, which defaults to the risk tolerance assumptions.
+    """
+    def section(name):
+        value = scenarios.get(name) or {}
+        if not isinstance(value, dict):
+            raise ValueError(f"Scenario '{name}' must be an object")
+        return value
+
+    def number(params, key, default, low, high, name):
+        value = params.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name}.{key} must be a number")
+        if not np.isfinite(value) or value < low or value > high:
+            raise ValueError(f"{name}.{key} must be between {low} and {high}")
+        return float(value)
+
+    job_loss = section('job_loss')
+    raise_ = section('raise')
+    expense = section('expense_increase')
+    returns = section('investment_return')
+    mean, volatility = RETURN_ASSUMPTIONS.get(risk_tolerance, RETURN_ASSUMPTIONS['medium'])
+
+    return {
+        'job_loss_probability': number(job_loss, 'probability', 0.0, 0, 1, 'job_loss'),
+        'job_loss_duration_months': number(
+            job_loss, 'duration_months', 6, 1, MONTHS_PER_YEAR, 'job_loss'
+        ),
+        'income_replacement': number(job_loss, 'income_replacement', 0.0, 0, 1, 'job_loss'),
+        'raise_percentage': number(raise_, 'percentage', 0.0, -1, 10, 'raise'),
+        'raise_probability': number(
+            raise_, 'probability', 1.0 if raise_ else 0.0, 0, 1, 'raise'
+        ),
+        'expense_increase_percentage': number(
+            expense, 'percentage', 0.0, -1, 10, 'expense_increase'
+        ),
+        'expense_increase_probability': number(
+            expense, 'probability', 1.0 if expense else 0.0, 0, 1, 'expense_increase'
+        ),
+        'return_mean': number(returns, 'mean', mean, -1, 1, 'investment_return'),
+        'return_volatility': number(returns, 'volatility', volatility, 0, 2, 'investment_return'),
+    }
+
+
+def draw_random_inputs(n_simulations, n_years, rng):
+    """
+    Draw the parameter-free random inputs for a simulation, each (years, sims).
+
+    Keeping the draws separate from the scenario parameters lets callers
+    reuse one set of shocks (common random numbers) across many parameter
+    values. Investment returns are drawn once per year and compounded
+    evenly across its months. The uniform draws are only compared against
+    probabilities or scaled to a start month, so single precision suffices.
+    """
+    shape = (n_years, n_simulations)
+    return {
+        'job_loss': rng.random(shape, dtype=np.float32),
+        'job_loss_start': rng.random(shape, dtype=np.float32),
+        'raise': rng.random(shape, dtype=np.float32),
+        'expense_increase': rng.random(shape, dtype=np.float32),
+        'returns': rng.standard_normal(shape),
+    }
+
+
+def _batch_param(value, batch_ndim):
+    """Reshape a scalar or batch-shaped parameter to broadcast as (*batch, sims)"""
+    value = np.asarray(value, dtype=float)
+    return value.reshape(value.shape + (1,) * (batch_ndim + 1 - value.ndim))
+
+
+def _batch_input(draws, batch_ndim):
+    """Insert missing batch axes between the time and simulation axes of a draw"""
+    missing = batch_ndim - (draws.ndim - 2)
+    return draws.reshape(draws.shape[:1] + (1,) * missing + draws.shape[1:])
+
+
+def _annual_multiplier(draws, probability, percentage):
+    """Cumulative (years, *batch, sims) multiplier; year one is unchanged"""
+    multiplier = np.empty(np.broadcast_shapes(draws.shape, probability.shape, percentage.shape))
+    multiplier[0] = 1.0
+    np.cumprod(1.0 + percentage * (draws[1:] < probability), axis=0, out=multiplier[1:])
+    return multiplier
+
+
+# Start month of years without a job loss; offsets from it stay within int8
+NO_EVENT_START = -100
+
+
+def _unemployment_mask(events, start_draws, duration, batch_ndim):
+    """
+    Boolean (years, 12, *batch, sims) mask of unemployed months.
+
+    Each year has at most one job loss event, starting in a uniformly drawn
+    month and lasting `duration` whole months (at most 12), so a month can
+    only be covered by an event from its own year or the previous one.
+    Month offsets are computed as wrapped uint8 values, so one comparison
+    against the duration covers both ends of the interval. Years without an
+    event start far in the past (NO_EVENT_START), which puts every offset
+    beyond any duration without a separate pass over the event flags.
+    """
+    start = np.where(events, start_draws * MONTHS_PER_YEAR, NO_EVENT_START).astype(np.int8)
+    duration = np.rint(duration).astype(np.uint8)
+    month = np.arange(MONTHS_PER_YEAR, dtype=np.int8).reshape(
+        (-1,) + (1,) * (batch_ndim + 1)
+    )
+
+    mask = (month - start[:, None]).view(np.uint8) < duration
+    mask[1:] |= (month + np.int8(MONTHS_PER_YEAR) - start[:-1, None]).view(np.uint8) < duration
+    return mask
+
+
+def build_cash_flows(inputs, params, income, expenses):
+    """
+    Cash flow components and growth factors for every path.
+
+    Parameters (including income and expenses) may be scalars or arrays of
+    a common batch shape, e.g. grid points or users, and the draws may
+    carry trailing batch axes of their own (e.g. one per QMC replicate),
+    which parameters broadcast against. Yearly components are
+    (years, *batch, sims); the unemployment mask is (months, *batch, sims).
+    Monthly cash flows are never materialized, which keeps the dominant cost
+    at a single pass over the months in `accumulate_yearly`.
+    """
+    batch_ndim = max(
+        [np.ndim(v) for v in list(params.values()) + [income, expenses]]
+        + [draws.ndim - 2 for draws in inputs.values()]
+    )
+
+    def p(name):
+        return _batch_param(params[name], batch_ndim)
+
+    def draws(name):
+        return _batch_input(inputs[name], batch_ndim)
+
+    income_path = _batch_param(income, batch_ndim) * _annual_multiplier(
+        draws('raise'), p('raise_probability'), p('raise_percentage')
+    )
+    expense_path = _batch_param(expenses, batch_ndim) * _annual_multiplier(
+        draws('expense_increase'),
+        p('expense_increase_probability'),
+        p('expense_increase_percentage'),
+    )
+    unemployed = _unemployment_mask(
+        draws('job_loss') < p('job_loss_probability'),
+        draws('job_loss_start'),
+        p('job_loss_duration_months'),
+        batch_ndim,
+    )
+    growth = np.maximum(p('return_mean') + p('return_volatility') * draws('returns'), -0.95)
+    # Monthly compounding factor (1 + annual return) ** (1 / 12), in place
+    np.log1p(growth, out=growth)
+    growth /= MONTHS_PER_YEAR
+    np.exp(growth, out=growth)
+    return {
+        'employed': income_path - expense_path,
+        'income_lost': income_path * (1.0 - p('income_replacement')),
+        'unemployed': unemployed.reshape((-1,) + unemployed.shape[2:]),
+        'growth': growth,
+    }
+
+
+def accumulate_yearly(start_balance, flows):
+    """
+    Year-end balances (years, *batch, sims) and each path's lowest balance.
+
+    Applies B[t] = B[t-1] * growth + net cash flow one month at a time,
+    each step vectorized over every path. A year's twelve monthly net
+    flows are built in one op from the unemployment mask, so each month is
+    three plain ufuncs (a masked `where=` subtract is several times
+    slower), and only the current month's balances are kept. Whole-array
+    cumprod/cumsum forms of the recurrence stream (months, sims)
+    temporaries through memory and measured about 3x slower.
+    """
+    employed = flows['employed']
+    income_lost = flows['income_lost']
+    growth = flows['growth']
+    unemployed = flows['unemployed']
+    batch = np.broadcast_shapes(unemployed.shape[1:], employed.shape[1:], growth.shape[1:])
+    n_years = unemployed.shape[0] // MONTHS_PER_YEAR
+
+    yearly = np.empty((n_years,) + batch)
+    lowest = np.full(batch, np.inf)
+    balance = np.empty(batch)
+    balance[...] = _batch_param(start_balance, len(batch) - 1)
+    for year in range(n_years):
+        months = unemployed[year * MONTHS_PER_YEAR:(year + 1) * MONTHS_PER_YEAR]
+        net_flows = employed[year] - months * income_lost[year]
+        for net_flow in net_flows:
+            balance *= growth[year]
+            balance += net_flow
+            np.minimum(lowest, balance, out=lowest)
+        yearly[year] = balance
+    return yearly, lowest
+
+
+def summarize(yearly, lowest, debt=0.0, percentiles=PERCENTILES):
+    """
+    Percentile bands per year plus survival and final net worth statistics.
+
+    Takes the output of `accumulate_yearly`. Survival is the share of paths
+    whose liquid balance never goes negative. Net worth is liquid balance
+    minus (constant) debt. Bands have shape (len(percentiles), years, *batch).
+    """
+    net_worth = yearly - _batch_param(debt, yearly.ndim - 2)
+    mean = net_worth.mean(axis=-1)
+    # net_worth is a private copy, so the percentiles may partition it in place
+    bands = np.percentile(net_worth, percentiles, axis=-1, overwrite_input=True)
+    return {
+        'bands': bands,
+        'mean': mean,
+        'survival_probability': (lowest >= 0).mean(axis=-1),
+        'final_mean': mean[-1],
+        'final_median': bands[percentiles.index(50), -1],
+        'final_worst': bands[0, -1],
+        'final_best': bands[-1, -1],
+    }
+
+
+def simulate(
+    income,
+    expenses,
+    savings,
+    debt,
+    params,
+    years,
+    n_simulations,
+    seed: Optional[int] = None,
+):
+    """
+    Run a full what-if simulation and return its summary statistics.
+
+    The same seed always reproduces the same paths.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = draw_random_inputs(n_simulations, years, rng)
+    flows = build_cash_flows(inputs, params, income, expenses)
+    return summarize(*accumulate_yearly(savings, flows), debt)
+
+
+# Variance-reduced sampling: randomized quasi-Monte Carlo with antithetic
+# pairs, a control variate for means and adaptive stopping
+
+# Independently randomized copies of one Sobol sequence; their spread gives
+# the confidence intervals
+QMC_REPLICATES = 8
+QMC_INITIAL_POINTS = 32
+# Sobol points are multiples of 2 ** -QMC_BITS (scipy's default resolution)
+QMC_BITS = 30
+ADAPTIVE_PERCENTILES = (5, 50, 95)
+# Default CI half-width target; typical profiles reach it within 10k paths
+# even over 30 years, where tighter targets may not converge at all
+ADAPTIVE_TOLERANCE = 0.05
+# Sobol dimensions per simulated year, most important first
+QMC_INPUTS = ('returns', 'job_loss', 'job_loss_start', 'raise', 'expense_increase')
+
+
+def return_rotation(n_years):
+    """
+    Orthonormal DCT-II basis (years, years) whose first column weights every year equally.
+
+    Rotating iid standard normal shocks leaves them iid standard normal,
+    but feeds the total return over the horizon, which dominates final net
+    worth, from the first Sobol dimension and slower trends from the next.
+    QMC is most uniform in its leading dimensions, so this is where most
+    of its variance reduction comes from.
+    """
+    k = np.arange(n_years)
+    basis = np.sqrt(2.0 / n_years) * np.cos(np.pi * (k[:, None] + 0.5) * k / n_years)
+    basis[:, 0] = 1.0 / np.sqrt(n_years)
+    return basis
+
+
+def draw_quasi_random_inputs(engine, shifts, n_points, n_years):
+    """
+    Inputs for 2 * n_points paths per replicate from the next Sobol points.
+
+    Each replicate XORs the points with its own random digital shift
+    (one row of `shifts`), which keeps the net structure and makes the
+    replicates independent and unbiased. Points are centred in their
+    2 ** -QMC_BITS cell, so none is 0 or 1. Every point u yields a path and
+    its antithetic mirror 1 - u, so return shocks come in +z / -z pairs and
+    event draws in u / 1 - u pairs. Arrays are (years, replicates, paths):
+    replicates sit on a batch axis, so they are simulated in one pass.
+    """
+    from scipy import special  # pylint: disable=import-outside-toplevel
+
+    points = (engine.random(n_points) * 2.0 ** QMC_BITS).astype(np.uint64)
+    points = ((points ^ shifts[:, None]) + 0.5) / 2.0 ** QMC_BITS
+    points = np.concatenate([points, 1.0 - points], axis=1)
+    cube = points.reshape(len(shifts), 2 * n_points, len(QMC_INPUTS), n_years)
+    inputs = dict(zip(QMC_INPUTS, cube.transpose(2, 3, 0, 1)))
+    inputs['returns'] = np.tensordot(
+        return_rotation(n_years), special.ndtri(inputs['returns']), axes=1
+    )
+    return inputs
+
+
+def growth_control(inputs, params, income, expenses, savings):
+    """
+    Control variate per path and year, with its exact expectation.
+
+    Savings plus a year's employed cash flow are compounded once per year
+    by the path's (unclipped) annual return. Because years are independent
+    the expected value is the same recursion at the mean return, so
+    E[control] is known in closed form.
+    """
+    growth = 1.0 + params['return_mean'] + params['return_volatility'] * inputs['returns']
+    annual_flow = (income - expenses) * MONTHS_PER_YEAR
+    control = np.empty_like(growth)
+    expected = np.empty(len(growth))
+    previous, previous_expected = float(savings), float(savings)
+    for year in range(len(growth)):
+        control[year] = (previous + annual_flow) * growth[year]
+        expected[year] = (previous_expected + annual_flow) * (1.0 + params['return_mean'])
+        previous, previous_expected = control[year], expected[year]
+    return control, expected
+
+
+def _controlled_mean(values, control, expected):
+    """Mean of values (years, paths) adjusted by a control with known mean"""
+    centered = control - control.mean(axis=-1, keepdims=True)
+    variance = (centered ** 2).mean(axis=-1)
+    covariance = (centered * (values - values.mean(axis=-1, keepdims=True))).mean(axis=-1)
+    beta = np.divide(covariance, variance, out=np.zeros_like(variance), where=variance > 0)
+    return values.mean(axis=-1) - beta * (control.mean(axis=-1) - expected)
+
+
+def simulate_adaptive(
+    income,
+    expenses,
+    savings,
+    debt,
+    params,
+    years,
+    max_paths,
+    tolerance=ADAPTIVE_TOLERANCE,
+    confidence=0.95,
+    seed: Optional[int] = None,
+):
+    """
+    Run a what-if simulation until its final percentiles are precise enough.
+
+    Paths come from QMC_REPLICATES random digital shifts of one Sobol
+    sequence with antithetic pairs, all simulated together; each round
+    doubles the points per replicate.
+    Sampling stops once the confidence-interval half-width of the final 5th,
+    50th and 95th percentile net worth is at most `tolerance` times
+    max(|estimate|, income), or when another round would exceed
+    `max_paths`. Means are adjusted with the growth control variate.
+    Returns the `summarize` statistics plus `paths`, `converged` and the
+    final `half_widths`.
+    """
+    from scipy import stats  # pylint: disable=import-outside-toplevel
+
+    dimensions = len(QMC_INPUTS) * years
+    # Unscrambled: the shifts randomize it, and LMS scrambling per replicate
+    # cost more than the simulation itself at long horizons
+    engine = stats.qmc.Sobol(d=dimensions, scramble=False, bits=QMC_BITS)
+    shifts = np.random.default_rng(seed).integers(
+        0, 2 ** QMC_BITS, size=(QMC_REPLICATES, dimensions), dtype=np.uint64
+    )
+    critical = stats.t.ppf((1 + confidence) / 2, QMC_REPLICATES - 1)
+    # Largest power-of-two first round that fits the path budget
+    points = QMC_INITIAL_POINTS
+    while points > 1 and 2 * points * QMC_REPLICATES > max_paths:
+        points //= 2
+
+    rounds = []
+    drawn = 0
+    while True:
+        inputs = draw_quasi_random_inputs(engine, shifts, points, years)
+        yearly, lowest = accumulate_yearly(
+            savings, build_cash_flows(inputs, params, income, expenses)
+        )
+        control, expected = growth_control(inputs, params, income, expenses, savings)
+        rounds.append((yearly - debt, lowest >= 0, control))
+        drawn += points
+
+        yearly = np.concatenate([part[0] for part in rounds], axis=-1)
+        finals = np.percentile(yearly[-1], ADAPTIVE_PERCENTILES, axis=-1)
+        pooled = np.percentile(yearly[-1], ADAPTIVE_PERCENTILES)
+        half_widths = critical * finals.std(axis=-1, ddof=1) / np.sqrt(QMC_REPLICATES)
+        limits = tolerance * np.maximum(np.abs(pooled), income)
+        converged = bool(np.all(half_widths <= limits))
+        # The next round doubles every replicate: 2 * drawn points, 2 paths each
+        if converged or 4 * drawn * QMC_REPLICATES > max_paths:
+            break
+        points = drawn
+
+    yearly = yearly.reshape(years, -1)
+    survived = np.concatenate([part[1] for part in rounds], axis=-1)
+    controls = np.concatenate([part[2] for part in rounds], axis=-1).reshape(years, -1)
+    bands = np.percentile(yearly, PERCENTILES, axis=-1)
+    mean = _controlled_mean(yearly, controls - debt, expected - debt)
+    return {
+        'bands': bands,
+        'mean': mean,
+        'survival_probability': survived.mean(),
+        'final_mean': mean[-1],
+        'final_median': bands[PERCENTILES.index(50), -1],
+        'final_worst': bands[0, -1],
+        'final_best': bands[-1, -1],
+        'paths': yearly.shape[-1],
+        'converged': converged,
+        'half_widths': dict(zip(ADAPTIVE_PERCENTILES, half_widths.tolist())),
+    }
+
+
+# Goal seeking: the monthly contribution needed to reach a target
+
+def annuity_factors(flows):
+    """
+    Year-end balance of saving 1 every month from zero, shape (years, sims).
+
+    Uses the same return draws as `flows`, so with common random numbers a
+    path's balance under an extra monthly contribution c is exactly its
+    baseline balance plus c times this factor.
+    """
+    growth = flows['growth']
+    yearly = (len(growth),) + (1,) * (growth.ndim - 1)
+    return accumulate_yearly(0.0, {
+        'employed': np.ones(yearly),
+        'income_lost': np.zeros(yearly),
+        'unemployed': np.zeros((len(growth) * MONTHS_PER_YEAR,) + yearly[1:], dtype=bool),
+        'growth': growth,
+    })[0]
+
+
+def goal_seek(
+    income,
+    expenses,
+    savings,
+    debt,
+    params,
+    years,
+    n_simulations,
+    target,
+    probability=0.9,
+    seed: Optional[int] = None,
+    curve_points=21,
+):
+    """
+    Smallest extra monthly saving that reaches `target` net worth after
+    `years` with at least the given probability.
+
+    One set of shocks is drawn and accumulated twice (baseline and a unit
+    contribution). Final net worth is affine in the contribution on every
+    path, so each path's break-even contribution is closed form and the
+    answer is their `probability` quantile; no re-simulation is needed.
+    Returns the contribution (0 if the target is already met), the
+    probability it achieves, the baseline probability and the probability
+    curve over a grid of contributions.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = draw_random_inputs(n_simulations, years, rng)
+    flows = build_cash_flows(inputs, params, income, expenses)
+    final = accumulate_yearly(savings, flows)[0][-1] - debt
+    factor = annuity_factors(flows)[-1]
+
+    break_even = np.sort((target - final) / factor)
+    contribution = max(0.0, float(np.quantile(break_even, probability, method='inverted_cdf')))
+
+    def reached(amounts):
+        return np.searchsorted(break_even, amounts, side='right') / len(break_even)
+
+    upper = max(contribution * 1.5, float(np.quantile(break_even, 0.99)))
+    grid = np.linspace(0.0, upper, curve_points) if upper > 0 else np.zeros(1)
+    return {
+        'contribution': contribution,
+        'probability': float(reached(contribution)),
+        'baseline_probability': float(reached(0.0)),
+        'median_net_worth': float(np.median(final + contribution * factor)),
+        'curve': list(zip(grid.tolist(), reached(grid).tolist())),
+    }
+
+
+# Sensitivity sweeps: many scenario combinations evaluated as one batch
+
+# Flat parameter name -> (scenario section, key) as read by parse_scenarios
+SWEEP_PARAMETERS = {
+    'job_loss_probability': ('job_loss', 'probability'),
+    'job_loss_duration_months': ('job_loss', 'duration_months'),
+    'income_replacement': ('job_loss', 'income_replacement'),
+    'raise_percentage': ('raise', 'percentage'),
+    'raise_probability': ('raise', 'probability'),
+    'expense_increase_percentage': ('expense_increase', 'percentage'),
+    'expense_increase_probability': ('expense_increase', 'probability'),
+    'return_mean': ('investment_return', 'mean'),
+    'return_volatility': ('investment_return', 'volatility'),
+}
+
+
+def _with_overrides(scenarios, overrides):
+    """Copy of a scenario dict with (parameter name, value) pairs applied"""
+    scenario = {key: dict(value) if isinstance(value, dict) else value
+                for key, value in scenarios.items()}
+    for name, value in overrides:
+        section, key = SWEEP_PARAMETERS[name]
+        scenario[section] = dict(scenario.get(section) or {}, **{key: value})
+    return scenario
+
+
+def sweep_params(scenarios, risk_tolerance, axes):
+    """
+    Parameters for every combination of axis values, each shaped like the grid.
+
+    `axes` is a list of (parameter name, values). Each swept parameter is
+    its axis values laid along its own grid axis and every other parameter
+    a scalar, both broadcast (without copying) to the grid shape, so the
+    grid costs one parse per axis value rather than one per cell. Every
+    axis value is parsed in a scenario dict with the sweep's sections set,
+    so values are validated exactly like a single simulation and defaults
+    (e.g. a raise applying every year once a raise percentage is given)
+    behave the same. Raises ValueError for unknown or repeated parameters
+    and invalid values.
+    """
+    names = [name for name, _ in axes]
+    unknown = sorted(set(names) - set(SWEEP_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(unknown)}")
+    if len(set(names)) != len(names):
+        raise ValueError("Each sweep parameter may appear only once")
+
+    shape = tuple(len(values) for _, values in axes)
+    first = [(name, values[0]) for name, values in axes]
+    params = {
+        key: np.broadcast_to(np.float64(value), shape)
+        for key, value in parse_scenarios(_with_overrides(scenarios, first), risk_tolerance).items()
+    }
+    for axis, (name, values) in enumerate(axes):
+        column = [
+            parse_scenarios(
+                _with_overrides(scenarios, first[:axis] + [(name, value)] + first[axis + 1:]),
+                risk_tolerance,
+            )[name]
+            for value in values
+        ]
+        layout = [1] * len(shape)
+        layout[axis] = len(values)
+        params[name] = np.broadcast_to(np.array(column).reshape(layout), shape)
+    return params
+
+
+def batch_statistics(
+    income,
+    expenses,
+    savings,
+    debt,
+    params,
+    years,
+    n_simulations,
+    seed: Optional[int] = None,
+    memory_bytes=256 * 1024 * 1024,
+):
+    """
+    Survival and final net worth for every point of a batch, e.g. grid cells.
+
+    Income, expenses, savings, debt and each parameter may be scalars or
+    arrays of a common batch shape. All points share one set of shocks
+    (common random numbers), so differences between points come from their
+    inputs, not sampling noise, and results do not depend on chunking.
+    The batch is flattened into one axis of the (years, batch, sims) arrays
+    and evaluated in chunks along it only, sized so the balances and the
+    (months, chunk, sims) unemployment mask stay within `memory_bytes`;
+    each chunk is a single vectorized pass over all of its points.
+    Survival is the share of paths solvent in every month of the horizon.
+    Returns the survival probability and the mean and PERCENTILES of final
+    net worth, each shaped like the batch.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = draw_random_inputs(n_simulations, years, rng)
+    values = dict(params, income=income, expenses=expenses, savings=savings, debt=debt)
+    batch_shape = np.broadcast_shapes(*(np.shape(value) for value in values.values()))
+    flat = {key: np.broadcast_to(value, batch_shape).ravel() for key, value in values.items()}
+    n_points = int(np.prod(batch_shape))
+
+    months = years * MONTHS_PER_YEAR
+    # Yearly flows and balances (float64), unemployment mask (bool) and one
+    # year of monthly net flows (float64)
+    per_point = (years * 8 * 4 + months + MONTHS_PER_YEAR * 8) * n_simulations
+    chunk = int(max(1, min(n_points, memory_bytes // per_point)))
+
+    survival = np.empty(n_points)
+    mean = np.empty(n_points)
+    bands = np.empty((len(PERCENTILES), n_points))
+    for start in range(0, n_points, chunk):
+        stop = min(start + chunk, n_points)
+        part = {key: value[start:stop] for key, value in flat.items()}
+        flows = build_cash_flows(
+            inputs, {key: part[key] for key in params}, part['income'], part['expenses']
+        )
+        yearly, lowest = accumulate_yearly(part['savings'], flows)
+        final = yearly[-1] - part['debt'][:, None]
+        survival[start:stop] = (lowest >= 0).mean(axis=-1)
+        mean[start:stop] = final.mean(axis=-1)
+        bands[:, start:stop] = np.percentile(final, PERCENTILES, axis=-1)
+    return {
+        'survival_probability': survival.reshape(batch_shape),
+        'final_mean': mean.reshape(batch_shape),
+        'bands': bands.reshape((len(PERCENTILES),) + batch_shape),
+    }
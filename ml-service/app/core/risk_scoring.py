@@ -1,13 +1,13 @@
 # Risk scoring using ML model
 
-from ..models import risk_model
+from ..models import MODELS
 
 def calculate_risk_level(features):
     """
     Calculate financial risk level based on features using ML model.
     Returns risk level and insights.
     """
-    risk_score = risk_model.predict(features)
+    risk_score = MODELS["risk"].predict(features)
 
     if risk_score > 70:
         risk_level = 'high'
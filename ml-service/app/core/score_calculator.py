@@ -1,6 +1,6 @@
 # Financial health score calculator using ML model
 
-from ..models import risk_model
+from ..models import MODELS
 
 def calculate_health_score(features):
     """
@@ -8,6 +8,6 @@ def calculate_health_score(features):
     """
     # Use risk model to get score, then invert for health score
     # Lower risk = higher health score
-    risk_score = risk_model.predict(features)
+    risk_score = MODELS["risk"].predict(features)
     health_score = 100 - risk_score
     return max(0, min(100, health_score))
\ No newline at end of file
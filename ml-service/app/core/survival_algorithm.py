@@ -1,15 +1,145 @@
-# TODO: Implement survival algorithm
-# Predict months of financial survival in emergency
+# Horizon-aware financial survival engine
+# Computes each user's survival curve, the probability of staying solvent at
+# the end of every month, in one vectorized pass over (users, months); any
+# horizon is then read off the curve. Amounts are in months of expenses:
+# runway is the emergency fund, employed months add the monthly surplus and
+# unemployed months burn expenses plus debt payments, less the income that
+# continues through a job loss.
+# At most one job loss is modelled within the curve; at these hazards a
+# second loss and its own run-down within the window is second order.
+
+import math
+
+import numpy as np
+
+CURVE_MONTHS = 24
+DAYS_PER_MONTH = 30
+
+# Annual probability of losing the main income when none is given
+DEFAULT_LAYOFF_RISK = 0.1
+# Expected length of an unemployment spell; re-employment is memoryless
+MEAN_UNEMPLOYMENT_MONTHS = 6.0
+# Expenses are at least this share of income when derived from rates
+MIN_EXPENSE_SHARE = 0.05
+
+
+def _array(value):
+    return np.asarray(value, dtype=float)
+
+
+def cash_flow_rates(savings_rate, debt_ratio, income_stability=0.0,
+                    monthly_income=0.0, monthly_expenses=0.0):
+    """
+    Monthly surplus while employed and burn while unemployed, in expense months.
+
+    Debt payments are debt_ratio of income on top of expenses. The income to
+    expenses ratio comes from monthly_income / monthly_expenses where both
+    are positive, otherwise from the rates: income covers expenses, debt and
+    a savings_rate (percent) share of savings. income_stability is the share
+    of income that continues through a job loss.
+    """
+    savings_share = _array(savings_rate) / 100.0
+    debt_ratio = _array(debt_ratio)
+    income = _array(monthly_income)
+    expenses = _array(monthly_expenses)
+    known = (income > 0) & (expenses > 0)
+    derived = 1.0 / np.maximum(1.0 - savings_share - debt_ratio, MIN_EXPENSE_SHARE)
+    ratio = np.where(known, income / np.where(known, expenses, 1.0), derived)
+
+    surplus = ratio * (1.0 - debt_ratio) - 1.0
+    burn = 1.0 + ratio * (debt_ratio - _array(income_stability))
+    return surplus, burn
+
+
+def survival_curve(runway_months, surplus, burn, layoff_risk=DEFAULT_LAYOFF_RISK,
+                   months=CURVE_MONTHS, mean_unemployment_months=MEAN_UNEMPLOYMENT_MONTHS):
+    """
+    Probability of being solvent at the end of months 0..`months`, (users, months + 1).
+
+    A job loss starts month t with probability (1 - h)^(t-1) h, h the monthly
+    hazard from the annual layoff_risk. The runway then covers
+    floor(runway / burn) whole months, and the user is insolvent at the end
+    of the month after unless re-employed at the end of one of the covered
+    months, each with probability 1 / mean spell.
+    Failure mass is binned by insolvency month and accumulated once; users
+    whose surplus is negative run out at runway / -surplus months regardless.
+    """
+    runway, surplus, burn, risk = np.broadcast_arrays(
+        *(np.atleast_1d(_array(v)) for v in (runway_months, surplus, burn, layoff_risk))
+    )
+    n_users = len(runway)
+    start = np.arange(1, months + 1)
+
+    hazard = 1.0 - (1.0 - risk[:, None]) ** (1.0 / 12)
+    loss = (1.0 - hazard) ** (start - 1) * hazard
+    at_loss = np.maximum(runway[:, None] + surplus[:, None] * (start - 1), 0.0)
+    # Whole unemployed months the runway covers; insolvent in the month after
+    covered = np.floor(np.divide(
+        at_loss, burn[:, None], out=np.full(at_loss.shape, np.inf), where=burn[:, None] > 0
+    ))
+    still_unemployed = (1.0 - 1.0 / mean_unemployment_months) ** covered
+    insolvent = np.minimum(start + np.minimum(covered, months), months + 1).astype(np.int64)
+
+    rows = np.arange(n_users)[:, None] * (months + 2)
+    failed = np.bincount(
+        (rows + insolvent).ravel(), weights=(loss * still_unemployed).ravel(),
+        minlength=n_users * (months + 2),
+    ).reshape(n_users, months + 2).cumsum(axis=1)[:, :months + 1]
+    curve = np.clip(1.0 - failed, 0.0, 1.0)
+
+    depleted = np.divide(runway, -surplus, out=np.full(n_users, np.inf), where=surplus < 0)
+    curve[np.arange(months + 1) > depleted[:, None]] = 0.0
+    return curve
+
+
+def survival_at(curve, days):
+    """Survival probability after `days`, interpolated linearly between months"""
+    position = np.clip(_array(days) / DAYS_PER_MONTH, 0, curve.shape[-1] - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, curve.shape[-1] - 1)
+    fraction = position - lower
+    rows = np.arange(curve.shape[0])
+    return curve[rows, lower] * (1 - fraction) + curve[rows, upper] * fraction
+
+
+def curve_months(*days):
+    """Curve length in months that covers every horizon in `days`"""
+    return max(CURVE_MONTHS, math.ceil(max(days, default=0) / DAYS_PER_MONTH))
+
+
+def depletion_month(curve):
+    """First month each curve reaches zero, 0 where it stays above it"""
+    empty = curve <= 0.0
+    return np.where(empty.any(axis=-1), np.argmax(empty, axis=-1), 0)
+
+
+def expected_solvent_months(emergency_fund, monthly_expenses, income_stability):
+    """
+    Expected months solvent over the next CURVE_MONTHS if income stops now.
+
+    The area under the survival curve of a job loss this month, with
+    expenses less the share of income that continues (income_stability)
+    as the burn; re-employment before the runway ends counts as surviving.
+    """
+    if emergency_fund <= 0 or monthly_expenses <= 0:
+        return 0
+    curve = survival_curve(
+        emergency_fund / monthly_expenses, 0.0, 1.0 - income_stability, layoff_risk=1.0
+    )
+    return float(curve[0, 1:].sum())
+
 
 def predict_survival_months(emergency_fund, monthly_expenses, income_stability):
     """
     Predict how many months user can survive financially.
+
+    The runway in months of expenses, scaled by income stability (0-1) and
+    capped at CURVE_MONTHS; see expected_solvent_months for the value read
+    off the survival curve.
     """
-    # TODO: Use ML model for prediction
-    # Simple calculation for now
     if emergency_fund > 0 and monthly_expenses > 0:
         months = emergency_fund / monthly_expenses
         # Adjust based on income stability (0-1 scale)
         adjusted_months = months * (0.5 + income_stability * 0.5)
-        return min(adjusted_months, 24)  # Cap at 2 years
-    return 0
\ No newline at end of file
+        return min(adjusted_months, CURVE_MONTHS)
+    return 0
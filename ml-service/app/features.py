@@ -0,0 +1,351 @@
+"""
+CAPSTACK Feature Pipelines - One vectorized feature definition per model
+Training, single-row serving and batch serving all build model matrices
+through these pipelines, so train and serve features cannot drift apart.
+A pipeline maps column-oriented input (dict of arrays or a DataFrame) to
+the feature matrix with whole-column NumPy operations
+"""
+
+import math
+import numbers
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (name, default, min_value, max_value) for each numeric input column
+BatchField = Tuple[str, float, Optional[float], Optional[float]]
+
+Columns = Dict[str, np.ndarray]
+FeatureFn = Callable[[Columns], np.ndarray]
+
+INDUSTRY_CODES = {
+    "IT": 1,
+    "Manufacturing": 2,
+    "Retail": 3,
+    "Finance": 4,
+    "Healthcare": 5
+}
+
+
+class FeatureSchemaError(ValueError):
+    """A loaded model does not match the features its pipeline builds"""
+
+
+def _coerce_number(value: Any, lenient: bool = False) -> float:
+    """
+    Return value as float, or NaN when it is not a plain number.
+
+    With `lenient`, numeric strings and booleans are accepted as single-row
+    predict() did; otherwise booleans are rejected like any non-number.
+    """
+    if isinstance(value, bool) and not lenient:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if lenient and isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def _valid_label(value: Any, lenient: bool = False) -> bool:
+    """
+    Whether a label column value can be encoded.
+
+    Missing labels fall back to the default code. With `lenient`, plain
+    numbers are accepted too, as single-row predict() looked them up.
+    """
+    if value is None or isinstance(value, str):
+        return True
+    return lenient and isinstance(value, (int, float))
+
+
+def build_batch_matrix(
+    rows: Sequence[Any],
+    fields: Sequence[BatchField],
+    lenient: bool = False,
+    labels: Sequence[str] = (),
+) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Stack dict rows into one float matrix and validate it in a single pass.
+
+    Returns the (n_rows, n_fields) matrix and a mapping of row index to the
+    first validation error found in that row. Invalid rows stay in the
+    matrix so indices line up with the input.
+
+    `lenient` applies single-row predict() acceptance instead: numeric
+    strings are parsed and the min/max limits are not enforced, only that
+    values are finite numbers.
+
+    `labels` names the label columns; a row whose label is not a string
+    is reported as an error so it never reaches the encoder.
+    """
+    errors: Dict[int, str] = {}
+    raw: List[List[float]] = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = "row must be an object"
+            raw.append([math.nan] * len(fields))
+            continue
+        for name in labels:
+            if not _valid_label(row.get(name), lenient):
+                errors[index] = f"{name} must be a string"
+                break
+        raw.append([
+            _coerce_number(row.get(name, default), lenient)
+            for name, default, _, _ in fields
+        ])
+    matrix = np.array(raw, dtype=float).reshape(len(rows), len(fields))
+
+    lower = np.array([
+        -np.inf if low is None or lenient else low for _, _, low, _ in fields
+    ])
+    upper = np.array([
+        np.inf if high is None or lenient else high for _, _, _, high in fields
+    ])
+    finite = np.isfinite(matrix)
+    below = matrix < lower
+    above = matrix > upper
+    invalid = ~finite | below | above
+
+    for index in np.flatnonzero(invalid.any(axis=1)):
+        index = int(index)
+        if index in errors:
+            continue
+        column = int(np.argmax(invalid[index]))
+        name = fields[column][0]
+        if not finite[index, column]:
+            errors[index] = f"{name} must be a finite number"
+        elif below[index, column]:
+            errors[index] = f"{name} must be >= {fields[column][2]}"
+        else:
+            errors[index] = f"{name} must be <= {fields[column][3]}"
+    return matrix, errors
+
+
+def _encode_label(value: Any, codes: Mapping[str, float], fallback: float) -> float:
+    """Code of one label: numbers are already codes, strings are looked up"""
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, str):
+        return float(codes.get(value, fallback))
+    return float(fallback)
+
+
+def encode_category(values: Any, codes: Mapping[str, float], fallback: float) -> np.ndarray:
+    """
+    Map labels to numeric codes; unknown or missing labels get `fallback`.
+
+    Numeric input is taken as already encoded (as the training generators
+    produce it), per element, so a row's code never depends on the other
+    labels in the column. Labels are looked up once per distinct value,
+    not per row.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return array.astype(float)
+    if array.dtype.kind in "US" and isinstance(values, np.ndarray):
+        labels, inverse = np.unique(array.astype(str), return_inverse=True)
+        lookup = np.array([codes.get(label, fallback) for label in labels], dtype=float)
+        return lookup[inverse].reshape(array.shape)
+    # Mixed sequences (e.g. [3, "IT"]) would be coerced to one dtype above;
+    # encode them element by element instead
+    objects = np.asarray(values, dtype=object)
+    seen: Dict[Any, float] = {}
+    encoded = np.empty(objects.shape)
+    for index, value in enumerate(objects.flat):
+        try:
+            code = seen.get(value)
+            if code is None:
+                code = seen[value] = _encode_label(value, codes, fallback)
+        except TypeError:
+            code = _encode_label(value, codes, fallback)
+        encoded.flat[index] = code
+    return encoded
+
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator, 0 where the denominator is not positive"""
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    return np.divide(numerator, denominator, out=out, where=denominator > 0)
+
+
+def _feature_count(component) -> Optional[int]:
+    """Input width of an estimator or scaler, if it records one"""
+    for attribute in ("n_features_in_", "n_features"):
+        count = getattr(component, attribute, None)
+        if count is not None:
+            return int(count)
+    mean = getattr(component, "mean_", None)
+    return None if mean is None else len(mean)
+
+
+class FeaturePipeline:
+    """
+    Declarative feature builder for one model.
+
+    `inputs` are the numeric input columns (with defaults and valid ranges
+    for batch validation), `categories` the label columns with their codes
+    and fallback code, and `features` the ordered (name, function) pairs
+    producing the model matrix from the input columns.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        inputs: Sequence[BatchField],
+        features: Sequence[Tuple[str, FeatureFn]],
+        categories: Optional[Mapping[str, Tuple[Mapping[str, float], float]]] = None,
+    ):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.features = tuple(features)
+        self.categories = dict(categories or {})
+        self.feature_names = tuple(feature for feature, _ in self.features)
+        self.n_features = len(self.features)
+
+    def columns(self, data: Mapping[str, Any], n_rows: Optional[int] = None) -> Columns:
+        """
+        Input columns as float arrays, with defaults for missing ones.
+
+        `data` maps column names to sequences (a dict of arrays, or a
+        pandas DataFrame). Label columns are encoded to their codes.
+        """
+        if n_rows is None:
+            names = [name for name, _, _, _ in self.inputs] + list(self.categories)
+            given = [name for name in names if name in data]
+            if not given:
+                raise ValueError(f"{self.name} input has none of the columns {names}")
+            n_rows = len(data[given[0]])
+        columns = {
+            name: (
+                np.asarray(data[name], dtype=float) if name in data
+                else np.full(n_rows, float(default))
+            )
+            for name, default, _, _ in self.inputs
+        }
+        for name, (codes, fallback) in self.categories.items():
+            columns[name] = (
+                encode_category(data[name], codes, fallback) if name in data
+                else np.full(n_rows, float(fallback))
+            )
+        return columns
+
+    def transform(self, data: Mapping[str, Any]) -> np.ndarray:
+        """Model matrix (n_rows, n_features) from column-oriented input"""
+        columns = self.columns(data)
+        return np.column_stack([feature(columns) for _, feature in self.features])
+
+    def transform_rows(self, raw: np.ndarray, rows: Sequence[Mapping[str, Any]] = ()) -> np.ndarray:
+        """
+        Model matrix from a validated build_batch_matrix result.
+
+        `rows` are the matching dict rows, needed only for label columns.
+        """
+        data: Dict[str, Any] = {
+            name: raw[:, index] for index, (name, _, _, _) in enumerate(self.inputs)
+        }
+        for name in self.categories:
+            data[name] = [row.get(name) for row in rows]
+        return self.transform(data)
+
+    def transform_row(self, row: Mapping[str, Any]) -> np.ndarray:
+        """Model matrix (1, n_features) for one dict row"""
+        data: Dict[str, Any] = {
+            name: [row.get(name, default)] for name, default, _, _ in self.inputs
+        }
+        for name in self.categories:
+            data[name] = [row.get(name)]
+        return self.transform(data)
+
+    def check(self, estimator, scaler, metadata: Optional[Mapping[str, Any]] = None):
+        """
+        Raise FeatureSchemaError if a loaded model does not fit this pipeline.
+
+        Compares the estimator's and scaler's input widths, and the feature
+        names saved in the model metadata when present.
+        """
+        for role, component in (("estimator", estimator), ("scaler", scaler)):
+            count = _feature_count(component)
+            if count is not None and count != self.n_features:
+                raise FeatureSchemaError(
+                    f"{self.name} {role} expects {count} features, "
+                    f"the pipeline builds {self.n_features}"
+                )
+        saved = (metadata or {}).get("features")
+        if saved is not None and tuple(saved) != self.feature_names:
+            raise FeatureSchemaError(
+                f"{self.name} model was trained on features {list(saved)}, "
+                f"the pipeline builds {list(self.feature_names)}"
+            )
+
+
+# ============================================================================
+# MODEL PIPELINES
+# ============================================================================
+
+RISK_FEATURES = FeaturePipeline(
+    "risk",
+    inputs=(
+        ("income", 0, 0, 1e10),
+        ("expenses", 0, 0, 1e10),
+        ("savings", 0, 0, 1e10),
+        ("debt", 0, 0, 1e10),
+    ),
+    features=(
+        ("income", lambda c: c["income"]),
+        ("expenses", lambda c: c["expenses"]),
+        ("savings", lambda c: c["savings"]),
+        ("debt", lambda c: c["debt"]),
+        ("debt_to_income", lambda c: c["debt"] / np.maximum(c["income"], 1)),
+        ("savings_to_income", lambda c: c["savings"] / np.maximum(c["income"], 1)),
+        ("expense_to_income", lambda c: c["expenses"] / np.maximum(c["income"], 1)),
+        ("disposable_income", lambda c: c["income"] - c["expenses"]),
+        ("debt_service_ratio", lambda c: _safe_ratio(c["debt"], c["income"])),
+        ("savings_buffer", lambda c: _safe_ratio(c["savings"], c["expenses"])),
+    ),
+)
+
+LAYOFF_FEATURES = FeaturePipeline(
+    "layoff",
+    inputs=(
+        ("experience_years", 5, 0, 100),
+        ("company_age", 10, 0, 1000),
+        ("team_size", 10, 0, 1e7),
+        ("performance_rating", 3, 0, 10),
+    ),
+    categories={
+        "industry": (INDUSTRY_CODES, INDUSTRY_CODES["IT"]),
+        "contract_type": ({"permanent": 1}, 0),
+    },
+    features=(
+        ("industry", lambda c: c["industry"]),
+        ("experience_years", lambda c: c["experience_years"]),
+        ("company_age", lambda c: c["company_age"]),
+        ("team_size", lambda c: c["team_size"]),
+        ("permanent_contract", lambda c: c["contract_type"]),
+        ("performance_rating", lambda c: c["performance_rating"]),
+    ),
+)
+
+SAVINGS_FEATURES = FeaturePipeline(
+    "savings",
+    inputs=(
+        ("current_savings", 0, 0, 1e10),
+        ("monthly_savings", 0, -1e10, 1e10),
+        ("expected_return", 7, -100, 100),
+        ("inflation_rate", 3.5, -100, 100),
+        ("months_to_project", 12, 0, 1200),
+        ("investment_type", 0, 0, 100),
+    ),
+    features=(
+        ("current_savings", lambda c: c["current_savings"]),
+        ("monthly_savings", lambda c: c["monthly_savings"]),
+        ("expected_return", lambda c: c["expected_return"]),
+        ("inflation_rate", lambda c: c["inflation_rate"]),
+        ("months_to_project", lambda c: c["months_to_project"]),
+        ("investment_type", lambda c: c["investment_type"]),
+    ),
+)
@@ -3,6 +3,9 @@ CAPSTACK ML Service - Advanced Financial AI Engine
 Production-ready ML service with model management and evaluation
 """
 
+# Imported first so the cold-start report covers every other import
+from . import startup  # isort: skip
+
 import logging
 import os
 import math
@@ -10,14 +13,30 @@ import random
 import time
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 from pydantic import FieldValidationInfo
 
-from .models import load_all_models, risk_model, layoff_model, savings_model
+from . import metrics
+from .admission import AdmissionMiddleware
+from .singleflight import SingleFlightMiddleware
+from .core import monte_carlo, survival_algorithm
+from .cache import PREDICTION_CACHE
+from .threads import THREAD_BUDGET
+from .models import (
+    BATCHERS,
+    MODELS,
+    build_batch_matrix,
+    load_all_models,
+    model_version,
+    model_versions,
+    predict_async,
+)
+from .registry import MODEL_REGISTRY
 
 # Configure logging
 logging.basicConfig(
@@ -33,22 +52,50 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc"
 )
+# Per-route request metrics; InstrumentedRoute must be set before routes
+app.router.route_class = metrics.InstrumentedRoute
+# Innermost first: collapsed duplicates never take an admission slot, and
+# MetricsMiddleware (outermost) counts shed and collapsed requests
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(SingleFlightMiddleware, versions=model_versions)
+app.add_middleware(metrics.MetricsMiddleware)
+
+startup.record_import("app.main", startup.PROCESS_START)
 
 # Model and data directories
 MODEL_DIR = "app/models"
 os.makedirs(MODEL_DIR, exist_ok=True)
 FAVICON_BYTES = b""
+MAX_BATCH_SIZE = 10000
+# Paths per what-if simulation; adaptive runs use it as their default cap
+MAX_SIMULATIONS = 10000
+# Sensitivity sweeps: cells x paths per request, and the working-set budget
+MAX_SWEEP_PATHS = 4_000_000
+SWEEP_MEMORY_BYTES = int(os.getenv("ML_SWEEP_MEMORY_MB", "64")) * 1024 * 1024
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load ML models on startup if they exist."""
     logger.info("Loading ML models on startup...")
+    loads = None
     try:
-        load_all_models()
+        loads = load_all_models()
         logger.info("ML models loaded successfully")
     except Exception as e:
         logger.warning("Failed to load ML models: %s", str(e))
+    MODEL_REGISTRY.record_loaded(loads)
+    # First requests should not pay first-call costs
+    MODEL_REGISTRY.warm_up_all()
+    MODEL_REGISTRY.start()
+    startup.mark_ready()
+    logger.info("Service ready in %.0f ms", startup.startup_report()["ready_ms"])
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop watching the model directory."""
+    MODEL_REGISTRY.stop()
 
 
 # ============================================================================
@@ -131,9 +178,57 @@ class RiskScoreRequest(BaseModel):
 class RiskScoreResponse(BaseModel):
     """Response model for risk score."""
 
+    # model_version would otherwise clash with pydantic's "model_" namespace
+    model_config = ConfigDict(protected_namespaces=())
+
     risk_score: float
     level: RiskLevel
     factors: Dict[str, float]
+    model_version: str
+    timestamp: str
+
+
+class RiskScoreBatchRequest(BaseModel):
+    """Request model for batch risk score calculation."""
+
+    items: List[Any] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Rows with income, expenses, savings and debt"
+    )
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "items": [
+                    {"income": 50000, "expenses": 30000, "savings": 10000, "debt": 5000},
+                    {"income": 80000, "expenses": 60000, "savings": 2000, "debt": 40000}
+                ]
+            }
+        }
+    )
+
+
+class RiskScoreBatchItem(BaseModel):
+    """Single row of a batch risk score response."""
+
+    index: int
+    risk_score: Optional[float] = None
+    level: Optional[RiskLevel] = None
+    factors: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+
+
+class RiskScoreBatchResponse(BaseModel):
+    """Response model for batch risk scores."""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    results: List[RiskScoreBatchItem]
+    succeeded: int
+    failed: int
+    model_version: str
     timestamp: str
 
 
@@ -239,12 +334,54 @@ class PredictiveAnalyticsRequest(BaseModel):
 class PredictionResponse(BaseModel):
     """Response model for predictions."""
 
+    model_config = ConfigDict(protected_namespaces=())
+
     prediction_type: str
     time_horizon: str
     predicted_value: float
     confidence_score: float
     factors: List[str]
     recommendations: List[str]
+    model_version: Optional[str] = None
+    horizons: Optional[Dict[str, float]] = None  # Solvency probability per TimeHorizon
+    timestamp: str
+
+
+class PredictiveAnalyticsBatchRequest(BaseModel):
+    """Request model for batch predictive analytics."""
+
+    user_data: List[Any] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="User financial data rows"
+    )
+    prediction_type: PredictionType
+    time_horizon: TimeHorizon
+
+
+class PredictionBatchItem(BaseModel):
+    """Single row of a batch prediction response."""
+
+    index: int
+    predicted_value: Optional[float] = None
+    factors: Optional[List[str]] = None
+    error: Optional[str] = None
+
+
+class PredictionBatchResponse(BaseModel):
+    """Response model for batch predictions."""
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    prediction_type: str
+    time_horizon: str
+    confidence_score: float
+    results: List[PredictionBatchItem]
+    recommendations: List[str]
+    succeeded: int
+    failed: int
+    model_version: Optional[str] = None
     timestamp: str
 
 
@@ -257,8 +394,8 @@ class WhatIfScenario(str, Enum):
     INVESTMENT_RETURN = "investment_return"
 
 
-class WhatIfSimulationRequest(BaseModel):
-    """Request model for What-If Monte Carlo simulation."""
+class WhatIfInputs(BaseModel):
+    """Financial situation and scenarios shared by What-If requests."""
 
     current_income: float = Field(..., gt=0, description="Current monthly income")
     current_expenses: float = Field(..., ge=0, description="Current monthly expenses")
@@ -279,8 +416,14 @@ class WhatIfSimulationRequest(BaseModel):
     num_simulations: int = Field(
         default=1000,
         ge=100,
-        le=10000,
-        description="Number of Monte Carlo simulations"
+        le=MAX_SIMULATIONS,
+        description="Number of Monte Carlo simulations (path cap when adaptive, "
+                    f"default {MAX_SIMULATIONS} there)"
+    )
+    seed: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Random seed for reproducible simulations"
     )
 
     @field_validator("current_income", "current_expenses", "current_savings", "current_debt")
@@ -292,6 +435,22 @@ class WhatIfSimulationRequest(BaseModel):
             raise ValueError("Financial values must be non-negative and reasonable")
         return v
 
+
+class WhatIfSimulationRequest(WhatIfInputs):
+    """Request model for What-If Monte Carlo simulation."""
+
+    adaptive: bool = Field(
+        default=False,
+        description="Use variance-reduced sampling and stop once precise enough"
+    )
+    tolerance: float = Field(
+        default=monte_carlo.ADAPTIVE_TOLERANCE,
+        gt=0,
+        le=0.5,
+        description="Adaptive target: CI half-width of final p5/p50/p95 as a "
+                    "fraction of the estimate"
+    )
+
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -323,6 +482,105 @@ class WhatIfSimulationResponse(BaseModel):
     worst_case_net_worth: float
     best_case_net_worth: float
     recommendations: List[str]
+    paths_used: int
+    converged: Optional[bool] = None
+    ci_half_widths: Optional[Dict[str, float]] = None
+    timestamp: str
+
+
+class GoalSeekRequest(WhatIfInputs):
+    """Request model for the monthly saving needed to reach a target."""
+
+    target_net_worth: float = Field(..., description="Net worth to reach by the end")
+    target_probability: float = Field(
+        default=0.9,
+        gt=0,
+        lt=1,
+        description="Required probability of reaching the target"
+    )
+
+    @field_validator("target_net_worth")
+    @classmethod
+    def validate_target(cls, v: float) -> float:
+        if not math.isfinite(v) or abs(v) > 1e12:
+            raise ValueError("Target net worth must be a reasonable finite number")
+        return v
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "current_income": 6000,
+                "current_expenses": 4500,
+                "current_savings": 20000,
+                "current_debt": 5000,
+                "age": 35,
+                "risk_tolerance": "medium",
+                "scenarios": {
+                    "job_loss": {"probability": 0.1, "duration_months": 6}
+                },
+                "simulation_years": 10,
+                "num_simulations": 5000,
+                "target_net_worth": 300000,
+                "target_probability": 0.9
+            }
+        }
+    )
+
+
+class GoalSeekResponse(BaseModel):
+    """Response model for goal seeking."""
+
+    monthly_saving: float  # Current monthly surplus plus the additional saving
+    additional_monthly_saving: float
+    probability: float
+    baseline_probability: float
+    median_net_worth: float
+    probability_curve: List[Dict[str, float]]  # {additional_monthly_saving, probability}
+    paths_used: int
+    timestamp: str
+
+
+class SweepAxis(BaseModel):
+    """One swept scenario parameter and its values."""
+
+    parameter: str = Field(..., description="Parameter name, e.g. job_loss_probability")
+    values: List[float] = Field(..., min_length=1, max_length=50)
+
+
+class WhatIfSweepRequest(WhatIfInputs):
+    """Request model for a scenario sensitivity grid."""
+
+    axes: List[SweepAxis] = Field(..., min_length=1, max_length=3)
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "current_income": 6000,
+                "current_expenses": 4500,
+                "current_savings": 20000,
+                "current_debt": 5000,
+                "age": 35,
+                "risk_tolerance": "medium",
+                "scenarios": {"expense_increase": {"percentage": 0.03, "probability": 0.5}},
+                "simulation_years": 10,
+                "num_simulations": 1000,
+                "axes": [
+                    {"parameter": "job_loss_probability", "values": [0.0, 0.1, 0.2, 0.3]},
+                    {"parameter": "raise_percentage", "values": [0.0, 0.03, 0.06]}
+                ]
+            }
+        }
+    )
+
+
+class WhatIfSweepResponse(BaseModel):
+    """Response model for a scenario sensitivity grid."""
+
+    parameters: List[str]
+    # Axis values, survival_probability (solvent in every month) and the
+    # mean and p5-p95 of final net worth
+    cells: List[Dict[str, float]]
+    paths_per_cell: int
     timestamp: str
 
 
@@ -333,6 +591,35 @@ class HealthCheckResponse(BaseModel):
     version: str
     timestamp: str
     models_loaded: int
+    startup: Dict[str, Any]
+    batching: Dict[str, Any]
+    cache: Dict[str, Any]
+    threads: Dict[str, Any]
+    models: Dict[str, Any]
+
+
+class ReadinessResponse(BaseModel):
+    """Response model for readiness check."""
+
+    ready: bool
+    models: Dict[str, Any]
+    timestamp: str
+
+
+class ModelReloadRequest(BaseModel):
+    """Request model for reloading models from disk."""
+
+    models: Optional[List[str]] = Field(
+        None, description="Models to reload (default: those whose files changed)"
+    )
+    force: bool = Field(False, description="Reload even if the files are unchanged")
+
+
+class ModelReloadResponse(BaseModel):
+    """Response model for a model reload."""
+
+    models: Dict[str, Any]
+    timestamp: str
 
 
 # ============================================================================
@@ -362,6 +649,15 @@ def calculate_emergency_fund_months(
     return emergency_fund / monthly_expenses
 
 
+def classify_risk_level(risk_score: float) -> RiskLevel:
+    """Map a 0-100 risk score onto a risk level."""
+    if risk_score < 30:
+        return RiskLevel.LOW
+    if risk_score < 70:
+        return RiskLevel.MEDIUM
+    return RiskLevel.HIGH
+
+
 def ensure_finite_number(
     value: Any,
     name: str,
@@ -399,12 +695,45 @@ async def health_check():
         status="healthy",
         version="2.0.0",
         timestamp=get_timestamp(),
-        models_loaded=3
+        models_loaded=sum(model.is_trained for model in MODELS.values()),
+        startup=startup.startup_report(),
+        batching={name: batcher.stats() for name, batcher in BATCHERS.items()},
+        cache=PREDICTION_CACHE.stats(),
+        threads=THREAD_BUDGET.report(),
+        models=MODEL_REGISTRY.status()
+    )
+
+
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """
+    Readiness check: 200 once every model is loaded and warmed up, else 503.
+
+    Reports each model's load source, artifact version, load and warm-up
+    durations, and whether the rule-based fallback is serving.
+    """
+    ready = MODEL_REGISTRY.ready
+    body = ReadinessResponse(
+        ready=ready,
+        models=MODEL_REGISTRY.status(),
+        timestamp=get_timestamp()
+    )
+    if not ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, model and cache metrics."""
+    return Response(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4"
     )
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     """Root endpoint - API information."""
     return {
         "service": "CAPSTACK ML Service",
@@ -412,9 +741,17 @@ def read_root():
         "status": "operational",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics",
             "risk_score": "/risk-score",
+            "risk_score_batch": "/risk-score/batch",
             "allocation_optimize": "/allocation-optimize",
             "predictive_analytics": "/predictive-analytics",
+            "predictive_analytics_batch": "/predictive-analytics/batch",
+            "what_if_simulate": "/what-if/simulate",
+            "what_if_goal_seek": "/what-if/goal-seek",
+            "what_if_sweep": "/what-if/sweep",
+            "reload_models": "/admin/models/reload",
             "docs": "/docs"
         }
     }
@@ -426,6 +763,46 @@ async def favicon():
     return Response(content=FAVICON_BYTES, media_type="image/x-icon")
 
 
+# ============================================================================
+# MODEL ADMINISTRATION
+# ============================================================================
+
+@app.post(
+    "/admin/models/reload",
+    response_model=ModelReloadResponse,
+    tags=["Administration"]
+)
+def reload_models(
+    request: ModelReloadRequest,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Reload models from app/models without restarting the worker.
+
+    Each model is loaded into a fresh instance and warmed up before it is
+    swapped in; requests already running finish on the previous version.
+    Requires the X-Admin-Token header when ML_ADMIN_TOKEN is set.
+    """
+    admin_token = os.getenv("ML_ADMIN_TOKEN")
+    if admin_token and x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    unknown = sorted(set(request.models or ()) - set(MODELS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown models: {', '.join(unknown)}"
+        )
+    try:
+        status = MODEL_REGISTRY.reload(request.models, force=request.force)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Model reload failed: %s", str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Model reload failed: {str(e)}"
+        ) from e
+    return ModelReloadResponse(models=status, timestamp=get_timestamp())
+
+
 # ============================================================================
 # FINANCIAL RISK SCORING
 # ============================================================================
@@ -435,7 +812,7 @@ async def favicon():
     response_model=RiskScoreResponse,
     tags=["Risk Analysis"]
 )
-def calculate_risk_score(request: RiskScoreRequest):
+async def calculate_risk_score(request: RiskScoreRequest):
     """
     Calculate financial risk score using multi-factor analysis.
 
@@ -455,7 +832,9 @@ def calculate_risk_score(request: RiskScoreRequest):
             "savings": request.savings,
             "debt": request.debt
         }
-        risk_score = risk_model.predict(data)
+        # Resolved once so the whole request uses one model version
+        model = MODELS["risk"]
+        risk_score = await predict_async("risk", data, model)
 
         # Calculate ratios for factors
         expense_ratio = (
@@ -474,13 +853,7 @@ def calculate_risk_score(request: RiskScoreRequest):
             else 1.0
         )
 
-        # Determine risk level
-        if risk_score < 30:
-            level = RiskLevel.LOW
-        elif risk_score < 70:
-            level = RiskLevel.MEDIUM
-        else:
-            level = RiskLevel.HIGH
+        level = classify_risk_level(risk_score)
 
         duration = time.time() - start_time
         logger.info("Risk score calculated: %s, level: %s, duration: %.3fs", risk_score, level, duration)
@@ -493,6 +866,7 @@ def calculate_risk_score(request: RiskScoreRequest):
                 "savings_ratio": round(savings_ratio * 100, 2),
                 "debt_ratio": round(debt_ratio * 100, 2)
             },
+            model_version=model_version(model),
             timestamp=get_timestamp()
         )
 
@@ -504,6 +878,73 @@ def calculate_risk_score(request: RiskScoreRequest):
         ) from e
 
 
+@app.post(
+    "/risk-score/batch",
+    response_model=RiskScoreBatchResponse,
+    tags=["Risk Analysis"]
+)
+def calculate_risk_score_batch(request: RiskScoreBatchRequest):
+    """
+    Calculate risk scores for many users with a single model call.
+
+    Rows are validated together; invalid rows are reported by index with
+    an error message and do not fail the rest of the batch.
+    """
+    start_time = time.time()
+    try:
+        items = request.items
+        model = MODELS["risk"]
+        raw, scores, errors = model.score_batch(items)
+
+        income, expenses, savings, debt = raw.T
+        safe_income = np.where(income > 0, income, 1)
+        expense_ratios = np.round(expenses / safe_income * 100, 2)
+        savings_ratios = np.round(savings / safe_income * 100, 2)
+        debt_ratios = np.round(debt / safe_income * 100, 2)
+        rounded = np.round(scores, 2)
+
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append(
+                    RiskScoreBatchItem(index=index, error=errors[index])
+                )
+                continue
+            results.append(RiskScoreBatchItem(
+                index=index,
+                risk_score=float(rounded[index]),
+                level=classify_risk_level(float(scores[index])),
+                factors={
+                    "expense_ratio": float(expense_ratios[index]),
+                    "savings_ratio": float(savings_ratios[index]),
+                    "debt_ratio": float(debt_ratios[index])
+                }
+            ))
+
+        duration = time.time() - start_time
+        logger.info(
+            "Batch risk scores calculated: %d rows, %d failed, duration: %.3fs",
+            len(items),
+            len(errors),
+            duration
+        )
+
+        return RiskScoreBatchResponse(
+            results=results,
+            succeeded=len(items) - len(errors),
+            failed=len(errors),
+            model_version=model_version(model),
+            timestamp=get_timestamp()
+        )
+
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Batch risk calculation failed: %s", str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch risk calculation failed: {str(e)}"
+        ) from e
+
+
 # ============================================================================
 # ASSET ALLOCATION OPTIMIZATION
 # ============================================================================
@@ -667,7 +1108,7 @@ def optimize_asset_allocation(
     response_model=PredictionResponse,
     tags=["Predictions"]
 )
-def predictive_analytics(
+async def predictive_analytics(
     request: PredictiveAnalyticsRequest
 ):
     """
@@ -700,39 +1141,11 @@ def predictive_analytics(
 
         # Survival probability prediction
         if prediction_type == PredictionType.SURVIVAL_PROBABILITY:
-            # Use rule-based for now, as no specific survival model
-            base_probability = 0.8
-            factors_list = []
-
-            emergency_months = ensure_finite_number(
-                user_data.get("emergency_months", 0),
-                "emergency_months",
-                min_value=0
-            )
-            debt_ratio = ensure_finite_number(
-                user_data.get("debt_ratio", 0),
-                "debt_ratio",
-                min_value=0
+            values, factors, errors, horizons = predict_survival_batch(
+                [user_data], time_horizon
             )
-            savings_rate = ensure_finite_number(
-                user_data.get("savings_rate", 0),
-                "savings_rate",
-                min_value=0
-            )
-
-            if emergency_months < 3:
-                base_probability -= 0.2
-                factors_list.append("Low emergency fund")
-
-            if debt_ratio > 0.5:
-                base_probability -= 0.15
-                factors_list.append("High debt ratio")
-
-            if savings_rate < 10:
-                base_probability -= 0.1
-                factors_list.append("Low savings rate")
-
-            predicted_value = max(0.1, base_probability)
+            if errors:
+                raise HTTPException(status_code=400, detail=errors[0])
 
             duration = time.time() - start_time
             logger.info("Survival prediction completed in %.3fs", duration)
@@ -740,21 +1153,22 @@ def predictive_analytics(
             return PredictionResponse(
                 prediction_type=prediction_type.value,
                 time_horizon=time_horizon.value,
-                predicted_value=round(predicted_value, 3),
-                confidence_score=0.75,
-                factors=factors_list or ["Financial data analyzed"],
-                recommendations=[
-                    "Build emergency fund to 6 months",
-                    "Reduce debt-to-income ratio below 50%",
-                    "Increase savings rate to 20%+"
-                ],
+                predicted_value=round(float(values[0]), 3),
+                confidence_score=BATCH_CONFIDENCE[prediction_type],
+                factors=factors[0],
+                recommendations=BATCH_RECOMMENDATIONS[prediction_type],
+                horizons={
+                    horizon: round(float(value[0]), 3)
+                    for horizon, value in horizons.items()
+                },
                 timestamp=get_timestamp()
             )
 
         # Job loss risk prediction
         elif prediction_type == PredictionType.LAYOFF_RISK:
             # Use ML model
-            predicted_value = layoff_model.predict(user_data)
+            model = MODELS["layoff"]
+            predicted_value = await predict_async("layoff", user_data, model)
 
             duration = time.time() - start_time
             logger.info("Layoff risk prediction completed in %.3fs", duration)
@@ -774,13 +1188,15 @@ def predictive_analytics(
                     "Update resume and professional skills",
                     "Network actively in your industry"
                 ],
+                model_version=model_version(model),
                 timestamp=get_timestamp()
             )
 
         # Savings trajectory prediction
         elif prediction_type == PredictionType.SAVINGS_TRAJECTORY:
             # Use ML model
-            predicted_value = savings_model.predict(user_data)
+            model = MODELS["savings"]
+            predicted_value = await predict_async("savings", user_data, model)
 
             duration = time.time() - start_time
             logger.info("Savings trajectory prediction completed in %.3fs", duration)
@@ -801,6 +1217,7 @@ def predictive_analytics(
                     "Automate savings transfers",
                     "Review investment allocation"
                 ],
+                model_version=model_version(model),
                 timestamp=get_timestamp()
             )
 
@@ -816,6 +1233,8 @@ def predictive_analytics(
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except Exception as e:  # pylint: disable=broad-except
         logger.error(
             "Predictive analytics failed: %s",
@@ -828,6 +1247,491 @@ def predictive_analytics(
         ) from e
 
 
+SURVIVAL_BATCH_FIELDS = (
+    ("emergency_months", 0, 0, None),
+    ("debt_ratio", 0, 0, None),
+    ("savings_rate", 0, 0, None),
+    ("emergency_fund", 0, 0, None),
+    ("monthly_expenses", 0, 0, None),
+    ("monthly_income", 0, 0, None),
+    ("income_stability", 0, 0, 1),
+    ("layoff_risk", survival_algorithm.DEFAULT_LAYOFF_RISK, 0, 1),
+)
+
+BATCH_RECOMMENDATIONS = {
+    PredictionType.SURVIVAL_PROBABILITY: [
+        "Build emergency fund to 6 months",
+        "Reduce debt-to-income ratio below 50%",
+        "Increase savings rate to 20%+"
+    ],
+    PredictionType.LAYOFF_RISK: [
+        "Build emergency fund (6-12 months)",
+        "Diversify income sources",
+        "Update resume and professional skills",
+        "Network actively in your industry"
+    ],
+    PredictionType.SAVINGS_TRAJECTORY: [
+        "Increase monthly savings by 10%",
+        "Consider higher return investments",
+        "Automate savings transfers",
+        "Review investment allocation"
+    ],
+}
+
+BATCH_CONFIDENCE = {
+    PredictionType.SURVIVAL_PROBABILITY: 0.75,
+    PredictionType.LAYOFF_RISK: 0.7,
+    PredictionType.SAVINGS_TRAJECTORY: 0.8,
+}
+
+
+# Horizon solvency below this is explained by survival factors
+SOLVENCY_WARNING = 0.9
+
+
+def horizon_days(horizon: TimeHorizon) -> int:
+    """Length of a time horizon in days ("90day" -> 90)."""
+    return int(horizon.value.removesuffix("day"))
+
+
+def predict_survival_batch(
+    rows: List[Any],
+    time_horizon: TimeHorizon
+) -> tuple[np.ndarray, List[List[str]], Dict[int, str], Dict[str, np.ndarray]]:
+    """
+    Survival probability at the requested horizon for every row.
+
+    One survival curve per row is computed as arrays; the requested and
+    every other TimeHorizon are read off the same curves. Factors are read
+    off the curve too: below SOLVENCY_WARNING at `time_horizon` they name
+    the weak inputs and the solvency, and a curve that reaches zero gives
+    the month savings run out. The emergency runway is
+    emergency_fund / monthly_expenses when both are given, otherwise
+    emergency_months.
+    """
+    matrix, errors = build_batch_matrix(rows, SURVIVAL_BATCH_FIELDS)
+    # Invalid rows are reported, not scored; keep them out of the curve maths
+    matrix[list(errors)] = 0.0
+    (emergency_months, debt_ratio, savings_rate, emergency_fund, monthly_expenses,
+     monthly_income, income_stability, layoff_risk) = matrix.T
+
+    has_fund = (emergency_fund > 0) & (monthly_expenses > 0)
+    runway = np.where(
+        has_fund, emergency_fund / np.where(has_fund, monthly_expenses, 1.0), emergency_months
+    )
+
+    surplus, burn = survival_algorithm.cash_flow_rates(
+        savings_rate, debt_ratio, income_stability, monthly_income, monthly_expenses
+    )
+    days = {horizon.value: horizon_days(horizon) for horizon in TimeHorizon}
+    curves = survival_algorithm.survival_curve(
+        runway, surplus, burn, layoff_risk,
+        months=survival_algorithm.curve_months(*days.values())
+    )
+    horizons = {
+        name: survival_algorithm.survival_at(curves, value) for name, value in days.items()
+    }
+    solvent = horizons[time_horizon.value]
+    depleted = survival_algorithm.depletion_month(curves)
+
+    factors = []
+    for index in range(len(rows)):
+        row_factors = []
+        if solvent[index] < SOLVENCY_WARNING:
+            # Name the inputs behind a low solvency, not for every user
+            if runway[index] < 3:
+                row_factors.append("Low emergency fund")
+            if debt_ratio[index] > 0.5:
+                row_factors.append("High debt ratio")
+            if savings_rate[index] < 10:
+                row_factors.append("Low savings rate")
+            row_factors.append(
+                f"{solvent[index]:.0%} chance of staying solvent for "
+                f"{horizon_days(time_horizon)} days"
+            )
+        if depleted[index] > 0:
+            row_factors.append(f"Savings run out in {depleted[index]} months")
+        factors.append(row_factors or ["Financial data analyzed"])
+    return solvent, factors, errors, horizons
+
+
+@app.post(
+    "/predictive-analytics/batch",
+    response_model=PredictionBatchResponse,
+    tags=["Predictions"]
+)
+def predictive_analytics_batch(request: PredictiveAnalyticsBatchRequest):
+    """
+    Generate predictions of a single type for many users at once.
+
+    Rows are validated and scored as one matrix; invalid rows are reported
+    by index with an error message and do not fail the rest of the batch.
+    """
+    start_time = time.time()
+    try:
+        prediction_type = request.prediction_type
+        rows = request.user_data
+
+        model = None
+        if prediction_type == PredictionType.SURVIVAL_PROBABILITY:
+            values, factors, errors, _ = predict_survival_batch(
+                rows, request.time_horizon
+            )
+            decimals = 3
+        elif prediction_type == PredictionType.LAYOFF_RISK:
+            model = MODELS["layoff"]
+            values, errors = model.predict_batch(rows)
+            factors = [
+                [
+                    f"Industry: {row.get('industry', 'IT')}",
+                    f"Experience: {row.get('experience_years', 1)} years"
+                ] if isinstance(row, dict) else []
+                for row in rows
+            ]
+            decimals = 3
+        else:
+            model = MODELS["savings"]
+            values, errors = model.predict_batch(rows)
+            factors = [
+                [
+                    f"Current savings: {row.get('current_savings', 0)}",
+                    f"Monthly contribution: {row.get('monthly_savings', 0)}",
+                    f"Expected return: {row.get('expected_return', 7)}%"
+                ] if isinstance(row, dict) else []
+                for row in rows
+            ]
+            decimals = 2
+
+        rounded = np.round(values, decimals)
+        results = [
+            PredictionBatchItem(index=index, error=errors[index])
+            if index in errors
+            else PredictionBatchItem(
+                index=index,
+                predicted_value=float(rounded[index]),
+                factors=factors[index]
+            )
+            for index in range(len(rows))
+        ]
+
+        duration = time.time() - start_time
+        logger.info(
+            "Batch %s prediction completed: %d rows, %d failed, in %.3fs",
+            prediction_type.value,
+            len(rows),
+            len(errors),
+            duration
+        )
+
+        return PredictionBatchResponse(
+            prediction_type=prediction_type.value,
+            time_horizon=request.time_horizon.value,
+            confidence_score=BATCH_CONFIDENCE[prediction_type],
+            results=results,
+            recommendations=BATCH_RECOMMENDATIONS[prediction_type],
+            succeeded=len(rows) - len(errors),
+            failed=len(errors),
+            model_version=model_version(model) if model is not None else None,
+            timestamp=get_timestamp()
+        )
+
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error(
+            "Batch predictive analytics failed: %s",
+            str(e),
+            exc_info=True
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch predictive analytics failed: {str(e)}"
+        ) from e
+
+
+# ============================================================================
+# WHAT-IF SIMULATION
+# ============================================================================
+
+def what_if_recommendations(
+    params: Dict[str, float],
+    survival_probability: float,
+    median_net_worth: float,
+    starting_net_worth: float
+) -> List[str]:
+    """Build recommendations from simulation results."""
+    recommendations = []
+    if survival_probability < 0.9:
+        recommendations.append(
+            "Savings run out in over 10% of scenarios: build a larger emergency fund"
+        )
+    if median_net_worth < starting_net_worth:
+        recommendations.append(
+            "Median net worth declines: expenses outpace income over this horizon"
+        )
+    if params["job_loss_probability"] >= 0.1:
+        recommendations.append(
+            "Job loss risk is material: keep 6-12 months of expenses liquid"
+        )
+    if params["expense_increase_probability"] > 0:
+        recommendations.append("Budget for expense growth before it happens")
+    if not recommendations:
+        recommendations.append("Plan is resilient across simulated scenarios")
+    return recommendations
+
+
+@app.post(
+    "/what-if/simulate",
+    response_model=WhatIfSimulationResponse,
+    tags=["Simulation"]
+)
+def what_if_simulate(request: WhatIfSimulationRequest):
+    """
+    Run a Monte Carlo what-if projection of net worth.
+
+    All simulations are evaluated together as NumPy arrays over
+    (months x simulations). Scenarios cover job loss, raises, expense
+    increases and investment returns; pass a seed for reproducible results.
+    With adaptive=true, paths are drawn from randomly shifted Sobol
+    sequences with antithetic pairs until the final percentiles reach the
+    requested tolerance, with num_simulations (default MAX_SIMULATIONS) as
+    the cap.
+    """
+    start_time = time.time()
+    try:
+        params = monte_carlo.parse_scenarios(
+            request.scenarios, request.risk_tolerance.value
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        if request.adaptive:
+            max_paths = request.num_simulations
+            if "num_simulations" not in request.model_fields_set:
+                max_paths = MAX_SIMULATIONS
+            summary = monte_carlo.simulate_adaptive(
+                request.current_income,
+                request.current_expenses,
+                request.current_savings,
+                request.current_debt,
+                params,
+                request.simulation_years,
+                max_paths,
+                tolerance=request.tolerance,
+                seed=request.seed
+            )
+        else:
+            summary = monte_carlo.simulate(
+                request.current_income,
+                request.current_expenses,
+                request.current_savings,
+                request.current_debt,
+                params,
+                request.simulation_years,
+                request.num_simulations,
+                seed=request.seed
+            )
+        paths_used = summary.get("paths", request.num_simulations)
+
+        bands = summary["bands"]
+        projection = []
+        for year in range(request.simulation_years):
+            point = {"year": float(year + 1)}
+            for i, percentile in enumerate(monte_carlo.PERCENTILES):
+                point[f"p{percentile}"] = round(float(bands[i, year]), 2)
+            point["mean"] = round(float(summary["mean"][year]), 2)
+            projection.append(point)
+
+        survival_probability = float(summary["survival_probability"])
+        median_net_worth = float(summary["final_median"])
+
+        duration = time.time() - start_time
+        logger.info(
+            "What-if simulation completed: %d paths x %d years in %.3fs",
+            paths_used,
+            request.simulation_years,
+            duration
+        )
+
+        return WhatIfSimulationResponse(
+            net_worth_projection=projection,
+            survival_probability=round(survival_probability, 4),
+            average_net_worth=round(float(summary["final_mean"]), 2),
+            median_net_worth=round(median_net_worth, 2),
+            worst_case_net_worth=round(float(summary["final_worst"]), 2),
+            best_case_net_worth=round(float(summary["final_best"]), 2),
+            recommendations=what_if_recommendations(
+                params,
+                survival_probability,
+                median_net_worth,
+                request.current_savings - request.current_debt
+            ),
+            paths_used=paths_used,
+            converged=summary.get("converged"),
+            ci_half_widths={
+                f"p{percentile}": round(width, 2)
+                for percentile, width in summary.get("half_widths", {}).items()
+            } or None,
+            timestamp=get_timestamp()
+        )
+
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("What-if simulation failed: %s", str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"What-if simulation failed: {str(e)}"
+        ) from e
+
+
+@app.post(
+    "/what-if/goal-seek",
+    response_model=GoalSeekResponse,
+    tags=["Simulation"]
+)
+def what_if_goal_seek(request: GoalSeekRequest):
+    """
+    Find the monthly saving that reaches a target net worth with the
+    requested probability.
+
+    The scenario shocks are drawn once and reused for every contribution
+    (common random numbers), so the answer and its probability curve come
+    from a single simulation. The extra saving is treated as spending
+    cut from the current budget and continues through job loss.
+    """
+    start_time = time.time()
+    try:
+        params = monte_carlo.parse_scenarios(
+            request.scenarios, request.risk_tolerance.value
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        result = monte_carlo.goal_seek(
+            request.current_income,
+            request.current_expenses,
+            request.current_savings,
+            request.current_debt,
+            params,
+            request.simulation_years,
+            request.num_simulations,
+            request.target_net_worth,
+            probability=request.target_probability,
+            seed=request.seed
+        )
+        additional = result["contribution"]
+
+        logger.info(
+            "Goal seek completed: %.2f/month for p=%.2f over %d paths in %.3fs",
+            additional,
+            request.target_probability,
+            request.num_simulations,
+            time.time() - start_time
+        )
+
+        return GoalSeekResponse(
+            monthly_saving=round(
+                request.current_income - request.current_expenses + additional, 2
+            ),
+            additional_monthly_saving=round(additional, 2),
+            probability=round(result["probability"], 4),
+            baseline_probability=round(result["baseline_probability"], 4),
+            median_net_worth=round(result["median_net_worth"], 2),
+            probability_curve=[
+                {
+                    "additional_monthly_saving": round(amount, 2),
+                    "probability": round(probability, 4)
+                }
+                for amount, probability in result["curve"]
+            ],
+            paths_used=request.num_simulations,
+            timestamp=get_timestamp()
+        )
+
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Goal seek failed: %s", str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Goal seek failed: {str(e)}"
+        ) from e
+
+
+@app.post(
+    "/what-if/sweep",
+    response_model=WhatIfSweepResponse,
+    tags=["Simulation"]
+)
+def what_if_sweep(request: WhatIfSweepRequest):
+    """
+    Evaluate a grid of scenario combinations, e.g. for a sensitivity heatmap.
+
+    Every combination of the axis values overrides the request's scenarios.
+    The whole grid is one batched simulation sharing the same shocks,
+    chunked along the grid to stay within ML_SWEEP_MEMORY_MB. Each cell
+    reports the survival probability (the share of paths solvent in every
+    month of the horizon) and the mean and percentiles of final net worth.
+    """
+    start_time = time.time()
+    n_cells = math.prod(len(axis.values) for axis in request.axes)
+    if n_cells * request.num_simulations > MAX_SWEEP_PATHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sweep too large: {n_cells} cells x {request.num_simulations} "
+                   f"simulations exceeds {MAX_SWEEP_PATHS} paths"
+        )
+    try:
+        params = monte_carlo.sweep_params(
+            request.scenarios,
+            request.risk_tolerance.value,
+            [(axis.parameter, axis.values) for axis in request.axes]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        grid = monte_carlo.batch_statistics(
+            request.current_income,
+            request.current_expenses,
+            request.current_savings,
+            request.current_debt,
+            params,
+            request.simulation_years,
+            request.num_simulations,
+            seed=request.seed,
+            memory_bytes=SWEEP_MEMORY_BYTES
+        )
+
+        names = [axis.parameter for axis in request.axes]
+        cells = []
+        for index in np.ndindex(*grid["survival_probability"].shape):
+            cell = {name: float(params[name][index]) for name in names}
+            cell["survival_probability"] = round(float(grid["survival_probability"][index]), 4)
+            cell["mean"] = round(float(grid["final_mean"][index]), 2)
+            for i, percentile in enumerate(monte_carlo.PERCENTILES):
+                cell[f"p{percentile}"] = round(float(grid["bands"][(i,) + index]), 2)
+            cells.append(cell)
+
+        logger.info(
+            "What-if sweep completed: %d cells x %d paths in %.3fs",
+            n_cells,
+            request.num_simulations,
+            time.time() - start_time
+        )
+
+        return WhatIfSweepResponse(
+            parameters=names,
+            cells=cells,
+            paths_per_cell=request.num_simulations,
+            timestamp=get_timestamp()
+        )
+
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("What-if sweep failed: %s", str(e), exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"What-if sweep failed: {str(e)}"
+        ) from e
+
+
 # ============================================================================
 # ERROR HANDLERS
 # ============================================================================
@@ -0,0 +1,432 @@
+"""
+CAPSTACK Metrics - In-process instrumentation and Prometheus exposition
+Counters, gauges and fixed-bucket histograms that record without locks or
+allocation, an ASGI middleware for per-route request metrics, and the
+text exposition format served at /metrics
+"""
+
+import asyncio
+import functools
+import math
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+
+# Seconds; covers sub-millisecond model calls up to multi-second requests
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+# Seconds; finer resolution for individual request and model stages
+STAGE_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 1.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+PREFIX = "capstack_ml_"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    observe() only bisects a tuple and bumps list slots, so it allocates
+    nothing and takes no lock; under the GIL a rare concurrent update may
+    be lost, which is acceptable for monitoring.
+    """
+
+    def __init__(self, name: str, buckets: Sequence[float], description: str = ""):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts plus sum and count"""
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = running + self.counts[-1]
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        """Add to the counter"""
+        self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        """Increase the gauge"""
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        """Decrease the gauge"""
+        self.value -= amount
+
+    def set(self, value: float):
+        """Set the gauge"""
+        self.value = value
+
+
+class Family:
+    """
+    A named metric with labelled children.
+
+    Resolve children once with labels() and keep the reference; recording
+    on a child is then a plain attribute update.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Child for the given label values, created on first use"""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterable[Tuple[Tuple[str, ...], Any]]:
+        """(label values, child) pairs to expose"""
+        return list(self.children.items())
+
+
+class CounterFamily(Family):
+    """Labelled counters"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return Counter()
+
+
+class GaugeFamily(Family):
+    """Labelled gauges"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return Gauge()
+
+
+class HistogramFamily(Family):
+    """Labelled histograms sharing one bucket layout"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return Histogram(self.name, self.buckets, self.description)
+
+
+class FunctionFamily(Family):
+    """Counter or gauge whose samples are computed at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str],
+        kind: str,
+        collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+    ):
+        super().__init__(name, description, label_names)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self):
+        return [(labels, _Sample(value)) for labels, value in self.collect()]
+
+
+class _Sample:
+    """A computed value rendered like a counter or gauge child"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: float):
+        self.value = value
+
+
+REGISTRY: List[Family] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if math.isnan(value):
+            return "NaN"
+    return repr(value)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for family in REGISTRY:
+        samples = family.samples()
+        if not samples:
+            continue
+        lines.append(f"# HELP {family.name} {family.description}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for values, child in samples:
+            if family.kind != "histogram":
+                lines.append(
+                    f"{family.name}{_labels(family.label_names, values)} "
+                    f"{_number(child.value)}"
+                )
+                continue
+            running = 0
+            for bound, count in zip(child.buckets, child.counts):
+                running += count
+                label = _labels(family.label_names, values, f'le="{bound}"')
+                lines.append(f"{family.name}_bucket{label} {running}")
+            label = _labels(family.label_names, values, 'le="+Inf"')
+            lines.append(f"{family.name}_bucket{label} {running + child.counts[-1]}")
+            plain = _labels(family.label_names, values)
+            lines.append(f"{family.name}_sum{plain} {_number(child.sum)}")
+            lines.append(f"{family.name}_count{plain} {child.count}")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# REQUEST AND MODEL METRICS
+# ============================================================================
+
+HTTP_REQUESTS = CounterFamily(
+    "http_requests_total", "HTTP requests handled", ("route", "method")
+)
+HTTP_ERRORS = CounterFamily(
+    "http_request_errors_total",
+    "HTTP requests answered with a 4xx or 5xx status",
+    ("route", "method", "class"),
+)
+HTTP_LATENCY = HistogramFamily(
+    "http_request_duration_seconds",
+    "Time from request receipt to response start",
+    ("route", "method"),
+)
+IN_FLIGHT = GaugeFamily("http_requests_in_flight", "Requests being handled").labels()
+REQUEST_STAGES = HistogramFamily(
+    "request_stage_seconds",
+    "Request parsing/validation and response serialization time",
+    ("route", "stage"),
+    STAGE_BUCKETS,
+)
+MODEL_STAGES = HistogramFamily(
+    "model_stage_seconds",
+    "Model feature preparation and predict time",
+    ("model", "stage"),
+    STAGE_BUCKETS,
+)
+
+
+def model_stage_histograms(model: str) -> Tuple[Histogram, Histogram]:
+    """Feature-preparation and predict histograms for a model"""
+    return (
+        MODEL_STAGES.labels(model, "feature_prep"),
+        MODEL_STAGES.labels(model, "predict"),
+    )
+
+
+def record_stage(histogram: Histogram, started: float) -> float:
+    """Observe the time since `started` and return the current time"""
+    now = time.perf_counter()
+    histogram.observe(now - started)
+    return now
+
+
+class RouteMetrics:
+    """Pre-resolved children for one route and method"""
+
+    __slots__ = (
+        "requests", "client_errors", "server_errors", "latency",
+        "validation", "serialization",
+    )
+
+    def __init__(self, route: str, method: str):
+        self.requests = HTTP_REQUESTS.labels(route, method)
+        self.client_errors = HTTP_ERRORS.labels(route, method, "4xx")
+        self.server_errors = HTTP_ERRORS.labels(route, method, "5xx")
+        self.latency = HTTP_LATENCY.labels(route, method)
+        self.validation = REQUEST_STAGES.labels(route, "validation")
+        self.serialization = REQUEST_STAGES.labels(route, "serialization")
+
+
+class RequestTiming:
+    """Per-request timestamps shared between the middleware and the route"""
+
+    __slots__ = ("started", "handler_done", "metrics")
+
+    def __init__(self, started: float, metrics: RouteMetrics):
+        self.started = started
+        self.handler_done = 0.0
+        self.metrics = metrics
+
+
+CURRENT_REQUEST: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "capstack_current_request", default=None
+)
+
+
+def handler_started():
+    """Called as the endpoint starts: records parsing/validation time"""
+    timing = CURRENT_REQUEST.get()
+    if timing is not None:
+        timing.metrics.validation.observe(time.perf_counter() - timing.started)
+
+
+def handler_finished():
+    """Called as the endpoint returns: marks the start of serialization"""
+    timing = CURRENT_REQUEST.get()
+    if timing is not None:
+        timing.handler_done = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route counts, errors and latency.
+
+    Unknown paths share the route label "other" so arbitrary URLs cannot
+    grow the label set. Latency runs from receipt to the response start.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[str, Dict[str, RouteMetrics]]] = None
+
+    def _route_metrics(self, scope) -> RouteMetrics:
+        if self._routes is None:
+            self._routes = {
+                route.path: {}
+                for route in scope["app"].routes
+                if hasattr(route, "path")
+            }
+        method = scope["method"]
+        by_method = self._routes.get(scope["path"])
+        route = scope["path"]
+        if by_method is None:
+            by_method = self._routes.setdefault("other", {})
+            route = "other"
+        metrics = by_method.get(method)
+        if metrics is None:
+            metrics = by_method.setdefault(method, RouteMetrics(route, method))
+        return metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter(), self._route_metrics(scope))
+        token = CURRENT_REQUEST.set(timing)
+        metrics = timing.metrics
+        metrics.requests.inc()
+        IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                metrics.latency.observe(now - timing.started)
+                if timing.handler_done:
+                    metrics.serialization.observe(now - timing.handler_done)
+                status = message["status"]
+                if status >= 500:
+                    metrics.server_errors.inc()
+                elif status >= 400:
+                    metrics.client_errors.inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            metrics.latency.observe(time.perf_counter() - timing.started)
+            metrics.server_errors.inc()
+            raise
+        finally:
+            IN_FLIGHT.dec()
+            CURRENT_REQUEST.reset(token)
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that marks when its endpoint starts and returns.
+
+    FastAPI calls the endpoint only after reading and validating the body,
+    and serializes the response after it returns, so these two marks split
+    the request into validation, handler and serialization stages.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed(*args, **kwargs):
+                handler_started()
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    handler_finished()
+        else:
+            @functools.wraps(call)
+            def timed(*args, **kwargs):
+                handler_started()
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    handler_finished()
+        self.dependant.call = timed
+        return super().get_route_handler()
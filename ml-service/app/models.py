@@ -3,91 +3,140 @@ CAPSTACK ML Models - Advanced Machine Learning Models
 Trained models for financial prediction and risk assessment
 """
 
+import importlib.util
 import json
 import logging
+import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
 import numpy as np
-from sklearn.ensemble import (  # type: ignore
-    RandomForestRegressor,
-    GradientBoostingClassifier,
+
+from .artifacts import artifact_dir, export_artifact, load_artifact, MANIFEST_NAME
+from .batching import MicroBatcher
+from .cache import PREDICTION_CACHE, cached_prediction
+from .compiled_trees import CompiledTreeEnsemble, compile_ensemble
+from .features import (
+    INDUSTRY_CODES,
+    LAYOFF_FEATURES,
+    RISK_FEATURES,
+    SAVINGS_FEATURES,
+    build_batch_matrix,
 )
-from sklearn.preprocessing import StandardScaler  # type: ignore
-import joblib
+from .metrics import FunctionFamily, model_stage_histograms, record_stage
+from .startup import lazy_import, record_model_load
+from .threads import THREAD_BUDGET
 
 logger = logging.getLogger(__name__)
 
-MODEL_DIR = Path("app/models")
-MODEL_DIR.mkdir(exist_ok=True)
+MODEL_DIR = Path(os.getenv("ML_MODEL_DIR", "app/models"))
+MODEL_DIR.mkdir(parents=True, exist_ok=True)
+
+# Batches up to this size use the compiled ensemble; larger batches amortize
+# the native estimator's fixed overhead and run faster there
+COMPILED_MAX_ROWS = 32
+
+def _select_estimator(native, compiled, n_rows: int):
+    """
+    Compiled ensemble for small batches, native estimator otherwise.
+
+    The native estimator runs on the thread count THREAD_BUDGET allows for
+    n_rows: one thread for small batches, the worker's share (through the
+    copy prepared at load) for large ones.
+    """
+    if compiled is not None and n_rows <= COMPILED_MAX_ROWS:
+        return compiled
+    if native is not None:
+        return THREAD_BUDGET.estimator_for(native, n_rows)
+    return native
+
+
+def _valid_mask(n_rows: int, errors: Dict[int, str]) -> np.ndarray:
+    """Boolean mask selecting rows without validation errors"""
+    mask = np.ones(n_rows, dtype=bool)
+    if errors:
+        mask[list(errors)] = False
+    return mask
 
 
 class FinancialRiskModel:
     """Enhanced Risk scoring model using advanced ensemble methods"""
 
+    FEATURES = RISK_FEATURES
+    BATCH_FIELDS = FEATURES.inputs
+
+    # Prediction cache namespace and the inputs predict() reads
+    CACHE_NAME = "risk"
+    KEY_FIELDS = tuple(field[0] for field in BATCH_FIELDS)
+    # Representative input used to warm up a freshly loaded model
+    WARMUP_ROW = {"income": 50000, "expenses": 30000, "savings": 10000, "debt": 5000}
+    FEATURE_PREP_SECONDS, PREDICT_SECONDS = model_stage_histograms("risk")
+
     def __init__(self):
-        # Use XGBoost for better performance
+        # Estimators are built on first train so importing this module
+        # does not pull in sklearn or xgboost
+        self.model = None
+        self.scaler = None
+        self.is_trained = False
+        self.compiled = None
+        # Identifies the loaded weights in prediction cache keys
+        self.revision = "rules"
+        has_xgboost = importlib.util.find_spec("xgboost") is not None
+        model_type = "XGBoost" if has_xgboost else "RandomForest"
+        self.metadata = {
+            "version": "2.0.0",
+            "created": datetime.utcnow().isoformat(),
+            "accuracy_score": 0.0,
+            "model_type": model_type,
+            "features": list(self.FEATURES.feature_names)
+        }
+
+    @staticmethod
+    def _build_estimator():
+        """Create the untrained estimator, preferring XGBoost"""
         try:
-            from xgboost import XGBRegressor
-            self.model = XGBRegressor(
+            xgboost = lazy_import("xgboost")
+            return xgboost.XGBRegressor(
                 n_estimators=200,
                 max_depth=8,
                 learning_rate=0.05,
                 subsample=0.8,
                 colsample_bytree=0.8,
                 random_state=42,
-                n_jobs=-1,
+                n_jobs=THREAD_BUDGET.threads_per_worker,
                 objective='reg:squarederror',
                 reg_alpha=0.1,
                 reg_lambda=0.1
             )
         except ImportError:
             # Fallback to RandomForest if XGBoost not available
-            self.model = RandomForestRegressor(
+            ensemble = lazy_import("sklearn.ensemble")
+            return ensemble.RandomForestRegressor(
                 n_estimators=200,
                 max_depth=12,
                 min_samples_split=5,
                 min_samples_leaf=2,
                 random_state=42,
-                n_jobs=-1,
+                n_jobs=THREAD_BUDGET.threads_per_worker,
                 max_features='sqrt'
             )
-        self.scaler = StandardScaler()
-        self.is_trained = False
-        has_booster = hasattr(self.model, 'booster')
-        model_type = "XGBoost" if has_booster else "RandomForest"
-        self.metadata = {
-            "version": "2.0.0",
-            "created": datetime.utcnow().isoformat(),
-            "accuracy_score": 0.0,
-            "model_type": model_type,
-            "features": [
-                "income", "expenses", "savings", "debt",
-                "debt_to_income", "savings_to_income", "expense_to_income"
-            ]
-        }
-
-    def prepare_features(self, data: Dict[str, float]) -> np.ndarray:
-        """Prepare input features for prediction"""
-        features = [
-            data.get("income", 0),
-            data.get("expenses", 0),
-            data.get("savings", 0),
-            data.get("debt", 0),
-            data.get("debt", 0) / max(data.get("income", 1), 1),
-            data.get("savings", 0) / max(data.get("income", 1), 1),
-            data.get("expenses", 0) / max(data.get("income", 1), 1)
-        ]
-        return np.array(features).reshape(1, -1)
 
+    @cached_prediction
     def predict(self, data: Dict[str, float]) -> float:
         """Predict risk score"""
+        started = time.perf_counter()
         if not self.is_trained:
-            return self._rule_based_risk(data)
-        features = self.prepare_features(data)
+            score = self._rule_based_risk(data)
+            record_stage(self.PREDICT_SECONDS, started)
+            return score
+        features = self.FEATURES.transform_row(data)
         scaled = self.scaler.transform(features)
-        score = self.model.predict(scaled)[0]
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, 1)
+        score = estimator.predict(scaled)[0]
+        record_stage(self.PREDICT_SECONDS, started)
         return min(max(score, 0), 100)
 
     @staticmethod
@@ -105,11 +154,79 @@ class FinancialRiskModel:
         ) * 100
         return min(max(risk, 0), 100)
 
+    def predict_batch(
+        self, rows: Sequence[Any], lenient: bool = False
+    ) -> Tuple[np.ndarray, Dict[int, str]]:
+        """
+        Predict risk scores for many rows with one scaler and model call.
+
+        Returns an array of scores (NaN for rejected rows) and a mapping of
+        row index to validation error. `lenient` accepts rows as predict()
+        does (see build_batch_matrix), including income <= 0.
+        """
+        _, scores, errors = self.score_batch(rows, lenient)
+        return scores, errors
+
+    def score_batch(
+        self, rows: Sequence[Any], lenient: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+        """
+        predict_batch() that also returns the validated input matrix.
+
+        The (n_rows, BATCH_FIELDS) matrix lets callers derive per-row
+        values (e.g. ratios) without validating the rows a second time.
+        """
+        started = time.perf_counter()
+        raw, errors = build_batch_matrix(rows, self.BATCH_FIELDS, lenient)
+        if not lenient:
+            for index in np.flatnonzero(raw[:, 0] <= 0):
+                errors.setdefault(int(index), "income must be > 0")
+        valid = _valid_mask(len(rows), errors)
+        scores = np.full(len(rows), np.nan)
+        if not valid.any():
+            return raw, scores, errors
+
+        if not self.is_trained:
+            started = record_stage(self.FEATURE_PREP_SECONDS, started)
+            scores[valid] = self._rule_based_risk_batch(raw[valid])
+            record_stage(self.PREDICT_SECONDS, started)
+            return raw, scores, errors
+        features = self.FEATURES.transform_rows(raw[valid])
+        scaled = self.scaler.transform(features)
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, len(scaled))
+        scores[valid] = np.clip(estimator.predict(scaled), 0, 100)
+        record_stage(self.PREDICT_SECONDS, started)
+        return raw, scores, errors
+
+    @staticmethod
+    def _rule_based_risk_batch(raw: np.ndarray) -> np.ndarray:
+        """Vectorized form of _rule_based_risk over raw input columns"""
+        income, expenses, savings, debt = raw.T
+        positive = income > 0
+        safe_income = np.where(positive, income, 1)
+        expense_ratio = np.where(positive, expenses / safe_income, 1)
+        savings_ratio = np.where(positive, savings / safe_income, 0)
+        debt_ratio = np.where(positive, debt / safe_income, 1)
+
+        risk = (
+            (expense_ratio * 0.5) +
+            ((1 - savings_ratio) * 0.3) +
+            (debt_ratio * 0.2)
+        ) * 100
+        return np.clip(risk, 0, 100)
+
     def train(self, X: np.ndarray, y: np.ndarray):
         """Train the model"""
+        if not hasattr(self.model, "fit"):
+            self.model = self._build_estimator()
+        self.scaler = lazy_import("sklearn.preprocessing").StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
         self.is_trained = True
+        self.compiled = None
+        self.revision = f"trained:{time.time_ns()}"
+        self.metadata["features"] = list(self.FEATURES.feature_names)
         accuracy = self.model.score(X_scaled, y)
         self.metadata["accuracy_score"] = float(accuracy)
         logger.info("Risk model trained with accuracy: %.3f", accuracy)
@@ -120,11 +237,13 @@ class FinancialRiskModel:
         scaler_path = MODEL_DIR / "risk_scaler.pkl"
         metadata_path = MODEL_DIR / "risk_metadata.json"
 
+        joblib = lazy_import("joblib")
         joblib.dump(self.model, model_path)
         joblib.dump(self.scaler, scaler_path)
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, indent=2)
         logger.info("Risk model saved to %s", model_path)
+        _export_artifact(self, "risk")
 
     def load(self):
         """Load model from disk"""
@@ -132,9 +251,11 @@ class FinancialRiskModel:
         scaler_path = MODEL_DIR / "risk_scaler.pkl"
 
         if model_path.exists() and scaler_path.exists():
+            joblib = lazy_import("joblib")
             self.model = joblib.load(model_path)
             self.scaler = joblib.load(scaler_path)
             self.is_trained = True
+            self.revision = f"pickle:{model_path.stat().st_mtime_ns}"
             logger.info("Risk model loaded successfully")
         else:
             logger.warning(
@@ -145,72 +266,141 @@ class FinancialRiskModel:
 class LayoffRiskModel:
     """Layoff risk prediction using gradient boosting"""
 
+    INDUSTRY_CODES = INDUSTRY_CODES
+
+    INDUSTRY_RISK = {
+        "IT": 0.15,
+        "Manufacturing": 0.25,
+        "Retail": 0.35,
+        "Finance": 0.20,
+        "Healthcare": 0.10
+    }
+
+    FEATURES = LAYOFF_FEATURES
+    BATCH_FIELDS = FEATURES.inputs
+
+    CACHE_NAME = "layoff"
+    KEY_FIELDS = ("industry", "contract_type") + tuple(
+        field[0] for field in BATCH_FIELDS
+    )
+    WARMUP_ROW = {
+        "industry": "IT", "contract_type": "permanent", "experience_years": 5,
+        "company_age": 12, "team_size": 20, "performance_rating": 4,
+    }
+    FEATURE_PREP_SECONDS, PREDICT_SECONDS = model_stage_histograms("layoff")
+
     def __init__(self):
-        self.model = GradientBoostingClassifier(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5,
-            random_state=42
-        )
-        self.scaler = StandardScaler()
+        self.model = None
+        self.scaler = None
         self.is_trained = False
+        self.compiled = None
+        self.revision = "rules"
         self.metadata = {
             "version": "1.0.0",
             "created": datetime.utcnow().isoformat(),
             "accuracy_score": 0.0
         }
 
-    def prepare_features(self, data: Dict[str, Any]) -> np.ndarray:
-        """Prepare input features"""
-        industry_map = {
-            "IT": 1,
-            "Manufacturing": 2,
-            "Retail": 3,
-            "Finance": 4,
-            "Healthcare": 5
-        }
-
-        features = [
-            industry_map.get(data.get("industry", "IT"), 1),
-            data.get("experience_years", 5),
-            data.get("company_age", 10),
-            data.get("team_size", 10),
-            1 if data.get("contract_type") == "permanent" else 0,
-            data.get("performance_rating", 3)
-        ]
-        return np.array(features).reshape(1, -1)
+    @staticmethod
+    def _build_estimator():
+        """Create the untrained estimator"""
+        ensemble = lazy_import("sklearn.ensemble")
+        return ensemble.GradientBoostingClassifier(
+            n_estimators=100,
+            learning_rate=0.1,
+            max_depth=5,
+            random_state=42
+        )
 
+    @cached_prediction
     def predict(self, data: Dict[str, Any]) -> float:
         """Predict layoff risk"""
+        started = time.perf_counter()
         if not self.is_trained:
-            return self._rule_based_risk(data)
-        features = self.prepare_features(data)
+            risk = self._rule_based_risk(data)
+            record_stage(self.PREDICT_SECONDS, started)
+            return risk
+        features = self.FEATURES.transform_row(data)
         scaled = self.scaler.transform(features)
-        prob = self.model.predict_proba(scaled)[0, 1]
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, 1)
+        prob = estimator.predict_proba(scaled)[0, 1]
+        record_stage(self.PREDICT_SECONDS, started)
         return float(prob)
 
-    @staticmethod
-    def _rule_based_risk(data: Dict[str, Any]) -> float:
+    @classmethod
+    def _rule_based_risk(cls, data: Dict[str, Any]) -> float:
         """Fallback rule-based calculation"""
-        industry_risk = {
-            "IT": 0.15,
-            "Manufacturing": 0.25,
-            "Retail": 0.35,
-            "Finance": 0.20,
-            "Healthcare": 0.10
-        }
         industry = data.get("industry", "IT")
-        base_risk = industry_risk.get(industry, 0.2)
+        base_risk = cls.INDUSTRY_RISK.get(industry, 0.2)
         experience = max(1, data.get("experience_years", 1))
         experience_factor = max(0.5, experience / 10)
         risk = base_risk / experience_factor
         return min(risk, 0.9)
 
+    def predict_batch(
+        self, rows: Sequence[Any], lenient: bool = False
+    ) -> Tuple[np.ndarray, Dict[int, str]]:
+        """
+        Predict layoff probabilities for many rows in one model call.
+
+        Returns an array of probabilities (NaN for rejected rows) and a
+        mapping of row index to validation error. `lenient` accepts rows as
+        predict() does (see build_batch_matrix).
+        """
+        started = time.perf_counter()
+        raw, errors = build_batch_matrix(
+            rows, self.BATCH_FIELDS, lenient, labels=self.FEATURES.categories
+        )
+        valid = _valid_mask(len(rows), errors)
+        probabilities = np.full(len(rows), np.nan)
+        if not valid.any():
+            return probabilities, errors
+
+        valid_rows = [row for row, ok in zip(rows, valid) if ok]
+        if not self.is_trained:
+            started = record_stage(self.FEATURE_PREP_SECONDS, started)
+            probabilities[valid] = self._rule_based_risk_batch(
+                valid_rows, raw[valid]
+            )
+            record_stage(self.PREDICT_SECONDS, started)
+            return probabilities, errors
+        features = self.FEATURES.transform_rows(raw[valid], valid_rows)
+        scaled = self.scaler.transform(features)
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, len(scaled))
+        probabilities[valid] = estimator.predict_proba(scaled)[:, 1]
+        record_stage(self.PREDICT_SECONDS, started)
+        return probabilities, errors
+
+    @classmethod
+    def _rule_based_risk_batch(
+        cls, rows: Sequence[Dict[str, Any]], raw: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized form of _rule_based_risk"""
+        base_risk = np.array([
+            cls.INDUSTRY_RISK.get(row.get("industry", "IT"), 0.2)
+            for row in rows
+        ])
+        # The rule path defaults missing experience to 1 year, not 5
+        has_experience = np.array([
+            "experience_years" in row for row in rows
+        ])
+        experience = np.maximum(1, np.where(has_experience, raw[:, 0], 1))
+        experience_factor = np.maximum(0.5, experience / 10)
+        return np.minimum(base_risk / experience_factor, 0.9)
+
     def train(self, X: np.ndarray, y: np.ndarray):
         """Train the model"""
+        if not hasattr(self.model, "fit"):
+            self.model = self._build_estimator()
+        self.scaler = lazy_import("sklearn.preprocessing").StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
         self.is_trained = True
+        self.compiled = None
+        self.revision = f"trained:{time.time_ns()}"
+        self.metadata["features"] = list(self.FEATURES.feature_names)
         accuracy = self.model.score(X_scaled, y)
         self.metadata["accuracy_score"] = float(accuracy)
         logger.info("Layoff risk model trained with accuracy: %.3f", accuracy)
@@ -221,11 +411,13 @@ class LayoffRiskModel:
         scaler_path = MODEL_DIR / "layoff_scaler.pkl"
         metadata_path = MODEL_DIR / "layoff_metadata.json"
 
+        joblib = lazy_import("joblib")
         joblib.dump(self.model, model_path)
         joblib.dump(self.scaler, scaler_path)
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, indent=2)
         logger.info("Layoff model saved to %s", model_path)
+        _export_artifact(self, "layoff")
 
     def load(self):
         """Load model from disk"""
@@ -233,9 +425,11 @@ class LayoffRiskModel:
         scaler_path = MODEL_DIR / "layoff_scaler.pkl"
 
         if model_path.exists() and scaler_path.exists():
+            joblib = lazy_import("joblib")
             self.model = joblib.load(model_path)
             self.scaler = joblib.load(scaler_path)
             self.is_trained = True
+            self.revision = f"pickle:{model_path.stat().st_mtime_ns}"
             logger.info("Layoff model loaded successfully")
         else:
             logger.warning(
@@ -246,40 +440,53 @@ class LayoffRiskModel:
 class SavingsProjectionModel:
     """Savings trajectory prediction"""
 
+    FEATURES = SAVINGS_FEATURES
+    BATCH_FIELDS = FEATURES.inputs
+
+    CACHE_NAME = "savings"
+    KEY_FIELDS = tuple(field[0] for field in BATCH_FIELDS)
+    WARMUP_ROW = {
+        "current_savings": 10000, "monthly_savings": 1000, "expected_return": 7,
+    }
+    FEATURE_PREP_SECONDS, PREDICT_SECONDS = model_stage_histograms("savings")
+
     def __init__(self):
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=12,
-            random_state=42,
-            n_jobs=-1
-        )
-        self.scaler = StandardScaler()
+        self.model = None
+        self.scaler = None
         self.is_trained = False
+        self.compiled = None
+        self.revision = "rules"
         self.metadata = {
             "version": "1.0.0",
             "created": datetime.utcnow().isoformat(),
             "r2_score": 0.0
         }
 
-    def prepare_features(self, data: Dict[str, Any]) -> np.ndarray:
-        """Prepare input features"""
-        features = [
-            data.get("current_savings", 0),
-            data.get("monthly_savings", 0),
-            data.get("expected_return", 7),
-            data.get("inflation_rate", 3.5),
-            data.get("months_to_project", 12),
-            data.get("investment_type", 0)
-        ]
-        return np.array(features).reshape(1, -1)
+    @staticmethod
+    def _build_estimator():
+        """Create the untrained estimator"""
+        ensemble = lazy_import("sklearn.ensemble")
+        return ensemble.RandomForestRegressor(
+            n_estimators=100,
+            max_depth=12,
+            random_state=42,
+            n_jobs=THREAD_BUDGET.threads_per_worker
+        )
 
+    @cached_prediction
     def predict(self, data: Dict[str, Any]) -> float:
         """Predict future savings"""
+        started = time.perf_counter()
         if not self.is_trained:
-            return self._calculate_projection(data)
-        features = self.prepare_features(data)
+            value = self._calculate_projection(data)
+            record_stage(self.PREDICT_SECONDS, started)
+            return value
+        features = self.FEATURES.transform_row(data)
         scaled = self.scaler.transform(features)
-        value = self.model.predict(scaled)[0]
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, 1)
+        value = estimator.predict(scaled)[0]
+        record_stage(self.PREDICT_SECONDS, started)
         return max(0, float(value))
 
     @staticmethod
@@ -304,11 +511,64 @@ class SavingsProjectionModel:
 
         return future
 
+    def predict_batch(
+        self, rows: Sequence[Any], lenient: bool = False
+    ) -> Tuple[np.ndarray, Dict[int, str]]:
+        """
+        Predict future savings for many rows in one model call.
+
+        Returns an array of projected values (NaN for rejected rows) and a
+        mapping of row index to validation error. `lenient` accepts rows as
+        predict() does (see build_batch_matrix).
+        """
+        started = time.perf_counter()
+        raw, errors = build_batch_matrix(rows, self.BATCH_FIELDS, lenient)
+        valid = _valid_mask(len(rows), errors)
+        values = np.full(len(rows), np.nan)
+        if not valid.any():
+            return values, errors
+
+        if not self.is_trained:
+            started = record_stage(self.FEATURE_PREP_SECONDS, started)
+            values[valid] = self._calculate_projection_batch(raw[valid])
+            record_stage(self.PREDICT_SECONDS, started)
+            return values, errors
+        features = self.FEATURES.transform_rows(raw[valid])
+        scaled = self.scaler.transform(features)
+        started = record_stage(self.FEATURE_PREP_SECONDS, started)
+        estimator = _select_estimator(self.model, self.compiled, len(scaled))
+        values[valid] = np.maximum(0, estimator.predict(scaled))
+        record_stage(self.PREDICT_SECONDS, started)
+        return values, errors
+
+    @staticmethod
+    def _calculate_projection_batch(raw: np.ndarray) -> np.ndarray:
+        """Vectorized form of _calculate_projection over input columns"""
+        current = raw[:, 0]
+        monthly = raw[:, 1]
+        ret = raw[:, 2] / 100 / 12
+        months = raw[:, 4]
+
+        growth_factor = (1 + ret) ** months
+        safe_ret = np.where(ret == 0, 1, ret)
+        compounded = (
+            current * growth_factor +
+            monthly * (growth_factor - 1) / safe_ret
+        )
+        future = np.where(ret == 0, current + monthly * months, compounded)
+        return np.where(months <= 0, current, future)
+
     def train(self, X: np.ndarray, y: np.ndarray):
         """Train the model"""
+        if not hasattr(self.model, "fit"):
+            self.model = self._build_estimator()
+        self.scaler = lazy_import("sklearn.preprocessing").StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
         self.is_trained = True
+        self.compiled = None
+        self.revision = f"trained:{time.time_ns()}"
+        self.metadata["features"] = list(self.FEATURES.feature_names)
         r2_score = self.model.score(X_scaled, y)
         self.metadata["r2_score"] = float(r2_score)
         logger.info("Savings model trained with R² score: %.3f", r2_score)
@@ -319,11 +579,13 @@ class SavingsProjectionModel:
         scaler_path = MODEL_DIR / "savings_scaler.pkl"
         metadata_path = MODEL_DIR / "savings_metadata.json"
 
+        joblib = lazy_import("joblib")
         joblib.dump(self.model, model_path)
         joblib.dump(self.scaler, scaler_path)
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(self.metadata, f, indent=2)
         logger.info("Savings model saved to %s", model_path)
+        _export_artifact(self, "savings")
 
     def load(self):
         """Load model from disk"""
@@ -331,9 +593,11 @@ class SavingsProjectionModel:
         scaler_path = MODEL_DIR / "savings_scaler.pkl"
 
         if model_path.exists() and scaler_path.exists():
+            joblib = lazy_import("joblib")
             self.model = joblib.load(model_path)
             self.scaler = joblib.load(scaler_path)
             self.is_trained = True
+            self.revision = f"pickle:{model_path.stat().st_mtime_ns}"
             logger.info("Savings model loaded successfully")
         else:
             logger.warning(
@@ -341,14 +605,229 @@ class SavingsProjectionModel:
             )
 
 
-# Global model instances
-risk_model = FinancialRiskModel()
-layoff_model = LayoffRiskModel()
-savings_model = SavingsProjectionModel()
-
+# Global model instances. The registry swaps entries on reload, so always
+# look models up here rather than holding on to an instance
+MODELS = {
+    "risk": FinancialRiskModel(),
+    "layoff": LayoffRiskModel(),
+    "savings": SavingsProjectionModel(),
+}
+
+FunctionFamily(
+    "model_info",
+    "Loaded model version and revision (value is always 1)",
+    ("model", "version", "revision", "mode"),
+    "gauge",
+    lambda: [
+        (
+            (
+                name,
+                str(model.metadata.get("version")),
+                model.revision,
+                "trained" if model.is_trained else "rule_based",
+            ),
+            1,
+        )
+        for name, model in MODELS.items()
+    ],
+)
 
-def load_all_models():
-    """Load all trained models"""
-    risk_model.load()
-    layoff_model.load()
-    savings_model.load()
+def model_version(model) -> str:
+    """Version label reported in responses: metadata version + revision"""
+    return f"{model.metadata.get('version')}+{model.revision}"
+
+
+def model_versions() -> Tuple[Tuple[str, Any, str], ...]:
+    """(name, version, revision) of every loaded model"""
+    return tuple(
+        (name, model.metadata.get("version"), model.revision)
+        for name, model in MODELS.items()
+    )
+
+
+def _predict_rows(rows: Sequence[Tuple[Any, Any]]) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Lenient predict_batch over (model, row) pairs, grouped by model instance.
+
+    The rows come from single-row requests, so they are accepted by the
+    same rules as predict() rather than the stricter batch endpoint limits.
+
+    A batch only spans two instances when a reload swapped the model while
+    rows were queued; each row is still scored by the model it was
+    submitted to.
+    """
+    groups: Dict[int, List[int]] = {}
+    instances = {}
+    for index, (model, _) in enumerate(rows):
+        groups.setdefault(id(model), []).append(index)
+        instances[id(model)] = model
+    if len(groups) == 1:
+        return rows[0][0].predict_batch([row for _, row in rows], lenient=True)
+    values = np.full(len(rows), np.nan)
+    errors: Dict[int, str] = {}
+    for key, indices in groups.items():
+        group_values, group_errors = instances[key].predict_batch(
+            [rows[index][1] for index in indices], lenient=True
+        )
+        values[indices] = group_values
+        for position, message in group_errors.items():
+            errors[indices[position]] = message
+    return values, errors
+
+
+# Coalesce concurrent single-row requests into predict_batch calls
+BATCHERS = {name: MicroBatcher(name, _predict_rows) for name in MODELS}
+
+
+async def predict_async(name: str, data: Dict[str, Any], model=None) -> float:
+    """
+    Single-row prediction for request handlers.
+
+    Served from PREDICTION_CACHE when possible, otherwise evaluated through
+    the model's micro-batcher and cached. Pass the `model` instance the
+    handler resolved from MODELS to pin the request to that version across
+    a reload.
+    """
+    if model is None:
+        model = MODELS[name]
+    key = PREDICTION_CACHE.key(model, data)
+    value = PREDICTION_CACHE.get(key)
+    if value is None:
+        value = await BATCHERS[name].submit((model, data))
+        PREDICTION_CACHE.set(key, value)
+    return value
+
+
+def _export_artifact(model, name: str):
+    """Write the memory-mappable artifact next to a freshly saved .pkl"""
+    directory = artifact_dir(MODEL_DIR, name)
+    try:
+        export_artifact(
+            directory,
+            model.model,
+            model.scaler,
+            model.metadata,
+            source=f"{name}_model.pkl"
+        )
+    except ValueError as e:
+        # Never leave an artifact behind that no longer matches the .pkl
+        (directory / MANIFEST_NAME).unlink(missing_ok=True)
+        logger.warning("%s artifact not exported: %s", name, e)
+
+
+def _load_artifact(model, name: str) -> bool:
+    """
+    Load a model from its memory-mapped artifact if one is usable.
+
+    Artifacts older than the model's .pkl are skipped so a retrained model
+    saved without an artifact is never shadowed by a stale one.
+    """
+    manifest_path = artifact_dir(MODEL_DIR, name) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return False
+    pickle_path = MODEL_DIR / f"{name}_model.pkl"
+    if (
+        pickle_path.exists()
+        and pickle_path.stat().st_mtime > manifest_path.stat().st_mtime
+    ):
+        logger.warning("%s artifact is older than %s, ignoring it", name, pickle_path)
+        return False
+    try:
+        artifact = load_artifact(manifest_path.parent)
+    except (ValueError, OSError) as e:
+        logger.warning("%s artifact could not be loaded: %s", name, e)
+        return False
+
+    model.model = artifact.ensemble
+    model.compiled = artifact.ensemble
+    model.scaler = artifact.scaler
+    model.metadata.update(artifact.metadata)
+    model.is_trained = True
+    model.revision = f"artifact:{artifact.manifest.get('exported')}"
+    logger.info("%s model loaded from memory-mapped artifact", name)
+    return True
+
+
+def _compile(model) -> Optional[CompiledTreeEnsemble]:
+    """Compile a loaded estimator, or return None to keep the native one"""
+    try:
+        compiled = compile_ensemble(model.model)
+    except ValueError as e:
+        logger.warning(
+            "%s not compiled, using native estimator: %s",
+            type(model).__name__,
+            e
+        )
+        return None
+    logger.info(
+        "%s compiled: %d trees, max depth %d",
+        type(model).__name__,
+        compiled.n_trees,
+        compiled.max_depth
+    )
+    return compiled
+
+
+def load_all_models(compiled: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load all trained models.
+
+    Memory-mapped artifacts are preferred when present; otherwise the .pkl
+    estimators are unpickled and compiled to array form for low-latency
+    inference. Passing `compiled=False` (or ML_COMPILED_INFERENCE=false)
+    always loads the native .pkl estimators. A model whose files fail to
+    load falls back to its rule-based predictions without stopping the
+    others. Returns each model's load duration, source and error.
+    """
+    if compiled is None:
+        compiled = compiled_inference_enabled()
+    loads = {}
+    for name, model in MODELS.items():
+        started = time.perf_counter()
+        PREDICTION_CACHE.invalidate(name)
+        try:
+            loads[name] = record_model_load(name, started, load_model(model, name, compiled))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("%s model failed to load, using rule-based fallback: %s", name, str(e))
+            # Discard whatever load() set before failing
+            vars(model).update(vars(type(model)()))
+            loads[name] = record_model_load(name, started, "rule_based", str(e))
+    return loads
+
+
+def compiled_inference_enabled() -> bool:
+    """ML_COMPILED_INFERENCE setting (default true)"""
+    return os.getenv("ML_COMPILED_INFERENCE", "true").lower() not in (
+        "0", "false", "no"
+    )
+
+
+def load_model(model, name: str, compiled: bool) -> str:
+    """
+    Load one model instance in place from its artifact or .pkl files.
+
+    Returns where it came from: "artifact", "pickle" or "rule_based".
+    Raises FeatureSchemaError if the loaded model does not match the
+    model's feature pipeline.
+    """
+    if compiled and _load_artifact(model, name):
+        model.FEATURES.check(model.model, model.scaler, model.metadata)
+        return "artifact"
+    model.load()
+    if not model.is_trained:
+        return "rule_based"
+    # Reject a model built for different features now, not at first predict
+    model.FEATURES.check(model.model, model.scaler, model.metadata)
+    # Unpickled estimators keep the n_jobs they were trained with; fix it
+    # before the model is shared between requests
+    THREAD_BUDGET.prepare(model.model)
+    model.compiled = _compile(model) if compiled else None
+    return "pickle"
+
+
+def export_artifacts():
+    """Export memory-mapped artifacts from the existing .pkl files"""
+    for name, model in MODELS.items():
+        model.load()
+        if model.is_trained:
+            _export_artifact(model, name)
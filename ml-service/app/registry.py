@@ -0,0 +1,227 @@
+"""
+CAPSTACK Model Registry - Hot reload with atomic swap
+Watches the model directory (or is triggered through the admin endpoint),
+loads changed models into fresh instances off the event loop, warms them
+up and swaps them into MODELS in one assignment. Requests that already
+resolved the old instance finish on it
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from . import models
+from .artifacts import MANIFEST_NAME, artifact_dir
+from .cache import PREDICTION_CACHE
+
+logger = logging.getLogger(__name__)
+
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+# Changed files must be unchanged for this long before they are loaded
+SETTLE_SECONDS = 1.0
+
+
+def fingerprint(name: str) -> Fingerprint:
+    """(path, mtime_ns, size) of every file a model loads from"""
+    directory = models.MODEL_DIR
+    paths = list(directory.glob(f"{name}_*.pkl")) + list(directory.glob(f"{name}_*.json"))
+    paths.append(artifact_dir(directory, name) / MANIFEST_NAME)
+    entries = []
+    for path in sorted(paths):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+def warm_up(model) -> float:
+    """
+    Run single-row and batch predictions through a loaded model.
+
+    Touches predict() (bypassing the prediction cache), the compiled batch
+    path (one row) and the native batch path (more than COMPILED_MAX_ROWS
+    rows) so first requests do not pay first-call costs. Raises ValueError
+    if the model rejects or mis-scores its warm-up row. Returns the elapsed
+    seconds.
+    """
+    started = time.perf_counter()
+    if not math.isfinite(model.predict.__wrapped__(model, dict(model.WARMUP_ROW))):
+        raise ValueError("warm-up produced a non-finite prediction")
+    for n_rows in (1, models.COMPILED_MAX_ROWS + 1):
+        values, errors = model.predict_batch([dict(model.WARMUP_ROW)] * n_rows)
+        if errors:
+            raise ValueError(f"warm-up row rejected: {next(iter(errors.values()))}")
+        if not all(math.isfinite(value) for value in np.asarray(values, dtype=float)):
+            raise ValueError("warm-up produced non-finite predictions")
+    return time.perf_counter() - started
+
+
+class ModelRegistry:
+    """
+    Versioned view of MODELS with background reload.
+
+    Reloads are serialized by a lock and run synchronously in the calling
+    thread; `watch` polls the model directory and runs them in the default
+    executor. A model that fails to load or warm up keeps serving its
+    current version and reports the error.
+    """
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[str, Fingerprint] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        # Set once startup has loaded and warmed up every model
+        self.ready = False
+
+    def record_loaded(self, loads: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Remember the models loaded at startup and the files behind them"""
+        for name, model in models.MODELS.items():
+            load = (loads or {}).get(name, {})
+            self._fingerprints[name] = fingerprint(name)
+            self._status[name] = dict(
+                _describe(model),
+                source=load.get("source"),
+                loaded_at=datetime.utcnow().isoformat(),
+                load_ms=load.get("duration_ms"),
+                warmup_ms=None,
+                reloads=0,
+                last_error=load.get("error"),
+            )
+
+    def warm_up_all(self):
+        """
+        Warm up every served model, then mark the registry ready.
+
+        A trained model that fails its warm-up is replaced by the rule-based
+        fallback so the worker never serves a model it could not score with.
+        """
+        for name, model in list(models.MODELS.items()):
+            status = self._status.setdefault(name, {"reloads": 0})
+            try:
+                status["warmup_ms"] = round(warm_up(model) * 1000, 2)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("%s model failed warm-up, using rule-based fallback: %s",
+                             name, str(e))
+                fallback = type(model)()
+                status["warmup_ms"] = round(warm_up(fallback) * 1000, 2)
+                models.MODELS[name] = fallback
+                PREDICTION_CACHE.invalidate(name)
+                status.update(_describe(fallback), source="rule_based", last_error=str(e))
+        self.ready = True
+
+    def changed(self) -> Tuple[str, ...]:
+        """Models whose files differ from the loaded ones"""
+        return tuple(
+            name for name in models.MODELS
+            if fingerprint(name) != self._fingerprints.get(name)
+        )
+
+    def reload(self, names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Load, warm up and swap in the given models (default: all changed).
+
+        Unchanged models are skipped unless `force`. Returns the status of
+        every model after the reload.
+        """
+        with self._lock:
+            compiled = models.compiled_inference_enabled()
+            for name in names or models.MODELS:
+                if name not in models.MODELS:
+                    raise KeyError(f"Unknown model: {name}")
+                files = fingerprint(name)
+                if not force and files == self._fingerprints.get(name):
+                    continue
+                self._reload_one(name, files, compiled)
+            return self.status()
+
+    def _reload_one(self, name: str, files: Fingerprint, compiled: bool):
+        status = self._status.setdefault(name, {"reloads": 0})
+        current = models.MODELS[name]
+        started = time.perf_counter()
+        try:
+            fresh = type(current)()
+            source = models.load_model(fresh, name, compiled)
+            warm_seconds = warm_up(fresh)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Reloading %s model failed, keeping %s: %s",
+                         name, models.model_version(current), str(e))
+            status["last_error"] = str(e)
+            # Do not retry the same broken files on every poll
+            self._fingerprints[name] = files
+            return
+
+        # One dict assignment: handlers see either the old or the new model
+        models.MODELS[name] = fresh
+        PREDICTION_CACHE.invalidate(name)
+        self._fingerprints[name] = files
+        status.update(_describe(fresh))
+        status.update({
+            "source": source,
+            "loaded_at": datetime.utcnow().isoformat(),
+            "load_ms": round((time.perf_counter() - started) * 1000, 2),
+            "warmup_ms": round(warm_seconds * 1000, 2),
+            "reloads": status.get("reloads", 0) + 1,
+            "last_error": None,
+        })
+        logger.info("%s model reloaded: %s -> %s", name,
+                    models.model_version(current), status["version"])
+
+    async def watch(self):
+        """Poll the model directory and reload models whose files change"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                changed = await loop.run_in_executor(None, self.changed)
+                if not changed:
+                    continue
+                # Wait for train.py to finish writing the .pkl and artifact
+                before = {name: fingerprint(name) for name in changed}
+                await asyncio.sleep(SETTLE_SECONDS)
+                stable = [name for name in changed if fingerprint(name) == before[name]]
+                if stable:
+                    logger.info("Model files changed: %s", ", ".join(stable))
+                    await loop.run_in_executor(None, self.reload, stable)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Model directory watch failed: %s", str(e))
+
+    def start(self):
+        """Start watching on the running loop (no-op if polling is off)"""
+        if self.poll_seconds > 0 and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.get_running_loop().create_task(self.watch())
+
+    def stop(self):
+        """Stop the watcher task"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def status(self) -> Dict[str, Any]:
+        """Per-model active version, source and reload history"""
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+def _describe(model) -> Dict[str, Any]:
+    """Version and serving mode of a model instance"""
+    return {
+        "version": models.model_version(model),
+        "artifact_version": model.metadata.get("version"),
+        "revision": model.revision,
+        "mode": "trained" if model.is_trained else "rule_based",
+        "fallback_active": not model.is_trained,
+    }
+
+
+MODEL_REGISTRY = ModelRegistry(float(os.getenv("ML_MODEL_WATCH_SECONDS", "30")))
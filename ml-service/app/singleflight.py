@@ -0,0 +1,191 @@
+"""
+CAPSTACK Single-Flight - Collapse identical in-flight requests
+Concurrent POSTs with the same route, content type, canonicalized JSON
+body and loaded model versions are computed once; the other callers wait
+for that response and receive a copy of it
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .metrics import CounterFamily
+
+# Admin routes act (e.g. reload models) rather than compute, so every call
+# must run; requests carrying credentials must each be authorized
+EXCLUDED_PREFIXES = ("/admin/",)
+CREDENTIAL_HEADERS = frozenset((b"authorization", b"cookie", b"x-admin-token"))
+
+SINGLEFLIGHT_REQUESTS = CounterFamily(
+    "singleflight_requests_total",
+    "Deduplicated POST requests by role (leader computed, collapsed reused)",
+    ("route", "role"),
+)
+
+
+class SingleFlight:
+    """
+    Per-key in-flight call registry.
+
+    The first caller for a key runs the computation; callers arriving
+    before it finishes await the same result. If the leader fails or is
+    cancelled, waiting callers run the computation themselves.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of fn() for this key, and whether it was shared"""
+        pending = self._calls.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending), True
+            except Exception:  # pylint: disable=broad-except
+                return await fn(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(RuntimeError(f"single-flight leader failed: {e!r}"))
+            # Mark retrieved so a leader without followers logs nothing
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+
+class SingleFlightMiddleware:
+    """
+    ASGI middleware deduplicating identical POST requests.
+
+    The leader's response is forwarded live and recorded; collapsed
+    requests replay the recorded messages. Bodies that are not JSON or
+    exceed ML_SINGLEFLIGHT_MAX_BODY_BYTES (default 65536), routes under
+    EXCLUDED_PREFIXES and requests with CREDENTIAL_HEADERS pass through.
+    `versions` returns the loaded model versions, so requests spanning a
+    model reload are never merged. ML_SINGLEFLIGHT_ENABLED=false disables
+    deduplication.
+    """
+
+    def __init__(self, app, versions: Callable[[], Hashable] = tuple):
+        self.app = app
+        self.versions = versions
+        self.enabled = os.getenv("ML_SINGLEFLIGHT_ENABLED", "true").lower() not in (
+            "0", "false", "no"
+        )
+        self.max_body_bytes = int(os.getenv("ML_SINGLEFLIGHT_MAX_BODY_BYTES", "65536"))
+        self.flights = SingleFlight()
+        self._routes: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _counters(self, scope) -> Optional[Dict[str, Any]]:
+        if self._routes is None:
+            self._routes = {
+                route.path: {
+                    role: SINGLEFLIGHT_REQUESTS.labels(route.path, role)
+                    for role in ("leader", "collapsed")
+                }
+                for route in scope["app"].routes
+                if "POST" in getattr(route, "methods", ())
+                and not route.path.startswith(EXCLUDED_PREFIXES)
+            }
+        return self._routes.get(scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        counters = self._counters(scope)
+        if counters is None or any(
+            name in CREDENTIAL_HEADERS for name, _ in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body, more = await _read_body(receive, self.max_body_bytes)
+        replay = _replaying(body, more, receive)
+        key = None if more or len(body) > self.max_body_bytes else _canonical(body)
+        if key is None:
+            await self.app(scope, replay, send)
+            return
+
+        async def compute() -> List[Dict[str, Any]]:
+            messages = []
+
+            async def record(message):
+                messages.append(message)
+                await send(message)
+
+            await self.app(scope, replay, record)
+            return messages
+
+        messages, shared = await self.flights.do(
+            (scope["path"], _content_type(scope), key, self.versions()), compute
+        )
+        if not shared:
+            counters["leader"].inc()
+            return
+        counters["collapsed"].inc()
+        for message in messages:
+            await send(message)
+
+
+async def _read_body(receive, limit: int) -> Tuple[bytes, bool]:
+    """Request body up to `limit` bytes, and whether more remains unread"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), False
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), False
+        if size > limit:
+            return b"".join(chunks), True
+
+
+def _replaying(body: bytes, more: bool, receive):
+    """receive() that yields the already-read body, then the rest"""
+    pending = [{"type": "http.request", "body": body, "more_body": more}]
+
+    async def replay():
+        if pending:
+            return pending.pop()
+        return await receive()
+
+    return replay
+
+
+def _content_type(scope) -> str:
+    """
+    Normalized Content-Type of a request ("" when absent).
+
+    Part of the key because the framework may reject the same bytes under
+    another content type, e.g. a JSON body sent without one.
+    """
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            return ";".join(
+                part.strip() for part in value.decode("latin-1").lower().split(";")
+            )
+    return ""
+
+
+def _canonical(body: bytes) -> Optional[str]:
+    """Key-order and whitespace independent form of a JSON body"""
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return None
@@ -0,0 +1,80 @@
+"""
+CAPSTACK Startup Profiling - Lazy imports and cold-start measurements
+Heavy ML libraries are imported only when a trained model needs them, and
+every lazy import and model load is timed for the /health startup report
+"""
+
+import importlib
+import os
+import sys
+import time
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+from .threads import THREAD_BUDGET
+
+PROCESS_START = time.perf_counter()
+
+# Cold-start budget (import + model load) enforced by the regression test
+COLD_START_BUDGET_MS = float(os.getenv("ML_COLD_START_BUDGET_MS", "2000"))
+
+# Imported eagerly by app.main; timed here because this module loads first
+EAGER_MODULES = ("numpy", "pydantic", "fastapi")
+
+_report: Dict[str, Any] = {
+    "imports_ms": {},
+    "model_loads": {},
+    "ready_ms": None,
+}
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module on first use and record how long the import took"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _report["imports_ms"][name] = round((time.perf_counter() - start) * 1000, 2)
+    return module
+
+
+def record_import(name: str, started: float):
+    """Record an eager import that began at `started` (perf_counter)"""
+    _report["imports_ms"][name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def record_model_load(
+    name: str, started: float, source: str, error: Optional[str] = None
+) -> Dict[str, Any]:
+    """Record how long a model took to load, where it came from and any error"""
+    entry = {
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "source": source,
+    }
+    if error is not None:
+        entry["error"] = error
+    _report["model_loads"][name] = entry
+    return dict(entry)
+
+
+def mark_ready():
+    """Record the time from process start until the service is ready"""
+    _report["ready_ms"] = round((time.perf_counter() - PROCESS_START) * 1000, 2)
+
+
+def startup_report() -> Dict[str, Any]:
+    """Snapshot of import times, model load times and time to ready"""
+    return {
+        "imports_ms": dict(_report["imports_ms"]),
+        "model_loads": {k: dict(v) for k, v in _report["model_loads"].items()},
+        "ready_ms": _report["ready_ms"],
+        "budget_ms": COLD_START_BUDGET_MS,
+    }
+
+
+# BLAS/OpenMP read their thread limits when numpy loads, so cap them first
+THREAD_BUDGET.configure_environment()
+
+for _name in EAGER_MODULES:
+    lazy_import(_name)
@@ -0,0 +1,199 @@
+"""
+CAPSTACK Streaming Training - Fit models on datasets larger than memory
+The scaler is fitted with partial_fit over row batches and the estimator
+is trained batch by batch, so peak memory follows the batch size (derived
+from a memory cap) rather than the dataset size. XGBoost and
+GradientBoosting add boosting rounds per batch, RandomForest grows a
+sub-forest per batch.
+
+The result is an approximate ensemble of per-batch learners: every tree
+or boosting round is fitted on a single batch, never on the whole
+dataset, and the model depends on the batch order. It approaches the
+in-memory fit when batches are like independent samples of the data (as
+the generator's chunks are); it is not a histogram GB over the full
+dataset. The stored score is measured by streaming over held-out rows
+"""
+
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+import numpy as np
+
+from .startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+Batches = Callable[[], Iterator[Tuple[np.ndarray, np.ndarray]]]
+
+# A batch is held as read (float32), scaled (float64) and in estimator
+# working buffers at the same time; budget this many float64 copies
+BATCH_COPIES = 4
+MIN_BATCH_ROWS = 1000
+
+
+def batch_rows(n_features: int, memory_bytes: int) -> int:
+    """Rows per batch that keep one batch's working set within memory_bytes"""
+    return max(MIN_BATCH_ROWS, memory_bytes // (n_features * 8 * BATCH_COPIES))
+
+
+def fits_in_memory(n_rows: int, n_features: int, memory_bytes: int) -> bool:
+    """Whether training on the fully materialized dataset stays under the cap"""
+    return n_rows * n_features * 8 * BATCH_COPIES <= memory_bytes
+
+
+def fit_scaler(batches: Batches) -> Tuple[Any, int]:
+    """StandardScaler fitted incrementally over every batch, and the batch count"""
+    scaler = lazy_import("sklearn.preprocessing").StandardScaler()
+    n_batches = 0
+    for X, _ in batches():
+        scaler.partial_fit(X)
+        n_batches += 1
+    return scaler, n_batches
+
+
+def _scaled(batches: Batches, scaler) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for X, y in batches():
+        yield scaler.transform(X), y
+
+
+def _per_batch(total: int, n_batches: int) -> int:
+    """Equal share of `total` trees or rounds per batch, at least one"""
+    return max(1, math.ceil(total / max(1, n_batches)))
+
+
+def _fit_xgboost(estimator, batches: Batches, scaler, n_batches: int):
+    """
+    Boosting rounds trained batch by batch, continuing the same booster.
+
+    Each batch adds its share of n_estimators rounds, fitted to the
+    residuals of the rounds before it on that batch (xgb_model).
+    """
+    xgboost = lazy_import("xgboost")
+    per_batch = _per_batch(estimator.n_estimators, n_batches)
+    params = {
+        key: value for key, value in estimator.get_xgb_params().items()
+        if value is not None
+    }
+    booster = None
+    for X, y in _scaled(batches, scaler):
+        booster = xgboost.train(
+            params, xgboost.DMatrix(X, label=y),
+            num_boost_round=per_batch, xgb_model=booster,
+        )
+    # The sklearn wrapper predicts, pickles and compiles from this booster
+    estimator._Booster = booster  # pylint: disable=protected-access
+    estimator.set_params(n_estimators=booster.num_boosted_rounds())
+    return estimator
+
+
+def _fit_forest(estimator, batches: Batches, scaler, n_batches: int):
+    """
+    One sub-forest per batch, merged into a single forest.
+
+    Each batch gets an equal share of n_estimators (at least one tree), so
+    every tree still sees a random subsample of the data, as in bagging.
+    """
+    ensemble = lazy_import("sklearn.ensemble")
+    per_batch = _per_batch(estimator.n_estimators, n_batches)
+    forest = None
+    for index, (X, y) in enumerate(_scaled(batches, scaler)):
+        part = ensemble.RandomForestRegressor(**dict(
+            estimator.get_params(),
+            n_estimators=per_batch,
+            random_state=(estimator.random_state or 0) + index,
+        )).fit(X, y)
+        if forest is None:
+            forest = part
+        else:
+            forest.estimators_ += part.estimators_
+    forest.n_estimators = len(forest.estimators_)
+    return forest
+
+
+def _fit_boosting(estimator, batches: Batches, scaler, n_batches: int):
+    """
+    Boosting stages fitted batch by batch with warm_start.
+
+    Each batch adds its share of n_estimators stages, fitted to the
+    residuals of the stages before it on that batch.
+    """
+    per_batch = _per_batch(estimator.n_estimators, n_batches)
+    estimator.set_params(warm_start=True, n_estimators=0)
+    for X, y in _scaled(batches, scaler):
+        estimator.set_params(n_estimators=estimator.n_estimators + per_batch)
+        estimator.fit(X, y)
+    estimator.set_params(warm_start=False)
+    return estimator
+
+
+STREAMING_TRAINERS: Dict[str, Callable[..., Any]] = {
+    "XGBRegressor": _fit_xgboost,
+    "RandomForestRegressor": _fit_forest,
+    "GradientBoostingClassifier": _fit_boosting,
+}
+
+
+def streamed_score(estimator, batches: Batches, scaler) -> Tuple[float, int]:
+    """
+    Accuracy (classifiers) or R² (regressors) over every batch, and the row count.
+
+    Accumulates correct predictions, or the squared error and the sums of
+    y and y², batch by batch, so the score covers the whole row range
+    without holding it in memory.
+    """
+    classifier = lazy_import("sklearn.base").is_classifier(estimator)
+    n_rows = 0
+    correct = squared_error = total = total_squares = 0.0
+    for X, y in _scaled(batches, scaler):
+        predicted = estimator.predict(X)
+        y = np.asarray(y, dtype=float)
+        n_rows += len(y)
+        if classifier:
+            correct += float(np.sum(predicted == y))
+            continue
+        squared_error += float(np.sum((y - predicted) ** 2))
+        total += float(y.sum())
+        total_squares += float(np.sum(y * y))
+    if not n_rows:
+        raise ValueError("no held-out rows")
+    if classifier:
+        return correct / n_rows, n_rows
+    variance = total_squares - total * total / n_rows
+    return (1.0 - squared_error / variance if variance > 0 else 0.0), n_rows
+
+
+def train_out_of_core(model, batches: Batches, holdout: Batches):
+    """
+    Train a model wrapper from re-iterable row batches.
+
+    Mirrors the wrappers' train(): builds the estimator if needed, fits
+    scaler and estimator, and records features and the score in the
+    metadata. The score is streamed over the `holdout` batches, which must
+    not overlap the training rows. Raises ValueError for estimators without
+    a streaming trainer.
+    """
+    if not hasattr(model.model, "fit"):
+        model.model = model._build_estimator()  # pylint: disable=protected-access
+    kind = type(model.model).__name__
+    if kind not in STREAMING_TRAINERS:
+        raise ValueError(f"{kind} cannot be trained out of core")
+
+    started = time.perf_counter()
+    scaler, n_batches = fit_scaler(batches)
+    if not n_batches:
+        raise ValueError("no training rows")
+    model.model = STREAMING_TRAINERS[kind](model.model, batches, scaler, n_batches)
+    model.scaler = scaler
+    model.is_trained = True
+    model.compiled = None
+    model.revision = f"trained:{time.time_ns()}"
+    model.metadata["features"] = list(model.FEATURES.feature_names)
+
+    score, n_holdout = streamed_score(model.model, holdout, scaler)
+    metric = "r2_score" if "r2_score" in model.metadata else "accuracy_score"
+    model.metadata[metric] = score
+    model.metadata["holdout_rows"] = n_holdout
+    logger.info("%s trained out of core in %.1fs, held-out score %.3f on %d rows",
+                type(model).__name__, time.perf_counter() - started, score, n_holdout)
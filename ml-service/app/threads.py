@@ -0,0 +1,119 @@
+"""
+CAPSTACK Thread Budget - CPU threads per worker for native inference
+Splits the CPUs this process may run on between the uvicorn workers, caps
+BLAS/OpenMP pools accordingly, and runs small prediction batches on one
+thread so concurrent requests do not oversubscribe the machine
+"""
+
+import copy
+import os
+import weakref
+from typing import Any, Dict
+
+# Thread pools read these once, when their native library loads
+NATIVE_THREAD_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (affinity mask, else cpu_count)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ThreadBudget:
+    """
+    Thread allowance for one worker process.
+
+    `threads_per_worker` defaults to available CPUs divided by the uvicorn
+    worker count (WEB_CONCURRENCY). Native estimators predict with one
+    thread below `parallel_min_rows` rows and with the full allowance
+    above it.
+    """
+
+    def __init__(self, cpus: int, workers: int, threads_per_worker: int, parallel_min_rows: int):
+        self.cpus = cpus
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.parallel_min_rows = parallel_min_rows
+        # Estimator -> copy predicting on threads_per_worker threads
+        self._parallel = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        """Budget from ML_THREADS_PER_WORKER, WEB_CONCURRENCY and affinity"""
+        cpus = available_cpus()
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        per_worker = int(os.getenv("ML_THREADS_PER_WORKER", "0")) or max(1, cpus // workers)
+        return cls(
+            cpus=cpus,
+            workers=workers,
+            threads_per_worker=per_worker,
+            parallel_min_rows=int(os.getenv("ML_PARALLEL_MIN_ROWS", "2048")),
+        )
+
+    def configure_environment(self):
+        """
+        Cap BLAS/OpenMP pools at the per-worker allowance.
+
+        Must run before numpy, sklearn or xgboost are imported. Variables
+        already set in the environment are left alone.
+        """
+        for name in NATIVE_THREAD_VARS:
+            os.environ.setdefault(name, str(self.threads_per_worker))
+
+    def threads_for(self, n_rows: int) -> int:
+        """Threads a native estimator should use for a batch of n_rows"""
+        return self.threads_per_worker if n_rows >= self.parallel_min_rows else 1
+
+    def prepare(self, estimator):
+        """
+        Fix n_jobs on a freshly loaded estimator, before it is shared.
+
+        The estimator is set to one thread and, when the worker may use
+        more, a shallow copy with the full allowance is kept for large
+        batches. The copy shares the fitted trees, so it costs a wrapper
+        object rather than a second model in memory. XGBoost's set_params
+        also reconfigures the booster a shallow copy would share, so an
+        XGBoost estimator keeps no copy and runs on the full allowance.
+        n_jobs is never changed afterwards, so concurrent predictions
+        cannot race on it. Estimators without n_jobs, such as
+        GradientBoostingClassifier, are left alone.
+        """
+        if not hasattr(estimator, "n_jobs"):
+            return
+        if hasattr(estimator, "get_booster"):
+            estimator.set_params(n_jobs=self.threads_per_worker)
+            return
+        estimator.set_params(n_jobs=1)
+        if self.threads_per_worker > 1:
+            parallel = copy.copy(estimator)
+            parallel.set_params(n_jobs=self.threads_per_worker)
+            self._parallel[estimator] = parallel
+
+    def estimator_for(self, estimator, n_rows: int):
+        """Estimator to predict a batch of n_rows with: the parallel copy or itself"""
+        if self.threads_for(n_rows) > 1:
+            return self._parallel.get(estimator, estimator)
+        return estimator
+
+    def report(self) -> Dict[str, Any]:
+        """Settings in effect, for /health"""
+        return {
+            "cpus_available": self.cpus,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "small_batch_threads": 1,
+            "parallel_min_rows": self.parallel_min_rows,
+            "native_env": {name: os.environ.get(name) for name in NATIVE_THREAD_VARS},
+        }
+
+
+THREAD_BUDGET = ThreadBudget.from_env()
@@ -3,13 +3,20 @@ CAPSTACK ML Model Training Pipeline
 Generates synthetic training data and trains all ML models
 """
 
+import argparse
+import json
 import logging
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
 
 import numpy as np
 from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
 from sklearn.metrics import (
     mean_squared_error,
     r2_score,
@@ -24,11 +31,14 @@ from sklearn.metrics import (
 sys.path.insert(0, str(Path(__file__).parent))
 
 # Import models
+from app import datagen, streaming, tuning
 from app.models import (
     FinancialRiskModel,
     LayoffRiskModel,
-    SavingsProjectionModel
+    SavingsProjectionModel,
+    export_artifacts
 )
+from app.threads import available_cpus
 
 # Configure logging
 logging.basicConfig(
@@ -40,247 +50,375 @@ logger = logging.getLogger(__name__)
 
 def generate_risk_training_data(
     n_samples: int = 1000,
+    seed: Optional[int] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """Generate enhanced synthetic training data for risk model"""
     logger.info("Generating %d risk training samples...", n_samples)
-
-    # Feature ranges with more realistic distributions
-    incomes = np.random.lognormal(10, 0.3, n_samples)
-    incomes = np.clip(incomes, 20000, 200000)
-
-    # More sophisticated expense modeling
-    base_expenses = np.random.uniform(0.4, 0.8, n_samples)
-    discretionary = np.random.uniform(0.1, 0.4, n_samples)
-    expenses_ratio = base_expenses + discretionary
-    expenses = incomes * expenses_ratio
-
-    # More realistic savings patterns
-    savings_ratio = np.random.beta(2, 5, n_samples) * 0.6
-    savings = incomes * savings_ratio
-
-    # Debt modeling with different types
-    debt_ratio = np.random.exponential(0.5, n_samples)
-    debt_ratio = np.clip(debt_ratio, 0, 2.0)
-    debt = incomes * debt_ratio
-
-    # Additional derived features
-    expense_to_income = expenses / np.maximum(incomes, 1)
-    savings_to_income = savings / np.maximum(incomes, 1)
-    debt_to_income = debt / np.maximum(incomes, 1)
-
-    # New enhanced features
-    disposable_income = incomes - expenses
-    debt_service_ratio = np.where(incomes > 0, debt / incomes, 0)
-    savings_buffer = np.where(expenses > 0, savings / expenses, 0)
-
-    # Add some noise and outliers for robustness
-    incomes = incomes * np.random.normal(1, 0.05, n_samples)
-    expenses = expenses * np.random.normal(1, 0.03, n_samples)
-
-    X = np.column_stack([
-        incomes,
-        expenses,
-        savings,
-        debt,
-        debt_to_income,
-        savings_to_income,
-        expense_to_income,
-        disposable_income,
-        debt_service_ratio,
-        savings_buffer
-    ])
-
-    # Generate risk scores based on enhanced formula
-    y = (
-        (expense_to_income * 0.4) +
-        ((1 - savings_to_income) * 0.3) +
-        (debt_to_income * 0.25) +
-        (1 / (1 + savings_buffer) * 0.15) -
-        (disposable_income / incomes * 0.1)
-    ) * 100 + np.random.normal(0, 3, n_samples)
-    y = np.clip(y, 0, 100)
-
+    X, y = datagen.generate("risk", n_samples, seed)
     logger.info("Generated X shape: %s, y shape: %s", X.shape, y.shape)
     return X, y
 
 
 def generate_layoff_training_data(
     n_samples: int = 1000,
+    seed: Optional[int] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """Generate synthetic training data for layoff risk model"""
     logger.info("Generating %d layoff training samples...", n_samples)
-
-    # Industry risk (1-5, higher = riskier)
-    industry = np.random.randint(1, 6, n_samples)
-    # Experience in years
-    experience = np.random.uniform(1, 30, n_samples)
-    # Company age in years
-    company_age = np.random.uniform(1, 50, n_samples)
-    # Team size
-    team_size = np.random.randint(1, 100, n_samples)
-    # Contract type (0=contract, 1=permanent)
-    contract = np.random.randint(0, 2, n_samples)
-    # Performance rating (1-5)
-    performance = np.random.uniform(1, 5, n_samples)
-
-    X = np.column_stack([
-        industry,
-        experience,
-        company_age,
-        team_size,
-        contract,
-        performance
-    ])
-
-    # Generate labels: higher risk for lower experience, risky industry, etc.
-    layoff_probability = (
-        (industry * 0.1) -
-        (experience * 0.02) -
-        (company_age * 0.005) +
-        (contract == 0) * 0.3 -
-        (performance * 0.05)
-    )
-    y = (layoff_probability > 0.5).astype(int)
-
+    X, y = datagen.generate("layoff", n_samples, seed)
     logger.info("Generated X shape: %s, y shape: %s", X.shape, y.shape)
     return X, y
 
 
 def generate_savings_training_data(
     n_samples: int = 1000,
+    seed: Optional[int] = None,
 ) -> Tuple[np.ndarray, np.ndarray]:
     """Generate synthetic training data for savings projection model"""
     logger.info("Generating %d savings training samples...", n_samples)
-
-    current_savings = np.random.uniform(0, 500000, n_samples)
-    monthly_savings = np.random.uniform(0, 50000, n_samples)
-    expected_return = np.random.uniform(2, 15, n_samples)
-    inflation = np.random.uniform(1, 8, n_samples)
-    months = np.random.randint(1, 36, n_samples)
-    investment_type = np.random.randint(0, 5, n_samples)
-
-    X = np.column_stack([
-        current_savings,
-        monthly_savings,
-        expected_return,
-        inflation,
-        months,
-        investment_type
-    ])
-
-    # Calculate future values
-    y = np.zeros(n_samples)
-    for i in range(n_samples):
-        future = float(current_savings[i])
-        monthly_ret = expected_return[i] / 100 / 12
-        for _ in range(int(months[i])):
-            future = (future + monthly_savings[i]) * (1 + monthly_ret)
-        y[i] = future
-
+    X, y = datagen.generate("savings", n_samples, seed)
     logger.info("Generated X shape: %s, y shape: %s", X.shape, y.shape)
     return X, y
 
 
-def train_risk_model():
-    """Train the risk model"""
-    logger.info("=" * 80)
-    logger.info("TRAINING FINANCIAL RISK MODEL")
-    logger.info("=" * 80)
-
-    X, y = generate_risk_training_data(n_samples=1000)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y,
-        test_size=0.2,
-        random_state=42
-    )
-
-    model = FinancialRiskModel()
-    model.train(X_train, y_train)
-
-    # Evaluate
-    y_pred = model.model.predict(model.scaler.transform(X_test))
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = np.sqrt(mse)
-    r2 = r2_score(y_test, y_pred)
-
-    logger.info("RMSE: %.2f", rmse)
-    logger.info("R² Score: %.3f", r2)
-    logger.info(
-        "Test Accuracy (score): %.3f",
-        model.model.score(model.scaler.transform(X_test), y_test),
-    )
-
-    model.save()
-    logger.info("✓ Risk model trained and saved\n")
-
+def load_training_data(
+    name: str,
+    n_samples: int = 1000,
+    seed: int = 42,
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Training data from the dataset cache, generated on first use"""
+    dataset = datagen.build_dataset(name, n_samples, seed=seed, workers=workers)
+    X, y = dataset.load()
+    logger.info("Loaded %s dataset %s: X shape %s", name, dataset.path, X.shape)
+    return X, y
 
-def train_layoff_model():
-    """Train the layoff risk model"""
-    logger.info("=" * 80)
-    logger.info("TRAINING LAYOFF RISK MODEL")
-    logger.info("=" * 80)
 
-    X, y = generate_layoff_training_data(n_samples=1000)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y,
-        test_size=0.2,
-        random_state=42
-    )
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    """Record the wall time of a block in milliseconds under `name`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
 
-    model = LayoffRiskModel()
-    model.train(X_train, y_train)
 
-    # Evaluate
+def _evaluate_regressor(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, float]:
     y_pred = model.model.predict(model.scaler.transform(X_test))
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, zero_division=0)
-    recall = recall_score(y_test, y_pred, zero_division=0)
-    f1 = f1_score(y_test, y_pred, zero_division=0)
-    cm = confusion_matrix(y_test, y_pred)
-
-    logger.info("Accuracy: %.3f", accuracy)
-    logger.info("Precision: %.3f", precision)
-    logger.info("Recall: %.3f", recall)
-    logger.info("F1 Score: %.3f", f1)
-    logger.info("Confusion Matrix:\n%s", cm)
-
-    model.save()
-    logger.info("✓ Layoff model trained and saved\n")
-
-
-def train_savings_model():
-    """Train the savings projection model"""
+    metrics = {
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        "r2": float(r2_score(y_test, y_pred)),
+        "mape": float(np.mean(np.abs((y_test - y_pred) / np.maximum(np.abs(y_test), 1)))),
+    }
+    logger.info("RMSE: %.2f", metrics["rmse"])
+    logger.info("R² Score: %.3f", metrics["r2"])
+    logger.info("MAPE: %.3f", metrics["mape"])
+    return metrics
+
+
+def _evaluate_classifier(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
+    y_pred = model.model.predict(model.scaler.transform(X_test))
+    metrics = {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "precision": float(precision_score(y_test, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_test, y_pred, zero_division=0)),
+        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+    }
+    logger.info("Accuracy: %.3f", metrics["accuracy"])
+    logger.info("Precision: %.3f", metrics["precision"])
+    logger.info("Recall: %.3f", metrics["recall"])
+    logger.info("F1 Score: %.3f", metrics["f1"])
+    logger.info("Confusion Matrix:\n%s", np.array(metrics["confusion_matrix"]))
+    return metrics
+
+
+# name -> (title, model class, evaluation)
+TRAINING_JOBS: Dict[str, Tuple[str, Type, Callable[..., Dict[str, Any]]]] = {
+    "risk": ("FINANCIAL RISK MODEL", FinancialRiskModel, _evaluate_regressor),
+    "layoff": ("LAYOFF RISK MODEL", LayoffRiskModel, _evaluate_classifier),
+    "savings": ("SAVINGS PROJECTION MODEL", SavingsProjectionModel, _evaluate_regressor),
+}
+
+
+def split_cores(cores: int, n_jobs: int) -> List[int]:
+    """
+    Threads for each of `n_jobs` concurrent jobs sharing `cores` CPUs.
+
+    Every job gets at least one thread; leftover cores go to the first
+    jobs. With fewer cores than jobs, callers run at most `cores` jobs
+    at once, one thread each.
+    """
+    running = max(1, min(cores, n_jobs))
+    share, extra = divmod(max(cores, running), running)
+    return [share + (1 if index % running < extra else 0) for index in range(n_jobs)]
+
+
+def run_training_job(
+    name: str,
+    dataset_path: str,
+    threads: int,
+    params: Optional[Dict[str, Any]] = None,
+    memory_mb: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Fit, evaluate and save one model from a cached dataset.
+
+    Runs in a pool worker: the dataset is opened from its memory-mapped
+    shards rather than sent to the worker, and the estimator and native
+    thread pools are capped at `threads`. `params` (e.g. tuned settings)
+    override the estimator defaults and are saved in the model metadata.
+    If training on the materialized dataset would exceed `memory_mb`, the
+    model is trained out of core from row batches sized to the cap and
+    evaluated on a held-out tail of at most one batch. Returns stage
+    timings (ms), the training mode and the evaluation metrics.
+    """
+    title, model_class, evaluate = TRAINING_JOBS[name]
     logger.info("=" * 80)
-    logger.info("TRAINING SAVINGS PROJECTION MODEL")
+    logger.info("TRAINING %s", title)
     logger.info("=" * 80)
 
-    X, y = generate_savings_training_data(n_samples=1000)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y,
-        test_size=0.2,
-        random_state=42
+    timings: Dict[str, float] = {}
+    dataset = datagen.ShardedDataset.open(Path(dataset_path))
+    memory = (memory_mb or 0) * 2**20
+    out_of_core = bool(memory) and not streaming.fits_in_memory(
+        dataset.n_rows, dataset.n_features, memory
     )
-
-    model = SavingsProjectionModel()
-    model.train(X_train, y_train)
-
-    # Evaluate
-    y_pred = model.model.predict(model.scaler.transform(X_test))
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = np.sqrt(mse)
-    r2 = r2_score(y_test, y_pred)
-    mape = np.mean(np.abs((y_test - y_pred) / np.maximum(np.abs(y_test), 1)))
-
-    logger.info("RMSE: %.2f", rmse)
-    logger.info("R² Score: %.3f", r2)
-    logger.info("MAPE: %.3f", mape)
-
-    model.save()
-    logger.info("✓ Savings model trained and saved\n")
+    with _stage(timings, "load"):
+        if out_of_core:
+            rows = streaming.batch_rows(dataset.n_features, memory)
+            split = dataset.n_rows - min(rows, max(1, dataset.n_rows // 5))
+            tail = list(dataset.batches(rows, start=split))
+            X_test = np.concatenate([X for X, _ in tail])
+            y_test = np.concatenate([y for _, y in tail])
+        else:
+            X, y = dataset.load()
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y,
+                test_size=0.2,
+                random_state=42
+            )
+
+    model = model_class()
+    model.model = model_class._build_estimator()
+    if params:
+        model.model.set_params(**params)
+    if "n_jobs" in model.model.get_params():
+        model.model.set_params(n_jobs=threads)
+    with threadpool_limits(limits=threads):
+        with _stage(timings, "fit"):
+            if out_of_core:
+                streaming.train_out_of_core(
+                    model,
+                    lambda: dataset.batches(rows, stop=split),
+                    lambda: dataset.batches(rows, start=split),
+                )
+            else:
+                model.train(X_train, y_train)
+        with _stage(timings, "evaluate"):
+            metrics = evaluate(model, X_test, y_test)
+    if params:
+        model.metadata["hyperparameters"] = params
+    with _stage(timings, "save"):
+        model.save()
+    logger.info("✓ %s model trained and saved\n", name.capitalize())
+    return {
+        "model": name,
+        "threads": threads,
+        "mode": "out_of_core" if out_of_core else "in_memory",
+        "stages_ms": timings,
+        "metrics": metrics,
+    }
+
+
+def train_models(
+    names: Sequence[str] = tuple(TRAINING_JOBS),
+    n_samples: int = 1000,
+    seed: int = 42,
+    cores: Optional[int] = None,
+    parallel: bool = True,
+    data_workers: Optional[int] = None,
+    tune: Optional[Dict[str, Any]] = None,
+    memory_mb: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Generate (or reuse) each model's dataset, then train the models.
+
+    With `parallel`, model jobs run concurrently in a process pool and
+    share `cores` CPUs (default: all available) through `split_cores`;
+    otherwise they run one after another in this process with all cores.
+    With `tune` (keyword arguments for `tuning.successive_halving`), each
+    model's settings are searched first and the winners are trained.
+    `memory_mb` caps training memory, split evenly between concurrent
+    jobs (see `run_training_job`).
+    Returns the per-model stage timings and metrics and the total wall time.
+    """
+    cores = cores or available_cpus()
+    started = time.perf_counter()
+    generate_ms: Dict[str, float] = {}
+    paths: Dict[str, str] = {}
+    for name in names:
+        with _stage(generate_ms, name):
+            dataset = datagen.build_dataset(
+                name, n_samples, seed=seed, workers=data_workers or cores
+            )
+        paths[name] = str(dataset.path)
+
+    tune_ms: Dict[str, float] = {}
+    searches: Dict[str, Dict[str, Any]] = {}
+    for name in names if tune is not None else ():
+        with _stage(tune_ms, name):
+            searches[name] = tuning.successive_halving(
+                name, datagen.ShardedDataset.open(Path(paths[name])),
+                seed=seed, cores=cores, **tune
+            )
+        logger.info("Best %s settings: %s", name, searches[name]["params"])
+    params = {name: search["params"] for name, search in searches.items()}
+
+    if parallel and len(names) > 1:
+        threads = split_cores(cores, len(names))
+        running = min(cores, len(names))
+        job_memory = memory_mb // running if memory_mb else None
+        with ProcessPoolExecutor(max_workers=running) as pool:
+            futures = [
+                pool.submit(run_training_job, name, paths[name], count, params.get(name),
+                            job_memory)
+                for name, count in zip(names, threads)
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            run_training_job(name, paths[name], cores, params.get(name), memory_mb)
+            for name in names
+        ]
+
+    for result in results:
+        name = result["model"]
+        stages = {"generate": generate_ms[name]}
+        if name in searches:
+            stages["tune"] = tune_ms[name]
+            result["tuning"] = searches[name]
+        result["stages_ms"] = dict(stages, **result["stages_ms"])
+    return {
+        "cores": cores,
+        "parallel": parallel,
+        "n_samples": n_samples,
+        "seed": seed,
+        "jobs": results,
+        "wall_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def log_timing_report(report: Dict[str, Any]):
+    """Log one line of stage timings per model job"""
+    stages = ("generate", "tune", "load", "fit", "evaluate", "save")
+    logger.info("%-8s %7s %-11s %s", "model", "threads", "mode",
+                " ".join(f"{stage + '_ms':>12}" for stage in stages))
+    for job in report["jobs"]:
+        logger.info("%-8s %7d %-11s %s", job["model"], job["threads"], job["mode"],
+                    " ".join(f"{job['stages_ms'].get(stage, 0):12.1f}" for stage in stages))
+    logger.info("Total wall time: %.1f ms on %d cores (%s)", report["wall_ms"],
+                report["cores"], "parallel" if report["parallel"] else "sequential")
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--export-only",
+        action="store_true",
+        help="Export memory-mapped artifacts from existing .pkl files and exit"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=1000,
+        help="Synthetic training rows per model (cached in ML_DATA_CACHE_DIR)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Seed of the synthetic training data"
+    )
+    parser.add_argument(
+        "--data-workers",
+        type=int,
+        default=None,
+        help="Processes generating training data (default: --cpus)"
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=sorted(TRAINING_JOBS),
+        default=list(TRAINING_JOBS),
+        help="Models to train"
+    )
+    parser.add_argument(
+        "--cpus",
+        type=int,
+        default=None,
+        help="Cores shared by all training jobs (default: all available)"
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Train models one after another instead of in a process pool"
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=int(os.getenv("ML_TRAIN_MEMORY_MB", "0")),
+        help="Train out of core when a dataset would not fit this many MB "
+             "(ML_TRAIN_MEMORY_MB, default 0: always in memory)"
+    )
+    parser.add_argument(
+        "--tune",
+        action="store_true",
+        help="Search estimator settings (successive halving) before training"
+    )
+    parser.add_argument(
+        "--tune-candidates",
+        type=int,
+        default=16,
+        help="Settings sampled per model in the first tuning round"
+    )
+    parser.add_argument(
+        "--tune-folds",
+        type=int,
+        default=3,
+        help="Cross-validation folds used by tuning"
+    )
+    parser.add_argument(
+        "--latency-budget-ms",
+        type=float,
+        default=2.0,
+        help="Single-row predict latency budget for tuning"
+    )
+    parser.add_argument(
+        "--batch-latency-budget-ms",
+        type=float,
+        default=50.0,
+        help="Latency budget for a 1024-row predict_batch when tuning"
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        help="Write the per-stage timing report as JSON to this path"
+    )
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """Main training pipeline"""
+    args = parse_args(argv)
+    if args.export_only:
+        export_artifacts()
+        logger.info("Artifacts exported to app/models/")
+        return
+
     logger.info("\n%s", "=" * 80)
     logger.info("CAPSTACK ML MODEL TRAINING PIPELINE")
     logger.info("\n%s", "=" * 80)
@@ -290,9 +428,24 @@ def main():
         Path("app/models").mkdir(parents=True, exist_ok=True)
 
         # Train all models
-        train_risk_model()
-        train_layoff_model()
-        train_savings_model()
+        report = train_models(
+            args.models,
+            n_samples=args.rows,
+            seed=args.seed,
+            cores=args.cpus,
+            parallel=not args.sequential,
+            data_workers=args.data_workers,
+            tune={
+                "n_candidates": args.tune_candidates,
+                "n_folds": args.tune_folds,
+                "single_budget_ms": args.latency_budget_ms,
+                "batch_budget_ms": args.batch_latency_budget_ms,
+            } if args.tune else None,
+            memory_mb=args.memory_mb,
+        )
+        log_timing_report(report)
+        if args.report is not None:
+            args.report.write_text(json.dumps(report, indent=2))
 
         logger.info("=" * 80)
         logger.info("✓ ALL MODELS TRAINED SUCCESSFULLY")
@@ -0,0 +1,339 @@
+"""
+CAPSTACK Hyperparameter Search - Successive halving under a latency budget
+Samples estimator settings from a search space per estimator type and races
+them on cached, memory-mapped CV folds: each round keeps the best 1/eta of
+the candidates and trains the survivors on eta times more rows. Candidates
+are scored on validation quality minus a penalty for exceeding the serving
+latency budget, measured through the model's own predict paths
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+import numpy as np
+
+from . import models
+from .datagen import ShardedDataset
+from .startup import lazy_import
+from .threads import available_cpus
+
+logger = logging.getLogger(__name__)
+
+# Parameter choices per estimator class; values are sampled uniformly
+SEARCH_SPACES: Dict[str, Dict[str, Sequence[Any]]] = {
+    "XGBRegressor": {
+        "n_estimators": [100, 200, 400, 800],
+        "max_depth": [3, 4, 6, 8, 10],
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "subsample": [0.6, 0.8, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "min_child_weight": [1, 5, 10],
+    },
+    "RandomForestRegressor": {
+        "n_estimators": [50, 100, 200, 400],
+        "max_depth": [6, 8, 12, 16, None],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", 0.5, 1.0],
+    },
+    "GradientBoostingClassifier": {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "max_depth": [2, 3, 5, 7],
+        "subsample": [0.6, 0.8, 1.0],
+    },
+}
+
+# Settings that stop boosting once the validation loss stops improving
+EARLY_STOPPING: Dict[str, Dict[str, Any]] = {
+    "XGBRegressor": {"early_stopping_rounds": 20},
+    "GradientBoostingClassifier": {"n_iter_no_change": 10, "validation_fraction": 0.1},
+}
+
+# Rows of a training fold held out as the XGBoost early-stopping eval set
+EVAL_FRACTION = 0.1
+# Rows per batch when timing batch inference (the native batch path)
+LATENCY_BATCH_ROWS = 1024
+LATENCY_REPEATS = 20
+FOLDS_MANIFEST = "folds.json"
+
+
+def _model_class(name: str) -> Type:
+    return type(models.MODELS[name])
+
+
+def estimator_type(name: str) -> str:
+    """Class name of the estimator a model trains"""
+    return type(_model_class(name)._build_estimator()).__name__
+
+
+def build_folds(dataset: ShardedDataset, n_folds: int = 3, seed: int = 0) -> List[Path]:
+    """
+    Shuffled K-fold splits of a dataset, cached next to its shards.
+
+    Each fold directory holds scaled train and validation matrices as
+    .npy files plus the fitted scaler, so every candidate of every search
+    on this dataset reuses them memory-mapped. Training rows are stored in
+    random order: their first n rows are a uniform subsample. Integer
+    labels (classification) are split stratified, and ordered so every
+    prefix keeps the class proportions.
+    """
+    root = dataset.path / f"folds-{n_folds}-{seed}"
+    if (root / FOLDS_MANIFEST).exists():
+        return [root / f"fold-{index}" for index in range(n_folds)]
+
+    model_selection = lazy_import("sklearn.model_selection")
+    preprocessing = lazy_import("sklearn.preprocessing")
+    joblib = lazy_import("joblib")
+    X, y = dataset.load()
+    building = dataset.path / f".folds-{n_folds}-{seed}.{os.getpid()}"
+    shutil.rmtree(building, ignore_errors=True)
+    classes = np.issubdtype(y.dtype, np.integer)
+    splitter = (model_selection.StratifiedKFold if classes else model_selection.KFold)(
+        n_splits=n_folds, shuffle=True, random_state=seed
+    )
+    for index, (train, valid) in enumerate(splitter.split(X, y)):
+        fold = building / f"fold-{index}"
+        fold.mkdir(parents=True)
+        train = _prefix_order(train, y[train] if classes else None, seed + index)
+        scaler = preprocessing.StandardScaler().fit(X[train])
+        np.save(fold / "X_train.npy", scaler.transform(X[train]))
+        np.save(fold / "y_train.npy", y[train])
+        np.save(fold / "X_valid.npy", scaler.transform(X[valid]))
+        np.save(fold / "y_valid.npy", y[valid])
+        joblib.dump(scaler, fold / "scaler.pkl")
+    (building / FOLDS_MANIFEST).write_text(json.dumps({"n_folds": n_folds, "seed": seed}))
+    try:
+        building.rename(root)
+    except OSError:
+        shutil.rmtree(building, ignore_errors=True)
+    return [root / f"fold-{index}" for index in range(n_folds)]
+
+
+def _prefix_order(indices: np.ndarray, labels: Optional[np.ndarray], seed: int) -> np.ndarray:
+    """
+    Random order of `indices` whose prefixes are representative subsamples.
+
+    With labels, each class's rows are spread evenly through the order
+    (row k of a class sits at position ~k / class size), so rare classes
+    appear in small prefixes at their overall rate.
+    """
+    rng = np.random.default_rng(seed)
+    if labels is None:
+        return rng.permutation(indices)
+    keys = np.empty(len(indices))
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        ranks = rng.permutation(len(members))
+        keys[members] = (ranks + rng.uniform(size=len(members))) / len(members)
+    return indices[np.argsort(keys, kind="stable")]
+
+
+def _median_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples) * 1000)
+
+
+def measure_latency(model, repeats: int = LATENCY_REPEATS) -> Dict[str, float]:
+    """
+    Median single-row and batch latency of a trained model, in ms.
+
+    Goes through predict() (without the prediction cache) and
+    predict_batch(), so feature building, scaling and the compiled or
+    native estimator are all included, as in serving.
+    """
+    row = dict(model.WARMUP_ROW)
+    rows = [row] * LATENCY_BATCH_ROWS
+    model.predict.__wrapped__(model, row)
+    model.predict_batch(rows)
+    return {
+        "single_ms": _median_ms(lambda: model.predict.__wrapped__(model, row), repeats),
+        "batch_ms": _median_ms(lambda: model.predict_batch(rows), max(3, repeats // 4)),
+    }
+
+
+def evaluate_candidate(name: str, params: Dict[str, Any], fold: str, rows: int) -> Dict[str, Any]:
+    """
+    Fit one candidate on the first `rows` training rows of a fold.
+
+    Runs in a pool worker on one thread. Returns the validation quality
+    (R² for regressors, balanced accuracy for classifiers), the number of
+    boosting rounds early stopping kept, and the measured latency. A
+    candidate that fails to fit (e.g. a subsample with a single class)
+    scores -inf and reports the error.
+    """
+    threadpool_limits = lazy_import("threadpoolctl").threadpool_limits
+    fold_dir = Path(fold)
+    model_class = _model_class(name)
+    estimator = model_class._build_estimator()
+    kind = type(estimator).__name__
+    estimator.set_params(**params, **EARLY_STOPPING.get(kind, {}))
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=1)
+
+    try:
+        with threadpool_limits(limits=1):
+            quality, rounds = _fit_and_score(estimator, fold_dir, rows)
+            model = model_class()
+            model.model = estimator
+            model.scaler = lazy_import("joblib").load(fold_dir / "scaler.pkl")
+            model.is_trained = True
+            if models.compiled_inference_enabled():
+                model.compiled = models._compile(model)  # pylint: disable=protected-access
+            latency = measure_latency(model)
+    except ValueError as e:
+        return {
+            "quality": -math.inf, "rounds": 0,
+            "single_ms": math.inf, "batch_ms": math.inf, "error": str(e),
+        }
+    return {"quality": quality, "rounds": rounds, **latency}
+
+
+def _fit_and_score(estimator, fold_dir: Path, rows: int):
+    """Fit with early stopping; return validation quality and rounds kept"""
+    metrics = lazy_import("sklearn.metrics")
+    X_train = np.load(fold_dir / "X_train.npy", mmap_mode="r")[:rows]
+    y_train = np.load(fold_dir / "y_train.npy", mmap_mode="r")[:rows]
+    X_valid = np.load(fold_dir / "X_valid.npy", mmap_mode="r")
+    y_valid = np.load(fold_dir / "y_valid.npy", mmap_mode="r")
+
+    if type(estimator).__name__ == "XGBRegressor":
+        # Stop on held-out training rows, never on the validation fold
+        split = len(X_train) - max(1, int(len(X_train) * EVAL_FRACTION))
+        estimator.fit(
+            X_train[:split], y_train[:split],
+            eval_set=[(X_train[split:], y_train[split:])],
+            verbose=False,
+        )
+        rounds = int(estimator.best_iteration) + 1
+    else:
+        estimator.fit(X_train, y_train)
+        rounds = int(getattr(estimator, "n_estimators_", estimator.n_estimators))
+
+    if hasattr(estimator, "predict_proba"):
+        quality = metrics.balanced_accuracy_score(y_valid, estimator.predict(X_valid))
+    else:
+        quality = metrics.r2_score(y_valid, estimator.predict(X_valid))
+    return float(quality), rounds
+
+
+def objective(
+    result: Dict[str, float],
+    single_budget_ms: float,
+    batch_budget_ms: float,
+    latency_weight: float = 1.0,
+) -> float:
+    """
+    Quality minus the relative amount by which latency exceeds its budget.
+
+    Within budget, latency costs nothing; a candidate twice over its
+    single-row budget loses `latency_weight` quality.
+    """
+    over = (
+        max(0.0, result["single_ms"] / single_budget_ms - 1) +
+        max(0.0, result["batch_ms"] / batch_budget_ms - 1)
+    )
+    return result["quality"] - latency_weight * over
+
+
+def sample_candidates(space: Dict[str, Sequence[Any]], n: int, seed: int) -> List[Dict[str, Any]]:
+    """Up to `n` distinct random settings from a search space"""
+    rng = np.random.default_rng(seed)
+    size = math.prod(len(values) for values in space.values())
+    candidates: List[Dict[str, Any]] = []
+    seen = set()
+    while len(candidates) < min(n, size):
+        params = {key: values[rng.integers(len(values))] for key, values in space.items()}
+        key = json.dumps(params, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            candidates.append({key: _plain(value) for key, value in params.items()})
+    return candidates
+
+
+def _plain(value: Any) -> Any:
+    """NumPy scalars as Python values, so params serialize to JSON"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def successive_halving(
+    name: str,
+    dataset: ShardedDataset,
+    n_candidates: int = 16,
+    n_folds: int = 3,
+    eta: int = 3,
+    min_rows: int = 500,
+    seed: int = 0,
+    cores: Optional[int] = None,
+    single_budget_ms: float = 2.0,
+    batch_budget_ms: float = 50.0,
+    latency_weight: float = 1.0,
+) -> Dict[str, Any]:
+    """
+    Search `name`'s estimator settings on a dataset.
+
+    Every round fits all (candidate, fold) pairs in a process pool of
+    `cores` single-threaded workers, ranks candidates by their mean
+    objective and keeps the top 1/eta, then multiplies the training rows
+    by eta, until one candidate is left or all rows are used. Returns the
+    best params (boosting rounds set to what early stopping kept) and
+    every round's scores.
+    """
+    kind = estimator_type(name)
+    folds = [str(fold) for fold in build_folds(dataset, n_folds, seed)]
+    n_train = len(np.load(Path(folds[0]) / "y_train.npy", mmap_mode="r"))
+    candidates = sample_candidates(SEARCH_SPACES[kind], n_candidates, seed)
+    n_rounds = max(0, math.ceil(math.log(len(candidates), eta)))
+    rows = min(n_train, max(min_rows, n_train // eta ** n_rounds))
+    cores = cores or available_cpus()
+    logger.info("Tuning %s (%s): %d candidates, %d folds, %d rows in the first round",
+                name, kind, len(candidates), n_folds, rows)
+
+    rounds = []
+    with ProcessPoolExecutor(max_workers=cores) as pool:
+        while True:
+            futures = [
+                [pool.submit(evaluate_candidate, name, params, fold, rows) for fold in folds]
+                for params in candidates
+            ]
+            scored = []
+            for params, fold_futures in zip(candidates, futures):
+                results = [future.result() for future in fold_futures]
+                mean = {
+                    key: float(np.mean([result[key] for result in results]))
+                    for key in ("quality", "rounds", "single_ms", "batch_ms")
+                }
+                mean["objective"] = objective(mean, single_budget_ms, batch_budget_ms,
+                                              latency_weight)
+                scored.append(dict(params=params, **mean))
+            scored.sort(key=lambda entry: entry["objective"], reverse=True)
+            rounds.append({"rows": rows, "candidates": scored})
+            logger.info("%s round %d (%d rows): best objective %.4f, %d candidates",
+                        name, len(rounds), rows, scored[0]["objective"], len(scored))
+            if len(scored) == 1 or rows >= n_train:
+                break
+            candidates = [entry["params"] for entry in scored[:max(1, len(scored) // eta)]]
+            rows = min(n_train, rows * eta)
+
+    best = scored[0]
+    params = dict(best["params"])
+    if kind in EARLY_STOPPING:
+        params["n_estimators"] = max(1, int(round(best["rounds"])))
+    return {
+        "model": name,
+        "estimator": kind,
+        "params": params,
+        "best": best,
+        "budget_ms": {"single": single_budget_ms, "batch": batch_budget_ms},
+        "rounds": rounds,
+    }
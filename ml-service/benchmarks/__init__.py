@@ -0,0 +1,7 @@
+"""
+CAPSTACK ML Service benchmark suite.
+
+Run from the ml-service directory:
+    python -m benchmarks run --output benchmarks/results/current.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.10
+"""
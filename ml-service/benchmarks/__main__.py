@@ -0,0 +1,143 @@
+"""
+CAPSTACK Benchmarks - Command line entry point
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from .harness import (
+    compare,
+    format_comparison,
+    format_results,
+    load_results,
+    save_results,
+)
+
+SUITES = ("models", "simulation", "endpoints", "cold")
+DEFAULT_OUTPUT = Path("benchmarks/results/latest.json")
+
+
+def parse_args(argv=None):
+    """Parse benchmark command line arguments"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the ML service models and endpoints",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run benchmarks and store JSON results")
+    run.add_argument("--suite", choices=SUITES, action="append",
+                     help="Suite to run (repeatable; default: all)")
+    run.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    run.add_argument("--quick", action="store_true",
+                     help="Fewer iterations, for smoke runs")
+    run.add_argument("--cold-runs", type=int, default=5,
+                     help="Fresh processes for the cold-start suite")
+    run.add_argument("--baseline", type=Path,
+                     help="Compare against this results file after running")
+
+    load = commands.add_parser(
+        "load", help="Load test a real uvicorn process over HTTP"
+    )
+    load.add_argument("--workers", type=int, nargs="+", default=[1],
+                      help="uvicorn worker counts to test (one server each)")
+    load.add_argument("--mode", choices=("open", "closed", "both"), default="both",
+                      help="open: fixed arrival rate; closed: fixed concurrency")
+    load.add_argument("--rate", type=float, default=100.0,
+                      help="Open-loop arrivals per second")
+    load.add_argument("--concurrency", type=int, default=16,
+                      help="Closed-loop concurrent clients")
+    load.add_argument("--duration", type=float, default=10.0,
+                      help="Seconds per load test")
+    load.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                      help="Extra server environment, e.g. OMP_NUM_THREADS=1")
+    load.add_argument("--output", type=Path, default=Path("benchmarks/results/load.json"))
+    load.add_argument("--baseline", type=Path,
+                      help="Compare against this results file after running")
+
+    check = commands.add_parser("compare", help="Compare results with a baseline")
+    check.add_argument("baseline", type=Path)
+    check.add_argument("current", type=Path)
+
+    for command in (run, load, check):
+        command.add_argument("--metric", default="p95_ms",
+                             choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+        command.add_argument("--threshold", type=float, default=0.10,
+                             help="Allowed slowdown as a fraction (0.10 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def _compare(baseline: Path, current: dict, metric: str, threshold: float) -> int:
+    rows, regressions = compare(load_results(baseline), current, metric, threshold)
+    print(format_comparison(rows, metric))
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed more than {threshold:.0%} on {metric}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%} on {metric}")
+    return 0
+
+
+def _finish(args, results: dict) -> int:
+    save_results(args.output, results)
+    print(format_results(results))
+    print(f"\nResults written to {args.output}")
+    if args.baseline:
+        print()
+        return _compare(args.baseline, results, args.metric, args.threshold)
+    return 0
+
+
+def _load(args) -> int:
+    from .loadtest import run_load  # pylint: disable=import-outside-toplevel
+
+    env = dict(item.split("=", 1) for item in args.env)
+    modes = ("open", "closed") if args.mode == "both" else (args.mode,)
+    results = {}
+    for workers in args.workers:
+        for mode in modes:
+            results.update(run_load(
+                workers, mode, args.duration,
+                rate=args.rate, concurrency=args.concurrency, env=env,
+            ))
+    for name, entry in results.items():
+        if name.endswith("/cpu"):
+            print(f"{name}: {entry['worker_cpu_percent']}")
+    return _finish(args, results)
+
+
+def main(argv=None) -> int:
+    """Run the requested benchmark command; returns the exit status"""
+    args = parse_args(argv)
+    if args.command == "compare":
+        return _compare(args.baseline, load_results(args.current), args.metric, args.threshold)
+
+    if args.command == "load":
+        return _load(args)
+
+    # Service logging would dominate the timings of fast endpoints
+    logging.disable(logging.INFO)
+    # Imported here so `compare` works without the service dependencies
+    from . import (  # pylint: disable=import-outside-toplevel
+        endpoint_bench,
+        model_bench,
+        simulation_bench,
+    )
+
+    suites = args.suite or list(SUITES)
+    results = {}
+    if "models" in suites:
+        results.update(model_bench.run(quick=args.quick))
+    if "simulation" in suites:
+        results.update(simulation_bench.run(quick=args.quick))
+    if "endpoints" in suites:
+        results.update(endpoint_bench.run_warm(quick=args.quick))
+    if "cold" in suites:
+        results.update(endpoint_bench.run_cold(runs=2 if args.quick else args.cold_runs))
+
+    return _finish(args, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
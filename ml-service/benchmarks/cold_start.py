@@ -0,0 +1,44 @@
+"""
+CAPSTACK Benchmarks - Cold-start probe
+Run in a fresh process by endpoint_bench.run_cold: times importing the
+service, the startup event and each endpoint's first request, and prints
+the timings (seconds) as one JSON line
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import time
+from typing import Dict
+
+import httpx
+
+
+async def first_requests() -> Dict[str, float]:
+    """Import the service, run startup, then each endpoint's first request"""
+    started = time.perf_counter()
+    app = importlib.import_module("app.main").app
+    timings = {"import app.main": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    await app.router.startup()
+    timings["startup"] = time.perf_counter() - started
+
+    # Imported after timing the service import: it loads app.models too
+    from .endpoint_bench import endpoint_requests  # pylint: disable=import-outside-toplevel
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, method, path, body, _ in endpoint_requests():
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            timings[name] = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} returned {response.status_code}")
+    return timings
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    print(json.dumps(asyncio.run(first_requests())))
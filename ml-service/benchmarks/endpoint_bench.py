@@ -0,0 +1,172 @@
+"""
+CAPSTACK Benchmarks - In-process ASGI endpoint benchmarks
+Drives every ML endpoint through httpx's ASGI transport (no sockets), with
+the served models in rule-based and trained mode, and measures cold starts
+in fresh interpreter processes
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+from .harness import measure_async, summarize
+from .model_bench import layoff_rows, risk_rows, rule_based_models, trained_models
+
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+
+USER_DATA = {
+    "emergency_months": 4,
+    "debt_ratio": 0.3,
+    "savings_rate": 15,
+    "industry": "IT",
+    "experience_years": 5,
+    "company_age": 12,
+    "team_size": 20,
+    "contract_type": "permanent",
+    "performance_rating": 4,
+    "current_savings": 10000,
+    "monthly_savings": 1000,
+    "expected_return": 7,
+}
+
+
+def endpoint_requests() -> List[Tuple[str, str, str, Any, int]]:
+    """(benchmark name, method, path, JSON body, rows per call)"""
+    rng = np.random.default_rng(0)
+    requests = [
+        ("GET /health", "GET", "/health", None, 1),
+        ("POST /risk-score", "POST", "/risk-score",
+         {"income": 50000, "expenses": 30000, "savings": 10000, "debt": 5000}, 1),
+        ("POST /risk-score/batch rows=64", "POST", "/risk-score/batch",
+         {"items": risk_rows(64, rng)}, 64),
+        ("POST /allocation-optimize", "POST", "/allocation-optimize", {
+            "income": 50000, "expenses": 30000, "emergency_fund": 60000,
+            "debt": 10000, "age": 35, "risk_tolerance": "medium",
+            "job_stability": 8, "market_conditions": "neutral",
+            "inflation_rate": 3.5,
+        }, 1),
+        ("POST /predictive-analytics/batch layoff_risk rows=64", "POST",
+         "/predictive-analytics/batch", {
+             "user_data": layoff_rows(64, rng),
+             "prediction_type": "layoff_risk",
+             "time_horizon": "90day",
+         }, 64),
+        ("POST /predictive-analytics/batch survival_probability rows=1000", "POST",
+         "/predictive-analytics/batch", {
+             "user_data": [
+                 {"emergency_months": months, "debt_ratio": debt, "savings_rate": rate}
+                 for months, debt, rate in zip(
+                     rng.uniform(0, 12, 1000).tolist(),
+                     rng.uniform(0, 0.8, 1000).tolist(),
+                     rng.uniform(0, 40, 1000).tolist(),
+                 )
+             ],
+             "prediction_type": "survival_probability",
+             "time_horizon": "90day",
+         }, 1000),
+        ("POST /what-if/simulate sims=1000", "POST", "/what-if/simulate", {
+            "current_income": 50000, "current_expenses": 30000,
+            "current_savings": 100000, "current_debt": 50000, "age": 35,
+            "risk_tolerance": "medium",
+            "scenarios": {
+                "job_loss": {"probability": 0.1, "duration_months": 6},
+                "raise": {"percentage": 0.1, "probability": 0.3},
+                "expense_increase": {"percentage": 0.05, "probability": 0.2},
+            },
+            "simulation_years": 10,
+            "num_simulations": 1000,
+            "seed": 7,
+        }, 1),
+    ]
+    for prediction_type in ("survival_probability", "layoff_risk", "savings_trajectory"):
+        requests.append((
+            f"POST /predictive-analytics {prediction_type}", "POST",
+            "/predictive-analytics", {
+                "user_data": USER_DATA,
+                "prediction_type": prediction_type,
+                "time_horizon": "90day",
+            }, 1,
+        ))
+    return requests
+
+
+@contextmanager
+def serving(models: Dict[str, Any]):
+    """Temporarily serve the given model instances' state from app.models"""
+    from app.models import MODELS  # pylint: disable=import-outside-toplevel
+
+    saved = {name: dict(vars(MODELS[name])) for name in models}
+    for name, model in models.items():
+        vars(MODELS[name]).update(vars(model))
+    try:
+        yield
+    finally:
+        for name, state in saved.items():
+            vars(MODELS[name]).clear()
+            vars(MODELS[name]).update(state)
+
+
+@contextmanager
+def cache_disabled():
+    """Measure request handling, not prediction cache hits"""
+    from app.cache import PREDICTION_CACHE  # pylint: disable=import-outside-toplevel
+
+    enabled = PREDICTION_CACHE.enabled
+    PREDICTION_CACHE.enabled = False
+    try:
+        yield
+    finally:
+        PREDICTION_CACHE.enabled = enabled
+
+
+async def _run_warm(options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    from app.main import app  # pylint: disable=import-outside-toplevel
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, method, path, body, rows in endpoint_requests():
+            async def call(method=method, path=path, body=body, name=name):
+                response = await client.request(method, path, json=body)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name} returned {response.status_code}: {response.text}")
+            results[name] = await measure_async(call, units_per_call=rows, **options)
+    return results
+
+
+def run_warm(quick: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Steady-state endpoint latency; keys are endpoint/warm/<mode>/<name>"""
+    options = {"min_time_s": 0.1, "max_iterations": 100} if quick else {}
+    results = {}
+    with cache_disabled():
+        for mode, models in (("rule_based", rule_based_models()), ("trained", trained_models())):
+            with serving(models):
+                for name, stats in asyncio.run(_run_warm(options)).items():
+                    results[f"endpoint/warm/{mode}/{name}"] = stats
+    return results
+
+
+def run_cold(runs: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    Import, startup and first-request latency in fresh processes.
+
+    Keys are endpoint/cold/<name>; percentiles are across `runs` processes.
+    """
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_start"],
+            cwd=SERVICE_ROOT, capture_output=True, text=True, check=True,
+        )
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        for name, seconds in timings.items():
+            samples.setdefault(name, []).append(seconds)
+    return {f"endpoint/cold/{name}": summarize(values) for name, values in samples.items()}
+
@@ -0,0 +1,179 @@
+"""
+CAPSTACK Benchmarks - Timing harness, result files and baseline comparison
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+def summarize(samples_s: List[float], units_per_call: int = 1) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput (units/s) for timed calls"""
+    samples = np.asarray(samples_s, dtype=np.float64)
+    p50, p95, p99 = np.percentile(samples, PERCENTILES)
+    total = samples.sum()
+    return {
+        "iterations": int(len(samples)),
+        "p50_ms": round(float(p50) * 1000, 4),
+        "p95_ms": round(float(p95) * 1000, 4),
+        "p99_ms": round(float(p99) * 1000, 4),
+        "mean_ms": round(float(samples.mean()) * 1000, 4),
+        "throughput_per_s": round(len(samples) * units_per_call / total, 2) if total else None,
+        "units_per_call": units_per_call,
+    }
+
+
+def measure(
+    fn: Callable[[], Any],
+    units_per_call: int = 1,
+    warmup: int = 5,
+    min_iterations: int = 20,
+    max_iterations: int = 2000,
+    min_time_s: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Time repeated calls of `fn`.
+
+    Runs `warmup` untimed calls, then at least `min_iterations` timed calls
+    and keeps going until `min_time_s` has elapsed or `max_iterations` is hit.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations and (
+        len(samples) < min_iterations or time.perf_counter() - started < min_time_s
+    ):
+        call_started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, units_per_call)
+
+
+async def measure_async(
+    fn: Callable[[], Awaitable[Any]],
+    units_per_call: int = 1,
+    warmup: int = 5,
+    min_iterations: int = 20,
+    max_iterations: int = 2000,
+    min_time_s: float = 0.5,
+) -> Dict[str, Any]:
+    """measure() for coroutine functions, awaited one call at a time"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations and (
+        len(samples) < min_iterations or time.perf_counter() - started < min_time_s
+    ):
+        call_started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, units_per_call)
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and code version the results were produced on"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path: Path, results: Dict[str, Dict[str, Any]]):
+    """Write results plus environment metadata as JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Benchmark results keyed by benchmark name"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    metric: str = "p95_ms",
+    threshold: float = 0.10,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Compare two result sets on one latency metric.
+
+    Returns one row per benchmark present in both sets and the names of
+    regressions, i.e. benchmarks whose metric grew by more than `threshold`
+    (a fraction, 0.10 = 10%).
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        before: Optional[float] = baseline[name].get(metric)
+        after: Optional[float] = current[name].get(metric)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        regressed = change > threshold
+        rows.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regressed": regressed,
+        })
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_results(results: Dict[str, Dict[str, Any]]) -> str:
+    """Human-readable table of results"""
+    width = max((len(name) for name in results), default=10)
+    lines = [
+        f"{'benchmark':<{width}}  {'p50 ms':>10}  {'p95 ms':>10}  {'p99 ms':>10}  {'per s':>12}"
+    ]
+    for name in sorted(results):
+        r = results[name]
+        if "p50_ms" not in r:
+            continue
+        throughput = r.get("throughput_per_s")
+        lines.append(
+            f"{name:<{width}}  {r['p50_ms']:>10.3f}  {r['p95_ms']:>10.3f}  "
+            f"{r['p99_ms']:>10.3f}  {throughput if throughput is not None else '-':>12}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict[str, Any]], metric: str) -> str:
+    """Human-readable table of a comparison"""
+    width = max((len(row["name"]) for row in rows), default=10)
+    lines = [f"{'benchmark':<{width}}  {'base ' + metric:>14}  {'now ' + metric:>14}  {'change':>8}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        lines.append(
+            f"{row['name']:<{width}}  {row['baseline']:>14.3f}  {row['current']:>14.3f}  "
+            f"{row['change'] * 100:>+7.1f}%{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+"""
+CAPSTACK Benchmarks - Load tests against a real uvicorn process
+Starts `uvicorn app.main:app` with a given worker count and drives it over
+HTTP with an asyncio client, either at a fixed arrival rate (open loop) or
+with a fixed number of concurrent clients (closed loop)
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .endpoint_bench import SERVICE_ROOT, endpoint_requests
+from .harness import summarize
+
+# Endpoints a dashboard user hits one request at a time
+LOAD_ENDPOINTS = (
+    "POST /risk-score",
+    "POST /allocation-optimize",
+    "POST /predictive-analytics survival_probability",
+    "POST /predictive-analytics layoff_risk",
+    "POST /predictive-analytics savings_trajectory",
+)
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def load_requests() -> List[Tuple[str, str, str, Any]]:
+    """(name, method, path, body) for each load-tested endpoint"""
+    return [
+        (name, method, path, body)
+        for name, method, path, body, _ in endpoint_requests()
+        if name in LOAD_ENDPOINTS
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    """Direct child PIDs on Linux (empty elsewhere)"""
+    children = []
+    proc = Path("/proc")
+    if not proc.exists():
+        return children
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+            cmdline = (entry / "cmdline").read_bytes()
+        except OSError:
+            continue
+        # ppid is the 2nd field after the parenthesised command name
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid and b"resource_tracker" not in cmdline:
+            children.append(int(entry.name))
+    return children
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU seconds used by a process (Linux only)"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    # utime and stime are fields 14 and 15; index from after the name
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+@contextmanager
+def uvicorn_server(workers: int = 1, env: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Run uvicorn on a free local port until the context exits.
+
+    Yields {"url", "pid", "worker_pids"}; worker_pids is the serving
+    process itself when workers == 1.
+    """
+    port = _free_port()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=SERVICE_ROOT,
+        env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                if httpx.get(f"{url}/ready", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not become ready within 60s")
+            time.sleep(0.2)
+        # With several workers every one must have started, not just the first
+        worker_pids = [process.pid]
+        while workers > 1:
+            worker_pids = _children(process.pid)
+            if len(worker_pids) >= workers or time.monotonic() > deadline:
+                break
+            time.sleep(0.2)
+        yield {"url": url, "pid": process.pid, "worker_pids": worker_pids}
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, latency: float, status: str, ok: bool):
+        """Store one completed (or failed) request"""
+        self.latencies.setdefault(name, []).append(latency)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        by_status = self.statuses.setdefault(name, {})
+        by_status[status] = by_status.get(status, 0) + 1
+
+
+async def _send(client: httpx.AsyncClient, request, recorder: Recorder, started: float):
+    name, method, path, body = request
+    try:
+        response = await client.request(method, path, json=body)
+        status = str(response.status_code)
+        ok = response.status_code < 400
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    recorder.record(name, time.perf_counter() - started, status, ok)
+
+
+async def open_loop(url: str, rate: float, duration: float, max_outstanding: int = 5000) -> Recorder:
+    """
+    Send requests at a fixed arrival rate regardless of completions.
+
+    Latency runs from each request's scheduled send time, so a stalled
+    server shows up as queueing delay instead of a lower offered rate.
+    Arrivals beyond `max_outstanding` are recorded as "dropped" errors.
+    """
+    requests = load_requests()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max_outstanding, max_keepalive_connections=256)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        tasks = set()
+        began = time.perf_counter()
+        total = int(rate * duration)
+        for i in range(total):
+            scheduled = began + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = requests[i % len(requests)]
+            if len(tasks) >= max_outstanding:
+                recorder.record(request[0], 0.0, "dropped", False)
+                continue
+            task = asyncio.create_task(_send(client, request, recorder, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    return recorder
+
+
+async def closed_loop(url: str, concurrency: int, duration: float) -> Recorder:
+    """Keep `concurrency` clients sending back-to-back requests"""
+    requests = load_requests()
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def user(offset: int):
+            i = offset
+            while time.perf_counter() < stop_at:
+                await _send(client, requests[i % len(requests)], recorder, time.perf_counter())
+                i += 1
+
+        await asyncio.gather(*(user(n) for n in range(concurrency)))
+    return recorder
+
+
+def _report(recorder: Recorder, elapsed: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    all_latencies: List[float] = []
+    all_errors = 0
+    for name, latencies in recorder.latencies.items():
+        stats = summarize(latencies)
+        errors = recorder.errors.get(name, 0)
+        stats["throughput_per_s"] = round((len(latencies) - errors) / elapsed, 2)
+        stats["error_rate"] = round(errors / len(latencies), 4)
+        stats["status_counts"] = recorder.statuses[name]
+        report[name] = stats
+        all_latencies.extend(latencies)
+        all_errors += errors
+    if all_latencies:
+        overall = summarize(all_latencies)
+        overall["throughput_per_s"] = round((len(all_latencies) - all_errors) / elapsed, 2)
+        overall["error_rate"] = round(all_errors / len(all_latencies), 4)
+        report["all"] = overall
+    return report
+
+
+def run_load(
+    workers: int,
+    mode: str,
+    duration: float,
+    rate: float = 100.0,
+    concurrency: int = 16,
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    One load test against a fresh uvicorn with `workers` processes.
+
+    Keys are load/<mode>/workers=<n>/<endpoint> plus .../all and
+    .../cpu; the cpu entry gives each worker's CPU utilisation in percent.
+    """
+    label = f"rate={rate:g}" if mode == "open" else f"concurrency={concurrency}"
+    prefix = f"load/{mode}/{label}/workers={workers}"
+    with uvicorn_server(workers, env) as server:
+        pids = server["worker_pids"]
+        cpu_before = {pid: _cpu_seconds(pid) for pid in pids}
+        started = time.perf_counter()
+        if mode == "open":
+            recorder = asyncio.run(open_loop(server["url"], rate, duration))
+        else:
+            recorder = asyncio.run(closed_loop(server["url"], concurrency, duration))
+        elapsed = time.perf_counter() - started
+        cpu_after = {pid: _cpu_seconds(pid) for pid in pids}
+
+    results = {f"{prefix}/{name}": stats for name, stats in _report(recorder, elapsed).items()}
+    results[f"{prefix}/cpu"] = {
+        "elapsed_s": round(elapsed, 3),
+        "worker_cpu_percent": {
+            str(pid): (
+                round((cpu_after[pid] - cpu_before[pid]) / elapsed * 100, 1)
+                if cpu_before[pid] is not None and cpu_after[pid] is not None
+                else None
+            )
+            for pid in pids
+        },
+    }
+    return results
@@ -0,0 +1,51 @@
+"""
+CAPSTACK Benchmarks - Monte Carlo engine microbenchmarks
+Times the what-if simulation engine directly, without the HTTP layer, for
+the path counts and horizons the /what-if routes accept, with plain and
+adaptive sampling
+"""
+
+from typing import Any, Dict
+
+from app.core import monte_carlo
+
+from .harness import measure
+
+SCENARIOS = {
+    "job_loss": {"probability": 0.1, "duration_months": 6},
+    "raise": {"percentage": 0.1, "probability": 0.3},
+    "expense_increase": {"percentage": 0.05, "probability": 0.2},
+}
+# Monthly income, expenses, savings and debt of the simulated user
+PROFILE = (50000 / 12, 30000 / 12, 100000, 50000)
+PATHS = 10000
+YEARS = (10, 30)
+
+
+def run(quick: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark simulate() and simulate_adaptive() per horizon.
+
+    Keys are simulation/simulate/years=<n>/paths=<n> and
+    simulation/simulate_adaptive/years=<n>/max_paths=<n>; adaptive runs use
+    the default tolerance and report the paths they drew as `paths`.
+    """
+    options = {"min_time_s": 0.1, "max_iterations": 20} if quick else {}
+    params = monte_carlo.parse_scenarios(SCENARIOS, "medium")
+    results = {}
+    for years in YEARS:
+        results[f"simulation/simulate/years={years}/paths={PATHS}"] = measure(
+            lambda y=years: monte_carlo.simulate(*PROFILE, params, y, PATHS, seed=7),
+            units_per_call=PATHS,
+            **options,
+        )
+        paths = monte_carlo.simulate_adaptive(*PROFILE, params, years, PATHS, seed=7)["paths"]
+        adaptive = measure(
+            lambda y=years: monte_carlo.simulate_adaptive(*PROFILE, params, y, PATHS, seed=7),
+            units_per_call=paths,
+            **options,
+        )
+        results[f"simulation/simulate_adaptive/years={years}/max_paths={PATHS}"] = dict(
+            adaptive, paths=paths
+        )
+    return results
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.admission import AdmissionMiddleware, RouteGate, Shed
+
+
+def test_gate_queues_fifo_and_sheds_when_full():
+    gate = RouteGate("/test", max_concurrency=1, max_queue=1, slo_seconds=10)
+    order = []
+
+    async def run():
+        await gate.acquire()
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.queued == 1
+
+        with pytest.raises(Shed) as shed:
+            await gate.acquire()
+        assert shed.value.status == 503 and shed.value.retry_after >= 1
+
+        gate.release(0.05)
+        await waiting
+        order.append("admitted")
+        gate.release(0.05)
+
+    asyncio.run(run())
+    assert order == ["admitted"]
+    assert gate.stats()["active"] == 0 and gate.queued == 0
+
+
+def test_gate_sheds_with_429_when_estimated_wait_exceeds_slo():
+    gate = RouteGate("/slow", max_concurrency=1, max_queue=100, slo_seconds=0.5)
+
+    async def run():
+        await gate.acquire()
+        gate.service_time = 2.0
+        with pytest.raises(Shed) as shed:
+            await gate.acquire()
+        gate.release(None)
+        return shed.value
+
+    shed = asyncio.run(run())
+    assert shed.status == 429 and shed.reason == "slo"
+    assert shed.retry_after >= 2.0
+
+
+def test_sync_routes_share_the_threadpool_gate(monkeypatch):
+    monkeypatch.setenv("ML_ADMISSION_THREADPOOL", "1")
+    monkeypatch.setenv("ML_ADMISSION_MAX_QUEUE", "0")
+    app = FastAPI()
+
+    @app.post("/first")
+    def first():
+        time.sleep(0.1)
+        return {}
+
+    @app.post("/second")
+    def second():
+        return {}
+
+    @app.post("/model")
+    async def model():
+        return {}
+
+    app.add_middleware(AdmissionMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.post("/first"))
+            await asyncio.sleep(0.03)
+            responses = await asyncio.gather(client.post("/second"), client.post("/model"))
+            return [await slow] + list(responses)
+
+    slow, sync, asynchronous = asyncio.run(run())
+    assert slow.status_code == 200
+    assert sync.status_code == 503
+    assert asynchronous.status_code == 200
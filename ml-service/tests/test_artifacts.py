@@ -0,0 +1,90 @@
+"""Memory-mapped artifacts must round-trip the trained models"""
+
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from app import models
+from app.artifacts import FORMAT_VERSION, MANIFEST_NAME, export_artifact, load_artifact
+
+
+@pytest.fixture(name="fitted")
+def fixture_fitted():
+    rng = np.random.default_rng(1)
+    X = rng.uniform(0, 1000, size=(300, 6))
+    y = X[:, 0] / 10 + rng.normal(size=300)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0)
+    model.fit(scaler.transform(X), y)
+    return model, scaler, rng.uniform(0, 1000, size=(50, 6))
+
+
+def test_round_trip_is_memory_mapped(tmp_path, fitted):
+    model, scaler, X_test = fitted
+    export_artifact(tmp_path, model, scaler, {"version": "1.0.0"})
+
+    artifact = load_artifact(tmp_path)
+    expected = model.predict(scaler.transform(X_test))
+    actual = artifact.ensemble.predict(artifact.scaler.transform(X_test))
+    np.testing.assert_allclose(actual, expected, rtol=1e-5)
+    assert artifact.metadata == {"version": "1.0.0"}
+    assert isinstance(artifact.ensemble.threshold.base, np.memmap)
+    assert not artifact.ensemble.threshold.flags.writeable
+
+
+def test_unknown_format_version_is_rejected(tmp_path, fitted):
+    model, scaler, _ = fitted
+    export_artifact(tmp_path, model, scaler, {})
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    manifest["format_version"] = FORMAT_VERSION + 1
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        load_artifact(tmp_path)
+
+
+def test_load_all_models_prefers_artifacts(tmp_path, monkeypatch, fitted):
+    model, scaler, X_test = fitted
+    monkeypatch.setattr(models, "MODEL_DIR", tmp_path)
+    savings = models.SavingsProjectionModel()
+    savings.model, savings.scaler, savings.is_trained = model, scaler, True
+    monkeypatch.setitem(models.MODELS, "savings", savings)
+    savings.save()
+
+    fresh = models.SavingsProjectionModel()
+    monkeypatch.setitem(models.MODELS, "savings", fresh)
+    models.load_all_models(compiled=True)
+
+    assert fresh.is_trained
+    assert fresh.model is fresh.compiled
+    np.testing.assert_allclose(
+        fresh.model.predict(fresh.scaler.transform(X_test)),
+        model.predict(scaler.transform(X_test)),
+        rtol=1e-5,
+    )
+
+
+def test_reexport_leaves_mapped_artifacts_readable(tmp_path, fitted):
+    model, scaler, X_test = fitted
+    export_artifact(tmp_path, model, scaler, {"version": "1.0.0"})
+    old = load_artifact(tmp_path)
+    expected = old.ensemble.predict(old.scaler.transform(X_test))
+
+    retrained = RandomForestRegressor(n_estimators=5, max_depth=3, random_state=1)
+    retrained.fit(scaler.transform(X_test), X_test[:, 1])
+    for version in ("1.0.1", "1.0.2"):
+        export_artifact(tmp_path, retrained, scaler, {"version": version})
+
+    # The old mapping still reads its own pages (a rewrite in place truncates
+    # them, and touching them afterwards raises SIGBUS)
+    np.testing.assert_array_equal(old.ensemble.predict(old.scaler.transform(X_test)), expected)
+    new = load_artifact(tmp_path)
+    np.testing.assert_allclose(
+        new.ensemble.predict(new.scaler.transform(X_test)),
+        retrained.predict(scaler.transform(X_test)),
+        rtol=1e-5,
+    )
+    # Only the current and previous exports stay on disk
+    assert len(list(tmp_path.glob("*.npy"))) == 2 * len(new.manifest["arrays"])
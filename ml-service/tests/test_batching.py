@@ -0,0 +1,48 @@
+import asyncio
+
+import numpy as np
+
+from app.batching import MicroBatcher
+
+
+def test_concurrent_rows_share_a_batch_and_errors_stay_per_row():
+    calls = []
+
+    def predict_batch(rows):
+        calls.append(len(rows))
+        values = np.array([float(row) for row in rows])
+        errors = {i: "row must be positive" for i, row in enumerate(rows) if row < 0}
+        return values, errors
+
+    batcher = MicroBatcher("test", predict_batch, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit(value) for value in [1, 2, -3, 4]),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == [4]
+    assert results[:2] == [1.0, 2.0] and results[3] == 4.0
+    assert isinstance(results[2], ValueError)
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 1
+    assert stats["queue_wait_seconds"]["count"] == 4
+
+
+def test_batches_are_capped_at_max_batch_size():
+    calls = []
+
+    def predict_batch(rows):
+        calls.append(len(rows))
+        return np.zeros(len(rows)), {}
+
+    batcher = MicroBatcher("test", predict_batch, max_batch_size=3, max_wait_ms=20)
+
+    async def run():
+        await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+
+    asyncio.run(run())
+    assert calls == [3, 3, 1]
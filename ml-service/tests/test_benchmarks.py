@@ -0,0 +1,24 @@
+from benchmarks.harness import compare, measure, summarize
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    stats = summarize([0.001] * 98 + [0.010, 0.020], units_per_call=64)
+    assert stats["iterations"] == 100
+    assert stats["p50_ms"] == 1.0
+    assert stats["p99_ms"] > stats["p95_ms"] >= stats["p50_ms"]
+    assert stats["throughput_per_s"] == round(100 * 64 / 0.128, 2)
+
+
+def test_measure_runs_at_least_min_iterations():
+    calls = []
+    stats = measure(lambda: calls.append(1), warmup=2, min_iterations=10, min_time_s=0)
+    assert stats["iterations"] == 10
+    assert len(calls) == 12
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {"a": {"p95_ms": 10.0}, "b": {"p95_ms": 10.0}, "gone": {"p95_ms": 1.0}}
+    current = {"a": {"p95_ms": 10.9}, "b": {"p95_ms": 12.0}, "new": {"p95_ms": 1.0}}
+    rows, regressions = compare(baseline, current, "p95_ms", threshold=0.10)
+    assert [row["name"] for row in rows] == ["a", "b"]
+    assert regressions == ["b"]
@@ -0,0 +1,55 @@
+import time
+
+from app.cache import InMemoryStore, LocalCache, PredictionCache, SharedCache, quantize
+from app.models import FinancialRiskModel
+
+
+def test_lru_evicts_oldest_and_ttl_expires():
+    cache = LocalCache(max_entries=2, max_bytes=1 << 20, ttl=60)
+    cache.set(("risk", 1), 1.0)
+    cache.set(("risk", 2), 2.0)
+    cache.get(("risk", 1))
+    cache.set(("risk", 3), 3.0)
+    assert cache.get(("risk", 2)) is None
+    assert cache.get(("risk", 1)) == 1.0
+    assert cache.evictions == 1
+
+    short = LocalCache(max_entries=10, max_bytes=1 << 20, ttl=0.01)
+    short.set(("risk", 1), 1.0)
+    time.sleep(0.02)
+    assert short.get(("risk", 1)) is None
+    assert short.expirations == 1
+
+
+def test_byte_budget_bounds_the_cache():
+    cache = LocalCache(max_entries=1000, max_bytes=2000, ttl=60)
+    for i in range(100):
+        cache.set(("risk", float(i)), float(i))
+    assert cache.size_bytes <= 2000
+    assert 0 < len(cache) < 100
+
+
+def test_predictions_are_cached_per_revision_and_shared():
+    store = InMemoryStore()
+    cache = PredictionCache(ttl=60, digits=4, shared=SharedCache(store, ttl=60))
+    model = FinancialRiskModel()
+    data = {"income": 5000.0, "expenses": 3000.0, "savings": 100.0, "debt": 0}
+    near = dict(data, income=5000.0001)
+
+    key = cache.key(model, data)
+    assert cache.key(model, near) == key
+    assert cache.get(key) is None
+    cache.set(key, 42.0)
+    assert cache.get(key) == 42.0
+
+    model.revision = "pickle:2"
+    assert cache.get(cache.key(model, data)) is None
+
+    # A second worker only sees the shared store
+    other = PredictionCache(ttl=60, digits=4, shared=SharedCache(store, ttl=60))
+    assert other.get(key) == 42.0
+    assert other.stats()["shared_hits"] == 1
+
+    cache.invalidate("risk")
+    assert len(cache.local) == 0
+    assert quantize("IT", 4) == "IT"
@@ -0,0 +1,44 @@
+"""Cohort simulation must match per-user simulations for any sharding"""
+
+import sqlite3
+
+import numpy as np
+
+from app import cohort
+from app.core import monte_carlo
+
+SCENARIOS = {"job_loss": {"probability": 0.1, "duration_months": 6}}
+
+
+def test_cohort_report_matches_single_user_simulation(tmp_path):
+    database = tmp_path / "profiles.db"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "CREATE TABLE user_profiles (user_id INTEGER, monthly_income DECIMAL(12,2), "
+            "monthly_expenses DECIMAL(12,2), emergency_fund DECIMAL(12,2))"
+        )
+        connection.execute("CREATE TABLE debts (user_id INTEGER, outstanding_amount DECIMAL)")
+        connection.executemany(
+            "INSERT INTO user_profiles VALUES (?, ?, ?, ?)",
+            [(user, 3000 + 100 * user, 2500 + 50 * user, 1000 * user) for user in range(1, 41)],
+        )
+        connection.executemany("INSERT INTO debts VALUES (?, ?)", [(3, 4000), (3, 1000)])
+
+    manifest = cohort.run(database, tmp_path / "report", scenarios=SCENARIOS,
+                          n_simulations=300, years=5, seed=2, workers=2)
+    assert manifest["users"] == 40 and manifest["user_simulations_per_second"] > 0
+    report = cohort.read_results(tmp_path / "report")
+
+    chunked = cohort.simulate_cohort(
+        cohort.load_profiles(database), monte_carlo.parse_scenarios(SCENARIOS),
+        years=5, n_simulations=300, seed=2, workers=1, memory_mb=1,
+    )
+    for column in manifest["columns"]:
+        np.testing.assert_array_equal(report[column], chunked[column])
+
+    single = monte_carlo.simulate(
+        3300, 2650, 3000, 5000, monte_carlo.parse_scenarios(SCENARIOS), 5, 300, seed=2
+    )
+    assert report["user_id"][2] == 3
+    assert report["survival_probability"][2] == single["survival_probability"]
+    assert np.isclose(report["p50"][2], single["final_median"])
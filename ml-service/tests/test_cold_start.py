@@ -0,0 +1,57 @@
+"""Cold start must stay within budget and avoid heavy ML imports"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.startup import COLD_START_BUDGET_MS
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("sklearn", "joblib", "xgboost", "scipy", "pandas")
+
+SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+from app.models import load_all_models
+load_all_models()
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    "elapsed_ms": elapsed_ms,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+    "report": app.main.startup.startup_report(),
+}}))
+"""
+
+
+def run_cold_start(model_dir: Path) -> dict:
+    env = dict(os.environ, ML_MODEL_DIR=str(model_dir))
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=SERVICE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_rule_based_cold_start_skips_heavy_imports(tmp_path):
+    result = run_cold_start(tmp_path)
+    assert result["heavy"] == []
+    assert set(result["report"]["model_loads"]) == {"risk", "layoff", "savings"}
+    assert all(
+        load["source"] == "rule_based"
+        for load in result["report"]["model_loads"].values()
+    )
+
+
+def test_cold_start_within_budget(tmp_path):
+    result = run_cold_start(tmp_path)
+    assert result["elapsed_ms"] <= COLD_START_BUDGET_MS, (
+        f"Cold start took {result['elapsed_ms']:.0f} ms, "
+        f"budget is {COLD_START_BUDGET_MS:.0f} ms"
+    )
@@ -0,0 +1,72 @@
+"""Compiled tree ensembles must match the native estimators"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+
+from app.compiled_trees import compile_ensemble
+from app.features import RISK_FEATURES
+from app.models import FinancialRiskModel, LayoffRiskModel
+
+
+@pytest.fixture(name="data")
+def fixture_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = 3 * X[:, 0] + X[:, 1] ** 2 + rng.normal(scale=0.1, size=400)
+    # Include training rows so inputs land exactly on split thresholds
+    X_test = np.vstack([rng.normal(size=(500, 6)), X[:100]])
+    return X, y, X_test
+
+
+def test_random_forest_matches_sklearn(data):
+    X, y, X_test = data
+    model = RandomForestRegressor(n_estimators=30, max_depth=8, random_state=0)
+    model.fit(X, y)
+    compiled = compile_ensemble(model)
+    np.testing.assert_allclose(
+        compiled.predict(X_test), model.predict(X_test), rtol=1e-5, atol=1e-5
+    )
+
+
+def test_gradient_boosting_matches_sklearn(data):
+    X, y, X_test = data
+    model = GradientBoostingClassifier(n_estimators=30, max_depth=4, random_state=0)
+    model.fit(X, (y > 1).astype(int))
+    compiled = compile_ensemble(model)
+    np.testing.assert_allclose(
+        compiled.predict_proba(X_test), model.predict_proba(X_test), atol=1e-6
+    )
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+
+
+def test_xgboost_matches_native(data):
+    xgboost = pytest.importorskip("xgboost")
+    X, y, X_test = data
+    model = xgboost.XGBRegressor(n_estimators=40, max_depth=6, n_jobs=1)
+    model.fit(X, y)
+    compiled = compile_ensemble(model)
+    np.testing.assert_allclose(
+        compiled.predict(X_test), model.predict(X_test), rtol=1e-5, atol=1e-4
+    )
+
+
+def test_unsupported_estimator_is_rejected():
+    with pytest.raises(ValueError):
+        compile_ensemble(object())
+
+
+def test_model_predict_uses_compiled_ensemble(data):
+    X, y, _ = data
+    raw = np.abs(X[:, :4]) * 1000 + 1
+    risk = FinancialRiskModel()
+    risk.train(RISK_FEATURES.transform_rows(raw), y)
+    rows = [
+        {"income": 5000 + i, "expenses": 3000, "savings": 1000, "debt": 500}
+        for i in range(10)
+    ]
+    native, _ = risk.predict_batch(rows)
+    risk.compiled = compile_ensemble(risk.model)
+    compiled, _ = risk.predict_batch(rows)
+    np.testing.assert_allclose(compiled, native, rtol=1e-5, atol=1e-4)
+    assert risk.predict(rows[0]) == pytest.approx(native[0], rel=1e-5, abs=1e-4)
@@ -0,0 +1,57 @@
+"""Sharded synthetic data must match in-memory generation and be cached"""
+
+import numpy as np
+
+from app import datagen
+
+
+def test_closed_form_savings_matches_monthly_loop():
+    current = np.array([1000.0, 0.0, 250000.0])
+    monthly = np.array([100.0, 5000.0, 0.0])
+    returns = np.array([7.0, 0.0, 12.5])
+    months = np.array([12, 24, 35])
+
+    expected = []
+    for balance, deposit, annual, n in zip(current, monthly, returns, months):
+        rate = annual / 100 / 12
+        for _ in range(n):
+            balance = (balance + deposit) * (1 + rate)
+        expected.append(balance)
+
+    np.testing.assert_allclose(
+        datagen.compound_savings(current, monthly, returns, months), expected, rtol=1e-12
+    )
+
+
+def test_shards_match_in_memory_data_for_any_worker_count(tmp_path):
+    X, y = datagen.generate("savings", 2500, seed=7, chunk_rows=1000)
+    single = datagen.build_dataset(
+        "savings", 2500, seed=7, chunk_rows=1000, workers=1, directory=tmp_path / "one"
+    )
+    parallel = datagen.build_dataset(
+        "savings", 2500, seed=7, chunk_rows=1000, workers=2, directory=tmp_path / "two"
+    )
+
+    assert [shard["rows"] for shard in single.shards] == [1000, 1000, 500]
+    for dataset in (single, parallel):
+        stored_X, stored_y = dataset.load()
+        np.testing.assert_array_equal(stored_X, X.astype(np.float32))
+        np.testing.assert_array_equal(stored_y, y)
+
+
+def test_cached_dataset_is_reused_until_the_key_changes(tmp_path, monkeypatch):
+    first = datagen.build_dataset("layoff", 300, seed=1, workers=1, directory=tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached dataset was regenerated")
+
+    monkeypatch.setattr(datagen, "_write_shard", fail)
+    again = datagen.build_dataset("layoff", 300, seed=1, workers=1, directory=tmp_path)
+    assert again.path == first.path
+    monkeypatch.undo()
+
+    other = datagen.build_dataset(
+        "layoff", 300, seed=1, workers=1, directory=tmp_path, threshold=0.2
+    )
+    assert other.path != first.path
+    assert other.load()[1].mean() > first.load()[1].mean()
@@ -0,0 +1,193 @@
+"""Batch endpoints must report per-row errors by index and match single-row scoring"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import MAX_BATCH_SIZE, app
+from app.models import FinancialRiskModel, LayoffRiskModel, SavingsProjectionModel
+
+RISK_ROW = {"income": 5000, "expenses": 3000, "savings": 1000, "debt": 500}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_risk_batch_reports_errors_at_their_row_index(client):
+    items = [
+        RISK_ROW,
+        "not a row",
+        dict(RISK_ROW, income=0),
+        dict(RISK_ROW, debt="500"),
+        dict(RISK_ROW, savings=4000),
+    ]
+    response = client.post("/risk-score/batch", json={"items": items})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    failed = {result["index"]: result["error"] for result in body["results"] if result["error"]}
+    assert sorted(failed) == [1, 2, 3]
+    assert failed[1] == "row must be an object"
+    assert failed[2] == "income must be > 0"
+    assert "debt" in failed[3]
+    for index in (0, 4):
+        assert body["results"][index]["risk_score"] is not None
+        assert body["results"][index]["error"] is None
+    assert (body["succeeded"], body["failed"]) == (2, 3)
+
+
+def test_risk_batch_rejects_boolean_inputs(client):
+    response = client.post("/risk-score/batch", json={
+        "items": [dict(RISK_ROW, income=True), RISK_ROW],
+    })
+    body = response.json()
+    assert body["results"][0]["error"] == "income must be a finite number"
+    assert body["results"][1]["error"] is None
+    assert (body["succeeded"], body["failed"]) == (1, 1)
+
+
+@pytest.mark.parametrize("label", [{"a": 1}, ["IT"]])
+def test_layoff_batch_reports_bad_labels_at_their_row_index(client, label):
+    response = client.post("/predictive-analytics/batch", json={
+        "prediction_type": "layoff_risk",
+        "time_horizon": "30day",
+        "user_data": [
+            {"experience_years": 3, "industry": label},
+            {"experience_years": 4},
+            {"experience_years": 5, "contract_type": label},
+        ],
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["error"] == "industry must be a string"
+    assert results[2]["error"] == "contract_type must be a string"
+    assert results[1]["error"] is None
+    assert results[1]["predicted_value"] == LayoffRiskModel().predict({"experience_years": 4})
+
+
+def test_survival_follows_the_horizon_and_factors_follow_the_curve(client):
+    row = {"emergency_months": 1, "debt_ratio": 0.3, "savings_rate": 5, "layoff_risk": 0.6}
+    values = {}
+    for horizon in ("30day", "60day", "90day"):
+        body = client.post("/predictive-analytics", json={
+            "user_data": row, "prediction_type": "survival_probability", "time_horizon": horizon,
+        }).json()
+        assert body["predicted_value"] == body["horizons"][horizon]
+        values[horizon] = body["predicted_value"]
+    assert 0.5 < values["90day"] < values["60day"] < values["30day"] < 1.0
+    assert body["factors"] == [
+        "Low emergency fund", "Low savings rate", "80% chance of staying solvent for 90 days",
+    ]
+
+    request = {"prediction_type": "survival_probability", "time_horizon": "90day"}
+    overspending = client.post("/predictive-analytics", json={"user_data": {
+        "emergency_months": 0.5, "savings_rate": 15,
+        "monthly_income": 3000, "monthly_expenses": 4000,
+    }, **request}).json()
+    assert overspending["predicted_value"] == overspending["horizons"]["90day"] == 0.0
+    assert overspending["factors"] == [
+        "Low emergency fund",
+        "0% chance of staying solvent for 90 days",
+        "Savings run out in 3 months",
+    ]
+
+
+@pytest.mark.parametrize("route, key, extra", [
+    ("/risk-score/batch", "items", {}),
+    ("/predictive-analytics/batch", "user_data",
+     {"prediction_type": "layoff_risk", "time_horizon": "90day"}),
+])
+def test_empty_and_oversized_batches_are_rejected(client, route, key, extra):
+    assert client.post(route, json={key: [], **extra}).status_code == 422
+    rows = [RISK_ROW] * (MAX_BATCH_SIZE + 1)
+    assert client.post(route, json={key: rows, **extra}).status_code == 422
+
+
+@pytest.mark.parametrize("prediction_type, row", [
+    ("survival_probability", {"emergency_months": 4, "debt_ratio": 0.3, "savings_rate": 15}),
+    ("layoff_risk", {"industry": "Finance", "experience_years": 3}),
+    ("savings_trajectory", {"current_savings": 1000, "monthly_savings": 200}),
+])
+def test_prediction_batch_isolates_non_object_rows(client, prediction_type, row):
+    response = client.post("/predictive-analytics/batch", json={
+        "user_data": [row, 42, None, row],
+        "prediction_type": prediction_type,
+        "time_horizon": "90day",
+    })
+    assert response.status_code == 200
+    body = response.json()
+
+    results = body["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert results[1]["error"] == results[2]["error"] == "row must be an object"
+    assert results[0]["error"] is None and results[0]["factors"]
+    assert results[0]["predicted_value"] == results[3]["predicted_value"]
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+
+
+@pytest.mark.parametrize("model, rows", [
+    (FinancialRiskModel(), [
+        RISK_ROW,
+        {"income": 1},
+        {"income": 1000, "expenses": 5000, "debt": 20000},
+        {"income": 8000, "expenses": 1000, "savings": 50000},
+    ]),
+    (LayoffRiskModel(), [
+        {},
+        {"industry": "Retail"},
+        {"industry": "Unknown", "experience_years": 0},
+        {"industry": "Healthcare", "experience_years": 25},
+        {"experience_years": 0.5},
+    ]),
+    (SavingsProjectionModel(), [
+        {},
+        {"current_savings": 5000, "monthly_savings": 250, "expected_return": 0},
+        {"current_savings": 5000, "months_to_project": 0},
+        {"monthly_savings": -100, "expected_return": -4, "months_to_project": 240},
+        {"current_savings": 1e6, "monthly_savings": 1e3, "months_to_project": 1200},
+    ]),
+])
+def test_rule_based_batch_matches_scalar_predict(model, rows):
+    assert not model.is_trained
+    values, errors = model.predict_batch(rows)
+    assert errors == {}
+    np.testing.assert_allclose(values, [model.predict(row) for row in rows], rtol=1e-12)
+
+
+@pytest.mark.parametrize("prediction_type, row", [
+    ("layoff_risk", {"industry": "IT", "experience_years": 120}),
+    ("layoff_risk", {"industry": "Retail", "experience_years": "7"}),
+    ("savings_trajectory", {"current_savings": 1000, "months_to_project": 1500}),
+    ("savings_trajectory", {"current_savings": "2500.5", "monthly_savings": "100"}),
+])
+def test_single_row_prediction_keeps_scalar_acceptance(client, prediction_type, row):
+    request = {"prediction_type": prediction_type, "time_horizon": "90day"}
+    single = client.post("/predictive-analytics", json={"user_data": row, **request})
+    assert single.status_code == 200
+    assert single.json()["predicted_value"] is not None
+
+    batch = client.post("/predictive-analytics/batch", json={"user_data": [row], **request})
+    assert batch.json()["results"][0]["error"] is not None
+
+
+def test_single_row_prediction_rejects_non_numeric_values(client):
+    response = client.post("/predictive-analytics", json={
+        "user_data": {"industry": "IT", "experience_years": "several"},
+        "prediction_type": "layoff_risk",
+        "time_horizon": "90day",
+    })
+    assert response.status_code == 400
+    assert "experience_years" in response.json()["detail"]
+
+
+def test_lenient_batch_matches_scalar_predict_on_coerced_rows():
+    model = SavingsProjectionModel()
+    rows = [{"current_savings": "1000", "months_to_project": 1500}]
+    values, errors = model.predict_batch(rows, lenient=True)
+    assert errors == {}
+    expected = model.predict({"current_savings": 1000.0, "months_to_project": 1500})
+    np.testing.assert_allclose(values, [expected], rtol=1e-12)
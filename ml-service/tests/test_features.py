@@ -0,0 +1,99 @@
+"""Training, single-row and batch serving must build identical features"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from app import models
+from app.core.feature_engineering import extract_features
+from app.features import LAYOFF_FEATURES, RISK_FEATURES, FeatureSchemaError, build_batch_matrix
+from app.train import generate_layoff_training_data, generate_risk_training_data
+
+
+def test_row_batch_and_column_paths_agree():
+    rows = [
+        {"industry": "Retail", "contract_type": "permanent", "experience_years": 3},
+        {"industry": "Unknown", "team_size": 40},
+        {},
+    ]
+    raw, errors = build_batch_matrix(rows, LAYOFF_FEATURES.inputs)
+    batch = LAYOFF_FEATURES.transform_rows(raw, rows)
+    single = np.vstack([LAYOFF_FEATURES.transform_row(row) for row in rows])
+    columns = LAYOFF_FEATURES.transform({
+        "industry": ["Retail", "Unknown", None],
+        "contract_type": ["permanent", None, None],
+        "experience_years": raw[:, 0],
+        "team_size": raw[:, 2],
+    })
+
+    assert not errors
+    np.testing.assert_array_equal(batch, single)
+    np.testing.assert_array_equal(batch, columns)
+    assert batch[:, 0].tolist() == [3, 1, 1]
+    assert batch[:, 4].tolist() == [1, 0, 0]
+
+
+def test_numeric_labels_are_scored_the_same_alone_and_mixed():
+    X, y = generate_layoff_training_data(n_samples=400)
+    model = models.LayoffRiskModel()
+    model.train(X, y)
+    numeric = {"industry": 3, "experience_years": 2, "performance_rating": 2}
+
+    alone, _ = model.predict_batch([numeric], lenient=True)
+    mixed, errors = model.predict_batch([numeric, {"industry": "IT"}], lenient=True)
+    assert not errors
+    assert mixed[0] == alone[0]
+    np.testing.assert_array_equal(
+        LAYOFF_FEATURES.transform({"industry": [3, "IT"]})[:, 0], [3, 1]
+    )
+
+
+def test_training_data_has_the_serving_width():
+    X, _ = generate_risk_training_data(n_samples=50)
+    assert X.shape[1] == RISK_FEATURES.n_features
+    row = {"income": X[0, 0], "expenses": X[0, 1], "savings": X[0, 2], "debt": X[0, 3]}
+    np.testing.assert_allclose(RISK_FEATURES.transform_row(row)[0], X[0])
+
+
+def test_feature_count_mismatch_is_rejected_at_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "MODEL_DIR", tmp_path)
+    rng = np.random.default_rng(0)
+    X, y = rng.uniform(size=(100, 7)), rng.uniform(size=100)
+    stale = models.FinancialRiskModel()
+    stale.scaler = StandardScaler().fit(X)
+    stale.model = RandomForestRegressor(n_estimators=5).fit(X, y)
+    stale.is_trained = True
+    stale.save()
+
+    with pytest.raises(FeatureSchemaError, match="expects 7 features"):
+        models.load_model(models.FinancialRiskModel(), "risk", compiled=False)
+
+
+def test_extract_features_keeps_its_ratio_contract():
+    assert extract_features(4000, 3000, 1000, 2000) == {
+        "expense_ratio": 0.75, "savings_ratio": 0.25, "debt_ratio": 0.5, "net_income": 1000.0
+    }
+    assert extract_features(0, 500, 100, 50) == {
+        "expense_ratio": 1.0, "savings_ratio": 0.0, "debt_ratio": 1.0, "net_income": -500.0
+    }
+    columns = extract_features(np.array([4000, 0]), np.array([3000, 500]), 100, 0)
+    np.testing.assert_allclose(columns["expense_ratio"], [0.75, 1.0])
+    np.testing.assert_allclose(columns["net_income"], [1000, -500])
+
+
+def test_extract_features_follows_the_risk_pipeline():
+    data = {"income": np.array([5200.0, 800.0]), "expenses": np.array([3100.0, 950.0]),
+            "savings": np.array([12000.0, 0.0]), "debt": np.array([400.0, 2500.0])}
+    matrix = RISK_FEATURES.transform(data)
+    features = extract_features(**data)
+    for name, feature in [("expense_ratio", "expense_to_income"),
+                          ("savings_ratio", "savings_to_income"),
+                          ("debt_ratio", "debt_to_income"),
+                          ("net_income", "disposable_income")]:
+        column = matrix[:, RISK_FEATURES.feature_names.index(feature)]
+        np.testing.assert_array_equal(features[name], column)
+
+
+def test_untrained_risk_metadata_lists_pipeline_features():
+    assert models.FinancialRiskModel().metadata["features"] == list(RISK_FEATURES.feature_names)
@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.main import app
+
+
+def test_histogram_renders_cumulative_buckets():
+    family = metrics.HistogramFamily("test_render_seconds", "Test", ("route",), (0.1, 1.0))
+    child = family.labels("/x")
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    text = metrics.render()
+    assert '# TYPE capstack_ml_test_render_seconds histogram' in text
+    assert 'capstack_ml_test_render_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'capstack_ml_test_render_seconds_bucket{route="/x",le="1.0"} 2' in text
+    assert 'capstack_ml_test_render_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'capstack_ml_test_render_seconds_count{route="/x"} 3' in text
+    metrics.REGISTRY.remove(family)
+
+
+def test_requests_are_recorded_per_route_and_stage():
+    route = metrics.HTTP_REQUESTS.labels("/risk-score", "POST")
+    validation = metrics.REQUEST_STAGES.labels("/risk-score", "validation")
+    before, before_validation = route.value, validation.count
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/risk-score",
+            json={"income": 5000, "expenses": 3000, "savings": 1000, "debt": 0},
+        )
+        assert response.status_code == 200
+        client.get("/no-such-route")
+        text = client.get("/metrics").text
+
+    assert route.value == before + 1
+    assert validation.count == before_validation + 1
+    assert 'capstack_ml_http_request_errors_total{route="other",method="GET",class="4xx"}' in text
+    assert 'capstack_ml_model_info{model="risk"' in text
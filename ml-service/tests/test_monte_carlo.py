@@ -0,0 +1,111 @@
+"""Adaptive what-if sampling must match plain Monte Carlo with fewer paths"""
+
+import numpy as np
+import pytest
+
+from app.core import monte_carlo
+
+SCENARIOS = {
+    "job_loss": {"probability": 0.1, "duration_months": 6},
+    "raise": {"percentage": 0.05, "probability": 0.3},
+}
+
+
+def test_growth_control_expectation_is_exact():
+    params = monte_carlo.parse_scenarios({}, "high")
+    inputs = monte_carlo.draw_random_inputs(400000, 5, np.random.default_rng(3))
+    control, expected = monte_carlo.growth_control(inputs, params, 5000, 3500, 20000)
+    np.testing.assert_allclose(control.mean(axis=-1), expected, rtol=5e-3)
+
+
+def test_adaptive_matches_plain_simulation_within_tolerance():
+    params = monte_carlo.parse_scenarios(SCENARIOS, "medium")
+    args = (5000, 3500, 20000, 5000, params, 10)
+    reference = monte_carlo.simulate(*args, 200000, seed=1)
+    adaptive = monte_carlo.simulate_adaptive(*args, 10000, tolerance=0.02, seed=1)
+
+    assert adaptive["converged"]
+    assert adaptive["paths"] < 10000
+    for key in ("final_worst", "final_median", "final_best", "final_mean"):
+        assert abs(adaptive[key] - reference[key]) <= 0.02 * abs(reference[key])
+    assert abs(adaptive["survival_probability"] - reference["survival_probability"]) < 0.02
+
+    again = monte_carlo.simulate_adaptive(*args, 10000, tolerance=0.02, seed=1)
+    np.testing.assert_array_equal(again["bands"], adaptive["bands"])
+
+
+def test_adaptive_is_more_accurate_than_plain_sampling_per_path():
+    params = monte_carlo.parse_scenarios(SCENARIOS, "medium")
+    args = (5000, 3500, 20000, 5000, params, 10)
+    reference = monte_carlo.simulate(*args, 200000, seed=0)
+    keys = ("final_worst", "final_median", "final_best", "final_mean")
+
+    adaptive_errors, plain_errors = [], []
+    for seed in range(12):
+        adaptive = monte_carlo.simulate_adaptive(*args, 4096, tolerance=1e-9, seed=seed)
+        plain = monte_carlo.simulate(*args, adaptive["paths"], seed=1000 + seed)
+        adaptive_errors.append([adaptive[key] - reference[key] for key in keys])
+        plain_errors.append([plain[key] - reference[key] for key in keys])
+
+    # Same paths, well under half the squared error: plain sampling needs
+    # over twice the paths (and time) for the same accuracy
+    assert np.square(adaptive_errors).sum() < 0.5 * np.square(plain_errors).sum()
+
+
+def test_adaptive_default_tolerance_converges_within_path_cap():
+    params = monte_carlo.parse_scenarios(SCENARIOS, "high")
+    for years in (10, 30):
+        result = monte_carlo.simulate_adaptive(
+            5000, 3500, 20000, 5000, params, years, 10000, seed=2
+        )
+        assert result["converged"]
+        assert result["paths"] < 10000
+
+
+def test_goal_seek_contribution_matches_resimulation():
+    params = monte_carlo.parse_scenarios(SCENARIOS, "medium")
+    result = monte_carlo.goal_seek(
+        5000, 4500, 10000, 0, params, 10, 5000, target=300000, probability=0.9, seed=4
+    )
+    assert result["baseline_probability"] < 0.9 <= result["probability"]
+    probabilities = [probability for _, probability in result["curve"]]
+    assert probabilities == sorted(probabilities)
+
+    inputs = monte_carlo.draw_random_inputs(5000, 10, np.random.default_rng(4))
+    flows = monte_carlo.build_cash_flows(inputs, params, 5000, 4500)
+    flows["employed"] = flows["employed"] + result["contribution"] * 1.0001
+    final = monte_carlo.accumulate_yearly(10000, flows)[0][-1]
+    assert (final >= 300000).mean() >= 0.9
+
+
+def test_sweep_params_match_parsing_each_cell():
+    axes = [("raise_percentage", [0.0, 0.05]), ("return_volatility", [0.1, 0.2, 0.3])]
+    params = monte_carlo.sweep_params(SCENARIOS, "high", axes)
+    for i, raise_percentage in enumerate(axes[0][1]):
+        for j, volatility in enumerate(axes[1][1]):
+            scenario = dict(SCENARIOS, **{
+                "raise": dict(SCENARIOS.get("raise") or {}, percentage=raise_percentage),
+                "investment_return": dict(
+                    SCENARIOS.get("investment_return") or {}, volatility=volatility
+                ),
+            })
+            expected = monte_carlo.parse_scenarios(scenario, "high")
+            assert {key: value[i, j] for key, value in params.items()} == expected
+
+    with pytest.raises(ValueError):
+        monte_carlo.sweep_params(SCENARIOS, "medium", [("job_loss_probability", [0.1, 2])])
+
+
+def test_sweep_cells_match_single_simulations_in_any_chunking():
+    axes = [("job_loss_probability", [0.0, 0.2, 0.4]), ("raise_percentage", [0.0, 0.05])]
+    params = monte_carlo.sweep_params(SCENARIOS, "medium", axes)
+    args = (5000, 4000, 10000, 2000, params, 5, 500)
+    whole = monte_carlo.batch_statistics(*args, seed=9)
+    chunked = monte_carlo.batch_statistics(*args, seed=9, memory_bytes=1)
+    np.testing.assert_array_equal(whole["bands"], chunked["bands"])
+
+    cell = {key: float(value[2, 1]) for key, value in params.items()}
+    single = monte_carlo.simulate(5000, 4000, 10000, 2000, cell, 5, 500, seed=9)
+    assert cell["job_loss_probability"] == 0.4 and cell["raise_percentage"] == 0.05
+    assert whole["survival_probability"][2, 1] == single["survival_probability"]
+    np.testing.assert_allclose(whole["bands"][:, 2, 1], single["bands"][:, -1])
@@ -0,0 +1,73 @@
+"""Hot reload must swap models atomically and keep serving on failure"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from app import models
+from app.registry import ModelRegistry
+
+
+def _save_savings_model(seed: int):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 1000, size=(200, 6))
+    y = X[:, 0] / 10 + seed
+    saved = models.SavingsProjectionModel()
+    saved.scaler = StandardScaler().fit(X)
+    saved.model = RandomForestRegressor(n_estimators=10, max_depth=4, random_state=0)
+    saved.model.fit(saved.scaler.transform(X), y)
+    saved.is_trained = True
+    saved.save()
+
+
+def test_reload_swaps_in_a_warmed_up_instance(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "MODEL_DIR", tmp_path)
+    monkeypatch.setitem(models.MODELS, "savings", models.SavingsProjectionModel())
+    registry = ModelRegistry(poll_seconds=0)
+    registry.record_loaded()
+    in_flight = models.MODELS["savings"]
+
+    _save_savings_model(seed=1)
+    assert registry.changed() == ("savings",)
+    status = registry.reload()
+
+    served = models.MODELS["savings"]
+    assert served is not in_flight and served.is_trained
+    assert not in_flight.is_trained
+    assert status["savings"]["reloads"] == 1
+    assert status["savings"]["version"] == models.model_version(served)
+    assert registry.changed() == ()
+    # MODELS is the only module-level handle on served models
+    model_classes = tuple(type(model) for model in models.MODELS.values())
+    assert not [value for value in vars(models).values() if isinstance(value, model_classes)]
+
+
+def test_failed_reload_keeps_the_current_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "MODEL_DIR", tmp_path)
+    current = models.SavingsProjectionModel()
+    monkeypatch.setitem(models.MODELS, "savings", current)
+    registry = ModelRegistry(poll_seconds=0)
+    registry.record_loaded()
+
+    (tmp_path / "savings_model.pkl").write_bytes(b"not a pickle")
+    (tmp_path / "savings_scaler.pkl").write_bytes(b"not a pickle")
+    status = registry.reload(["savings"])
+
+    assert models.MODELS["savings"] is current
+    assert status["savings"]["last_error"]
+
+
+def test_model_failing_warm_up_is_replaced_by_the_fallback(monkeypatch):
+    broken = models.SavingsProjectionModel()
+    broken.is_trained = True  # no estimator or scaler behind it
+    monkeypatch.setitem(models.MODELS, "savings", broken)
+    registry = ModelRegistry(poll_seconds=0)
+    registry.record_loaded()
+
+    registry.warm_up_all()
+
+    status = registry.status()["savings"]
+    assert registry.ready
+    assert models.MODELS["savings"] is not broken
+    assert status["fallback_active"] and status["last_error"]
+    assert status["warmup_ms"] is not None
@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.singleflight import SingleFlight, SingleFlightMiddleware
+
+JSON = {"content-type": "application/json"}
+
+
+def test_concurrent_calls_with_one_key_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(value == "result" for value, _ in results)
+    assert len(flights) == 0
+
+
+def test_identical_bodies_in_any_key_order_are_collapsed():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/score")
+    async def score(body: dict):
+        calls.append(body)
+        await asyncio.sleep(0.02)
+        return {"score": len(calls)}
+
+    app.add_middleware(SingleFlightMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/score", content=b'{"a": 1, "b": 2}', headers=JSON),
+                client.post("/score", content=b'{"b":2,"a":1}', headers=JSON),
+                client.post("/score", json={"a": 1, "b": 3}),
+            )
+
+    same, reordered, different = asyncio.run(run())
+    assert len(calls) == 2
+    assert same.json() == reordered.json()
+    assert different.status_code == 200
+
+
+def test_requests_with_different_content_types_are_not_collapsed():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/score")
+    async def score(request: Request):
+        calls.append(request.headers.get("content-type"))
+        await asyncio.sleep(0.02)
+        return {"score": len(calls)}
+
+    app.add_middleware(SingleFlightMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/score", content=b'{"a": 1}', headers=JSON),
+                client.post("/score", content=b'{"a":1}',
+                            headers={"content-type": "Application/JSON"}),
+                client.post("/score", content=b'{"a": 1}',
+                            headers={"content-type": "text/plain"}),
+            )
+
+    asyncio.run(run())
+    assert sorted(calls) == ["application/json", "text/plain"]
+
+
+def test_admin_routes_and_credentialed_requests_are_never_collapsed():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/admin/models/reload")
+    async def reload(body: dict):
+        calls.append(("reload", body))
+        await asyncio.sleep(0.02)
+        return {"reloaded": len(calls)}
+
+    @app.post("/score")
+    async def score(body: dict):
+        calls.append(("score", body))
+        await asyncio.sleep(0.02)
+        return {"score": len(calls)}
+
+    app.add_middleware(SingleFlightMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/admin/models/reload", json={"force": True}),
+                client.post("/admin/models/reload", json={"force": True},
+                            headers={"X-Admin-Token": "wrong"}),
+                client.post("/score", json={"a": 1}, headers={"X-Admin-Token": "one"}),
+                client.post("/score", json={"a": 1}, headers={"X-Admin-Token": "two"}),
+            )
+
+    responses = asyncio.run(run())
+    assert [name for name, _ in calls].count("reload") == 2
+    assert [name for name, _ in calls].count("score") == 2
+    assert all(response.status_code == 200 for response in responses)
@@ -0,0 +1,103 @@
+"""Out-of-core training must stay within its memory cap"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app import datagen, models, streaming
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+# Trains on a dataset in batches sized for `cap` bytes while a thread
+# samples anonymous RSS; prints the peak growth over the pre-training level
+MEASURE = """
+import json, sys, threading, time
+from pathlib import Path
+from app import datagen, models, streaming
+
+def anon_kb():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("RssAnon"))
+
+dataset = datagen.ShardedDataset.open(Path(sys.argv[1]))
+cap = int(sys.argv[2])
+rows = streaming.batch_rows(dataset.n_features, cap)
+split = dataset.n_rows - rows
+batches = lambda: dataset.batches(rows, stop=split)
+holdout = lambda: dataset.batches(rows, start=split)
+warm = models.FinancialRiskModel()
+streaming.train_out_of_core(warm, lambda: dataset.batches(2000, stop=4000),
+                           lambda: dataset.batches(2000, start=4000, stop=6000))
+
+peak = [anon_kb()]
+base = peak[0]
+done = threading.Event()
+def sample():
+    while not done.is_set():
+        peak[0] = max(peak[0], anon_kb())
+        time.sleep(0.002)
+threading.Thread(target=sample, daemon=True).start()
+model = models.FinancialRiskModel()
+model.model = model._build_estimator()
+model.model.set_params(n_estimators=20, max_depth=4, n_jobs=1)
+streaming.train_out_of_core(model, batches, holdout)
+done.set()
+print(json.dumps({"growth_bytes": (peak[0] - base) * 1024, "score": model.metadata["accuracy_score"]}))
+"""
+
+
+def test_batches_cover_a_row_range_across_shards(tmp_path):
+    dataset = datagen.build_dataset("risk", 2500, seed=4, chunk_rows=1000, workers=1,
+                                    directory=tmp_path)
+    X, y = dataset.load()
+    parts = list(dataset.batches(400, start=900, stop=2300))
+
+    assert [len(part_y) for _, part_y in parts] == [100, 400, 400, 200, 300]
+    np.testing.assert_array_equal(np.concatenate([part for part, _ in parts]), X[900:2300])
+    np.testing.assert_array_equal(np.concatenate([part for _, part in parts]), y[900:2300])
+
+
+@pytest.mark.parametrize("model_class", [models.LayoffRiskModel, models.SavingsProjectionModel])
+def test_streamed_models_match_the_in_memory_fit(tmp_path, model_class):
+    name = model_class.CACHE_NAME
+    dataset = datagen.build_dataset(name, 8000, seed=5, workers=1, directory=tmp_path)
+    X, y = dataset.load()
+
+    streamed = model_class()
+    streaming.train_out_of_core(streamed, lambda: dataset.batches(2000, stop=6000),
+                                lambda: dataset.batches(1500, start=6000))
+    in_memory = model_class()
+    in_memory.train(X[:6000], y[:6000])
+
+    X_test = in_memory.scaler.transform(X[6000:])
+    baseline = in_memory.model.score(X_test, y[6000:])
+    score = streamed.model.score(streamed.scaler.transform(X[6000:]), y[6000:])
+    np.testing.assert_allclose(streamed.scaler.mean_, in_memory.scaler.mean_)
+    assert score > baseline - 0.05
+
+    metric = "r2_score" if "r2_score" in streamed.metadata else "accuracy_score"
+    np.testing.assert_allclose(streamed.metadata[metric], score)
+    assert streamed.metadata["holdout_rows"] == 2000
+
+
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="needs /proc RSS")
+def test_training_memory_is_bounded_by_the_cap_not_the_dataset(tmp_path):
+    cap = 4 * 2**20
+    dataset = datagen.build_dataset("risk", 1_200_000, seed=6, chunk_rows=400_000, workers=1,
+                                    directory=tmp_path)
+    materialized = dataset.n_rows * dataset.n_features * 8
+    assert not streaming.fits_in_memory(dataset.n_rows, dataset.n_features, cap)
+    assert materialized > 20 * cap
+
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, str(dataset.path), str(cap)],
+        cwd=SERVICE_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    assert result["growth_bytes"] < materialized / 4
+    assert result["score"] > 0.5
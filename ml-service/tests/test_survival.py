@@ -0,0 +1,55 @@
+"""The survival curve must match a month-by-month simulation of the same model"""
+
+import numpy as np
+
+from app.core import survival_algorithm
+
+
+def simulate_survival(runway, surplus, burn, layoff_risk, months, n_paths=200000):
+    rng = np.random.default_rng(0)
+    hazard = 1 - (1 - layoff_risk) ** (1 / 12)
+    rehire = 1 / survival_algorithm.MEAN_UNEMPLOYMENT_MONTHS
+    balance = np.full(n_paths, float(runway))
+    employed = np.ones(n_paths, dtype=bool)
+    laid_off = np.zeros(n_paths, dtype=bool)
+    solvent = np.ones(n_paths, dtype=bool)
+    curve = [1.0]
+    for _ in range(months):
+        loss = employed & ~laid_off & (rng.random(n_paths) < hazard)
+        laid_off |= loss
+        employed &= ~loss
+        balance += np.where(employed, surplus, -burn)
+        solvent &= balance >= -1e-9
+        employed |= rng.random(n_paths) < rehire
+        curve.append(solvent.mean())
+    return np.array(curve)
+
+
+def test_curve_matches_simulation_and_answers_every_horizon():
+    runway = np.array([1.0, 4.0, 0.0, 2.0])
+    surplus, burn = survival_algorithm.cash_flow_rates(
+        savings_rate=[5, 15, 0, 0], debt_ratio=[0.3, 0.3, 0.6, 0.0],
+        monthly_income=[0, 0, 0, 3000], monthly_expenses=[0, 0, 0, 3200],
+    )
+    risk = np.array([0.6, 0.3, 0.5, 0.2])
+    curves = survival_algorithm.survival_curve(runway, surplus, burn, risk, months=12)
+
+    for index in range(len(runway)):
+        expected = simulate_survival(
+            runway[index], surplus[index], burn[index], risk[index], months=12
+        )
+        np.testing.assert_allclose(curves[index], expected, atol=0.005)
+
+    assert np.all(np.diff(curves, axis=1) <= 0)
+    np.testing.assert_array_equal(
+        survival_algorithm.survival_at(curves, 90), curves[:, 3]
+    )
+    halfway = survival_algorithm.survival_at(curves, 45)
+    np.testing.assert_allclose(halfway, (curves[:, 1] + curves[:, 2]) / 2)
+
+
+def test_survival_months_keep_their_runway_semantics():
+    assert survival_algorithm.predict_survival_months(6000, 2000, 0.5) == 2.25
+    assert survival_algorithm.predict_survival_months(100000, 1000, 1.0) == 24
+    assert survival_algorithm.predict_survival_months(0, 2000, 0.5) == 0
+    assert 2.25 < survival_algorithm.expected_solvent_months(6000, 2000, 0.5) < 24
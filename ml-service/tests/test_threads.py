@@ -0,0 +1,81 @@
+"""Native estimators must use the worker's thread budget without mutating shared state"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from app.threads import ThreadBudget
+
+
+def test_small_batches_run_single_threaded():
+    budget = ThreadBudget(cpus=8, workers=2, threads_per_worker=4, parallel_min_rows=100)
+    estimator = RandomForestRegressor(n_jobs=-1)
+    budget.prepare(estimator)
+
+    assert estimator.n_jobs == 1
+    assert budget.estimator_for(estimator, 1) is estimator
+    parallel = budget.estimator_for(estimator, 500)
+    assert parallel is not estimator and parallel.n_jobs == 4
+    assert budget.report()["threads_per_worker"] == 4
+
+
+def test_parallel_copy_shares_the_fitted_trees():
+    budget = ThreadBudget(cpus=8, workers=1, threads_per_worker=4, parallel_min_rows=100)
+    rng = np.random.default_rng(0)
+    estimator = RandomForestRegressor(n_estimators=5, random_state=0)
+    estimator.fit(rng.random((50, 3)), rng.random(50))
+    budget.prepare(estimator)
+
+    parallel = budget.estimator_for(estimator, 500)
+    assert parallel.n_jobs == 4 and estimator.n_jobs == 1
+    assert all(a is b for a, b in zip(parallel.estimators_, estimator.estimators_))
+
+
+def test_xgboost_keeps_one_booster_on_the_full_allowance():
+    xgboost = pytest.importorskip("xgboost")
+    budget = ThreadBudget(cpus=8, workers=1, threads_per_worker=4, parallel_min_rows=100)
+    rng = np.random.default_rng(0)
+    estimator = xgboost.XGBRegressor(n_estimators=5).fit(rng.random((50, 3)), rng.random(50))
+    budget.prepare(estimator)
+
+    assert budget.estimator_for(estimator, 500) is estimator
+    assert estimator.n_jobs == 4
+
+
+def test_predictions_never_change_n_jobs_on_the_shared_estimator():
+    budget = ThreadBudget(cpus=8, workers=1, threads_per_worker=2, parallel_min_rows=64)
+    rng = np.random.default_rng(0)
+    X, y = rng.random((200, 3)), rng.random(200)
+    estimator = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    budget.prepare(estimator)
+    expected = estimator.predict(X)
+
+    def predict(n_rows):
+        model = budget.estimator_for(estimator, n_rows)
+        return model.predict(X[:n_rows])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(predict, [1, 200] * 20))
+    assert estimator.n_jobs == 1
+    for n_rows, result in zip([1, 200] * 20, results):
+        np.testing.assert_allclose(result, expected[:n_rows])
+
+
+def test_single_thread_budget_keeps_no_copy():
+    budget = ThreadBudget(cpus=1, workers=1, threads_per_worker=1, parallel_min_rows=1)
+    estimator = RandomForestRegressor(n_jobs=-1)
+    budget.prepare(estimator)
+    assert budget.estimator_for(estimator, 10_000) is estimator
+    assert estimator.n_jobs == 1
+
+
+def test_per_worker_share_follows_worker_count(monkeypatch):
+    monkeypatch.setattr("app.threads.available_cpus", lambda: 8)
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.delenv("ML_THREADS_PER_WORKER", raising=False)
+    assert ThreadBudget.from_env().threads_per_worker == 2
+
+    monkeypatch.setenv("ML_THREADS_PER_WORKER", "5")
+    assert ThreadBudget.from_env().threads_per_worker == 5
@@ -0,0 +1,28 @@
+"""The training orchestrator must train every model within the core budget"""
+
+import json
+
+from app import models
+from app.train import split_cores, train_models
+
+
+def test_split_cores_never_oversubscribes():
+    assert split_cores(8, 3) == [3, 3, 2]
+    assert split_cores(2, 3) == [1, 1, 1]
+    assert split_cores(1, 1) == [1]
+
+
+def test_models_train_in_parallel_from_shared_datasets(tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "MODEL_DIR", tmp_path / "models")
+    monkeypatch.setenv("ML_DATA_CACHE_DIR", str(tmp_path / "data"))
+    (tmp_path / "models").mkdir()
+
+    report = train_models(n_samples=2000, seed=3, cores=2, parallel=True)
+
+    assert [job["model"] for job in report["jobs"]] == ["risk", "layoff", "savings"]
+    assert [job["threads"] for job in report["jobs"]] == [1, 1, 1]
+    for job in report["jobs"]:
+        assert set(job["stages_ms"]) == {"generate", "load", "fit", "evaluate", "save"}
+        saved = json.loads((tmp_path / "models" / f"{job['model']}_metadata.json").read_text())
+        assert saved["features"]
+    assert report["jobs"][1]["metrics"]["accuracy"] > 0.5
@@ -0,0 +1,39 @@
+"""Hyperparameter search must rank on quality and serving latency"""
+
+import numpy as np
+
+from app import datagen, tuning
+
+
+def test_latency_over_budget_is_penalized():
+    fast = {"quality": 0.90, "single_ms": 0.5, "batch_ms": 10.0}
+    slow = {"quality": 0.95, "single_ms": 3.0, "batch_ms": 10.0}
+    assert tuning.objective(fast, 1.0, 20.0) == 0.90
+    assert tuning.objective(slow, 1.0, 20.0) < tuning.objective(fast, 1.0, 20.0)
+
+
+def test_successive_halving_reuses_cached_folds(tmp_path, monkeypatch):
+    monkeypatch.setitem(tuning.SEARCH_SPACES, "RandomForestRegressor", {
+        "n_estimators": [5, 10],
+        "max_depth": [2, 4, 8],
+    })
+    dataset = datagen.build_dataset("savings", 1800, seed=2, workers=1, directory=tmp_path)
+
+    result = tuning.successive_halving(
+        "savings", dataset, n_candidates=6, n_folds=2, min_rows=100, cores=1
+    )
+
+    assert [len(entry["candidates"]) for entry in result["rounds"]] == [6, 2, 1]
+    assert [entry["rows"] for entry in result["rounds"]] == [100, 300, 900]
+    assert result["params"] == result["best"]["params"]
+    assert result["best"]["quality"] > 0.5
+    stamp = (tmp_path / dataset.path.name / "folds-2-0" / "folds.json").stat().st_mtime_ns
+    tuning.build_folds(dataset, n_folds=2, seed=0)
+    assert (dataset.path / "folds-2-0" / "folds.json").stat().st_mtime_ns == stamp
+
+
+def test_class_proportions_hold_in_every_prefix():
+    labels = np.array([1] * 10 + [0] * 990)
+    order = tuning._prefix_order(np.arange(1000), labels, seed=0)
+    assert sorted(order.tolist()) == list(range(1000))
+    assert 1 <= labels[order[:100]].sum() <= 2